@@ -8,6 +8,7 @@ import xml.etree.ElementTree as ET
 import pandas as pd
 from openpyxl import Workbook
 import urllib3
+from date_period import decode_date_period
 
 # Disable InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -146,40 +147,7 @@ def get_mappings(root, ns):
 # parser functions
 # parser 1 : feature parser
 def extract_date(date_period, ns):
-    if date_period is not None:
-        end = date_period.find(".//ns:End", ns)
-        if end is not None:
-            to_element = end.find(".//ns:To", ns)
-            if to_element is not None:
-                year = to_element.find(".//ns:Year", ns).text
-                month = to_element.find(".//ns:Month", ns).text
-                day = to_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-            from_element = end.find(".//ns:From", ns)
-            if from_element is not None:
-                year = from_element.find(".//ns:Year", ns).text
-                month = from_element.find(".//ns:Month", ns).text
-                day = from_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-        start = date_period.find(".//ns:Start", ns)
-        if start is not None:
-            to_element = start.find(".//ns:To", ns)
-            if to_element is not None:
-                year = to_element.find(".//ns:Year", ns).text
-                month = to_element.find(".//ns:Month", ns).text
-                day = to_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-            from_element = start.find(".//ns:From", ns)
-            if from_element is not None:
-                year = from_element.find(".//ns:Year", ns).text
-                month = from_element.find(".//ns:Month", ns).text
-                day = from_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-    return ""
+    return decode_date_period(date_period).text
 
 
 def get_location_value(root, location_id, ns):
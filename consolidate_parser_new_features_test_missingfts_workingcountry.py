@@ -8,6 +8,7 @@ import xml.etree.ElementTree as ET
 import pandas as pd
 from openpyxl import Workbook
 import urllib3
+from date_period import decode_date_period
 
 # Disable InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -150,18 +151,7 @@ def extract_date(element, ns):
     if element is not None:
         date_period = element.find(".//ns:DatePeriod", ns)
         if date_period is not None:
-            start = date_period.find(".//ns:Start", ns)
-            end = date_period.find(".//ns:End", ns)
-            if start is not None and end is not None:
-                start_date = f"{start.find('.//ns:Year', ns).text}-{start.find('.//ns:Month', ns).text}-{start.find('.//ns:Day', ns).text}"
-                end_date = f"{end.find('.//ns:Year', ns).text}-{end.find('.//ns:Month', ns).text}-{end.find('.//ns:Day', ns).text}"
-                return f"{start_date} to {end_date}"
-            elif start is not None:
-                start_date = f"{start.find('.//ns:Year', ns).text}-{start.find('.//ns:Month', ns).text}-{start.find('.//ns:Day', ns).text}"
-                return f"From {start_date}"
-            elif end is not None:
-                end_date = f"{end.find('.//ns:Year', ns).text}-{end.find('.//ns:Month', ns).text}-{end.find('.//ns:Day', ns).text}"
-                return f"Until {end_date}"
+            return decode_date_period(date_period).span
     return ""
 
 
@@ -3,11 +3,85 @@
 # Author: Venkatasai Kadamati
 # Date: 7-12-2024
 
+import hashlib
+import itertools
+import json
+import mmap
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from xml.parsers import expat
 import requests
-import xml.etree.ElementTree as ET
 import pandas as pd
 from openpyxl import Workbook
 import urllib3
+from date_period import (
+    bound_point,
+    decode_date_bounds,
+    decode_date_period,
+    format_point,
+)
+from publication_archive import (
+    ArchiveError,
+    apply_retention,
+    archive_publication,
+    find_publication,
+    report_archive,
+)
+from list_fetcher import ListSource, fetch_lists, state_path_for
+from parse_snapshot import (
+    invalidate_snapshots,
+    load_snapshot,
+    save_snapshot,
+)
+from parallel_workbook import write_workbook_parallel
+from sheet_export import (
+    delimited_path,
+    write_arrow_ipc,
+    write_delimited,
+    write_parquet,
+    write_sqlite,
+)
+from sdn_schema import (
+    SCHEMA_CHILDREN,
+    check_structure,
+    report_schema_drift,
+    schema_path,
+)
+from xml_download import (
+    DOWNLOADED,
+    NOT_MODIFIED,
+    ResumableDownload,
+    conditional_headers,
+    download_file,
+    load_download_state,
+    remove_file,
+    save_download_state,
+    stored_sha256,
+)
+from xml_compression import (
+    compressed_path,
+    detect_compression,
+    open_compressed_writer,
+    open_xml,
+    transfer_decoder,
+    xml_sha256,
+)
+from xml_backends import (
+    available_xml_backends,
+    find,
+    findall,
+    get_xml_backend,
+    local_name,
+    read_root,
+)
 
 # Disable InsecureRequestWarning
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -15,61 +89,338 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 XML_URL = "https://www.treasury.gov/ofac/downloads/sanctions/1.0/sdn_advanced.xml"
 XML_FILE_PATH = "sdn_advanced.xml"
 XLSX_FILE_PATH = "output/sdn_output_names_testnewformat_.xlsx"
-
+# Build each worksheet of the workbook in its own process (parallel_workbook) instead of with openpyxl,
+# in up to XLSX_WORKERS processes
+XLSX_PARALLEL = False
+XLSX_WORKERS = os.cpu_count() or 1
+# Tab-separated copies of the five sheets in the "csv files" layout ("name.csv", "address.csv", ...), written to
+# this directory (e.g. "output/csv", or --csv-dir <dir>); None to skip. DELIMITED_PARALLEL writes each sheet in its
+# own process.
+DELIMITED_OUTPUT_DIR = None
+DELIMITED_PARALLEL = False
+# Write the column names as the first line of every file. The "csv files" reference set is not consistent
+# ("name.csv" has a header, "address.csv" has none); set to False (or --csv-no-header) for headerless files.
+DELIMITED_HEADER = True
+# One Parquet file per sheet ("name.parquet", ...), written next to the workbook; needs pyarrow, None to skip.
+# Row groups hold up to PARQUET_ROW_GROUP_ROWS rows; PARQUET_PARTITION_BY_DESIGNATION writes NAME as a
+# "name/Designation=<value>/" dataset instead of a single file.
+PARQUET_OUTPUT_DIR = None
+PARQUET_ROW_GROUP_ROWS = 32768
+PARQUET_PARTITION_BY_DESIGNATION = False
+# One uncompressed Arrow IPC (Feather V2) file per sheet ("name.arrow", ...) that services memory-map with
+# sheet_export.read_arrow_ipc for zero-copy loading; needs pyarrow, None to skip
+ARROW_OUTPUT_DIR = None
+# SQLite database with one table per sheet, indexed on FixedRef, DocumentedNameID, Country and ID.Value, plus a
+# SANCTIONS_ENTRY_PARTIES table joining the SANCTIONS_ENTRIES rows to their party's FixedRef,
+# e.g. "output/sdn_output.sqlite" (or --sqlite <path>); None to skip
+SQLITE_PATH = None
+# One nested JSON document per DistinctParty (names, features, documents, addresses, sanctions measures),
+# written as each party closes in a streaming pass of its own over the local XML (write_party_jsonl), with the
+# sanctions measures added by a final pass over the file; None to skip
+JSONL_PATH = None
+# ETag / Last-Modified of the last complete download, sent back as If-None-Match / If-Modified-Since;
+# "sdn_advanced.xml.http.json" whether the XML is stored plain or compressed, as for --fetch-lists
+DOWNLOAD_STATE_PATH = state_path_for(XML_FILE_PATH)
+# Downloads are read in DOWNLOAD_CHUNK_SIZE chunks, and retried (resuming with Range requests)
+# up to DOWNLOAD_RETRIES times with a backoff starting at DOWNLOAD_BACKOFF_SECONDS and doubling
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_BACKOFF_SECONDS = 1.0
+# (connect, read) timeouts in seconds
+DOWNLOAD_TIMEOUT = (10, 60)
+# Ask the server for a compressed transfer; "identity" downloads the plain XML
+DOWNLOAD_ACCEPT_ENCODING = "gzip, deflate"
+# Keep the publication on disk as "gzip" (sdn_advanced.xml.gz), "zstd" (.zst, needs zstandard) or plain XML (None).
+# Every PARSE_MODE reads compressed files directly.
+ARCHIVE_COMPRESSION = None
+# Parse the publication while it downloads (expat fed from the response) instead of after it is saved
+PARSE_WHILE_DOWNLOADING = False
+# When parsing while downloading, also archive the XML to XML_FILE_PATH (with ARCHIVE_COMPRESSION)
+ARCHIVE_STREAMED_XML = True
+# Downloaded chunks waiting for the parser; bounds memory when the network is faster than the parser
+PARSE_QUEUE_CHUNKS = 64
+# "stream" parses records with iterparse and drops them as they close (flat memory),
+# "tree" loads the whole document with ET.parse and walks it once,
+# "multipass" loads the whole document and runs the five parsers one after another,
+# "expat" pushes a memory-mapped file through pyexpat and emits rows without building elements
+PARSE_MODE = "stream"
+# "etree" (stdlib, default) or "lxml" (libxml2 parsing and precompiled XPath lookups)
+XML_BACKEND = "etree"
+# Check every record against the ADVANCED_XML schema and report elements it does not define
+STRICT_SCHEMA = False
+# Extracted tables are saved here keyed by the SHA-256 of the (decompressed) XML; re-runs on an unchanged file skip parsing.
+# Set to None to always parse.
+SNAPSHOT_DIR = "output/snapshots"
+# Number of snapshots kept, most recently used first
+SNAPSHOT_KEEP = 5
+# Opt-in archive (a publication is about 100 MB uncompressed, so pair it with ARCHIVE_COMPRESSION): every downloaded
+# publication is kept once, under the SHA-256 of its XML, with its publish date and ETag. Every list has its own
+# subdirectory, "<ARCHIVE_DIR>/sdn", "<ARCHIVE_DIR>/consolidated" (archive_dir_for), so lists never mix.
+# Set it here or with --archive-dir <dir>; run with --archive-id <sha256 prefix | publish date | latest> to process
+# an archived SDN publication, or --list-archive to list them all. None (the default) archives nothing.
+ARCHIVE_DIR = None
+# Retention, applied to each list on its own: keep at most ARCHIVE_KEEP publications and only those seen in the
+# last ARCHIVE_KEEP_DAYS days (None for no limit); the latest publication of a list is always kept
+ARCHIVE_KEEP = 30
+ARCHIVE_KEEP_DAYS = None
+# Lists downloaded concurrently by --fetch-lists, each with its own (connect, read) timeouts.
+# Every list gets its own download state file (state_path_for) and a "<name>_advanced.xlsx" workbook in
+# LIST_OUTPUT_DIR. A list that fails to download or parse is reported and the others carry on.
+LIST_SOURCES = [
+    ListSource("SDN", XML_URL, XML_FILE_PATH, DOWNLOAD_TIMEOUT),
+    ListSource(
+        "CONSOLIDATED",
+        "https://www.treasury.gov/ofac/downloads/consolidated/cons_advanced.xml",
+        "cons_advanced.xml",
+        (10, 120),
+    ),
+]
+LIST_OUTPUT_DIR = "output"
+# Parallel downloads (and pooled connections); parses run in up to LIST_PARSE_WORKERS processes
+LIST_DOWNLOAD_WORKERS = 4
+LIST_PARSE_WORKERS = min(len(LIST_SOURCES), os.cpu_count() or 1)
+
+# ! Changelog : publications are parsed with the namespace of their own root element (detect_namespace);
+# NAMESPACE is the one the SDN list uses, and a publication with another namespace is reported
 NAMESPACE = {
-    # "ns": "http://www.un.org/sanctions/1.0"
     "ns": "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/ADVANCED_XML"
 }
 
 # ! Changelog : deleted mapping dictionaries for feature_type, list_id, sanctions_type
 
+# Sheet columns, shared by the tree and streaming extraction
+FEATURE_FIELDNAMES = ["FixedRef", "FeatureType", "Value", "ReliabilityValue", "Comment"]
+ID_FIELDNAMES = [
+    "FixedRef",
+    "Document_Type_ID",
+    "Document_Type_Name",
+    "Issued_By",
+    "Issuing_Country_ID",
+    "Issuing_Country_Name",
+    "Issue_Date",
+    "Expiration_Date",
+    "Value",
+]
+ADDRESS_FIELDNAMES = [
+    "ID",
+    "FixedRef",
+    "AreaCodeID",
+    "Country",
+    "CountryRelevanceID",
+    "FeatureVersionID",
+    "Unknown",
+    "Region",
+    "Address 1",
+    "Address 2",
+    "Address 3",
+    "City",
+    "State/ Province",
+    "Postal Code",
+    "Script Type",
+]
+NAME_FIELDNAMES = [
+    "FixedRef",
+    "DocumentedNameID",
+    "Designation",
+    "Primary Entry",
+    "Alias Type",
+    "Low Quality",
+    "Acronym",
+    "Script",
+    "Name",
+]
+SANCTIONS_ENTRIES_FIELDNAMES = [
+    "FixedRef",
+    "ListID",
+    "SanctionsTypeID",
+    "SanctionsProgramID",
+]
+SHEET_FIELDNAMES = {
+    "FEATURE": FEATURE_FIELDNAMES,
+    "ID": ID_FIELDNAMES,
+    "ADDRESS": ADDRESS_FIELDNAMES,
+    "SANCTIONS_ENTRIES": SANCTIONS_ENTRIES_FIELDNAMES,
+    "NAME": NAME_FIELDNAMES,
+}
+SHEET_NAMES = list(SHEET_FIELDNAMES)
+
+LOCATION_VALUE_PATH = (
+    "ns:LocationPart[@LocPartTypeID='1']/ns:LocationPartValue/ns:Value"
+)
+
 
 # utility Functions
 # util 1 : latest xml downloader
-def download_xml(url, file_path):
+def download_xml(url, file_path, state_path=DOWNLOAD_STATE_PATH):
     """
     Downloads an XML file from the specified URL and saves it to the given file path.
 
+    The request is conditional on the ETag / Last-Modified of the last complete
+    download, interrupted transfers are retried and resumed, and the file is only
+    replaced once its length is verified, and its checksum when one is known (see
+    xml_download.download_file).
+    The transfer is compressed if the server supports DOWNLOAD_ACCEPT_ENCODING, and
+    the file is stored with ARCHIVE_COMPRESSION.
+
     Args:
         url (str): The URL to download the XML file from.
         file_path (str): The local file path to save the downloaded XML file.
+        state_path (str): The JSON file holding the validators of the last download.
 
     Returns:
-        bool: True if the file was downloaded successfully, False otherwise.
+        str or bool: DOWNLOADED if a new file was saved, NOT_MODIFIED if the local
+            file is still current, False if the download failed.
     """
     try:
         with requests.Session() as session:
-            response = session.get(url, stream=True, verify=False)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            with open(file_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:  # Filter out keep-alive new chunks
-                        file.write(chunk)
-        print("XML file downloaded successfully 🔖")
-        return True
+            return download_file(
+                session,
+                url,
+                file_path,
+                state_path,
+                chunk_size=DOWNLOAD_CHUNK_SIZE,
+                retries=DOWNLOAD_RETRIES,
+                backoff_seconds=DOWNLOAD_BACKOFF_SECONDS,
+                timeout=DOWNLOAD_TIMEOUT,
+                verify=False,
+                accept_encoding=DOWNLOAD_ACCEPT_ENCODING,
+                compression=ARCHIVE_COMPRESSION,
+            )
     except requests.exceptions.RequestException as e:
         print(f"Error downloading XML: {e}")
         return False
 
 
 # util 2 : xml parser
-def parse_xml(file_path):
+def parse_xml(file_path, backend=XML_BACKEND):
     """
     Parses an XML file and returns the tree and root elements.
 
     Args:
         file_path (str): The path to the XML file to be parsed.
+        backend (str): The XML backend to parse with ("etree" or "lxml").
 
     Returns:
         tuple: A tuple containing the parsed XML tree and root element.
     """
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-    return tree, root
+    return get_xml_backend(backend).parse(file_path)
+
+
+# util 2b : streaming xml parser
+def iterparse_xml(file_path, handlers, backend=XML_BACKEND):
+    """
+    Streams an XML file and hands each completed record element to its handlers.
+
+    Records are the elements directly below the top-level sections (DistinctParty,
+    Location, IDRegDocument, SanctionsEntry, ...), plus the top-level sections
+    themselves such as ReferenceValueSets. Handled records are dropped from the
+    partial tree, so memory stays flat.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+        handlers (dict): Local tag names mapped to lists of callables taking the element.
+        backend (str): The XML backend to parse with ("etree" or "lxml").
+    """
+    get_xml_backend(backend).iterparse_records(file_path, handlers)
+
+
+# util 2c : namespace detection
+def detect_namespace(file_path):
+    """
+    Returns the namespace dictionary of a publication, read from its root element.
+
+    Args:
+        file_path (str): The path to the (plain, gzip or zstd) XML file.
+
+    Returns:
+        dict: {"ns": namespace URI} for the parsers.
+
+    Raises:
+        ValueError: If the root is not a namespaced ADVANCED_XML Sanctions element.
+    """
+    namespace, root = read_root(file_path)
+    if root != "Sanctions" or not namespace:
+        root_tag = f"{{{namespace}}}{root}" if namespace else root
+        raise ValueError(
+            f"{file_path} is not an ADVANCED_XML publication (root element {root_tag})"
+        )
+    if namespace != NAMESPACE["ns"]:
+        print(f"{file_path}: namespace {namespace}")
+    return {"ns": namespace}
 
 
 # ! Changelog : added new utility mappers for feature_type, list_id, sanctions_type, reliability_value
-# util 3 : mappings extractor
+# ! Changelog : mappings now come from the ReferenceValues registry (one walk of ReferenceValueSets)
+# util 3 : reference values registry
+class ReferenceValues:
+    """
+    Registry of the *Values tables under ReferenceValueSets.
+
+    The ReferenceValueSets children are indexed in a single walk of the subtree,
+    keyed by table name without the "Values" suffix ("Country", "IDRegDocType",
+    "DetailReference", ...). A table's ID to text dictionary is only built the first
+    time it is requested, so a run that only needs names never builds the
+    detail-reference map.
+    """
+
+    def __init__(self, reference_value_sets):
+        self._tables = {}
+        self._mappings = {}
+        self._attributes = {}
+        for values in reference_value_sets:
+            table = local_name(values.tag)
+            if table.endswith("Values"):
+                self._tables[table[: -len("Values")]] = values
+
+    def __contains__(self, table):
+        return table in self._tables
+
+    def __getitem__(self, table):
+        """Returns the ID to text dictionary of a table, building it on first use."""
+        mapping = self._mappings.get(table)
+        if mapping is None:
+            mapping = {
+                value.attrib["ID"]: value.text for value in self._tables.get(table, ())
+            }
+            self._mappings[table] = mapping
+        return mapping
+
+    @property
+    def tables(self):
+        return list(self._tables)
+
+    def attributes(self, table):
+        """Returns the ID to attribute dictionary of a table, e.g. PartySubType's PartyTypeID."""
+        attributes = self._attributes.get(table)
+        if attributes is None:
+            attributes = {
+                value.attrib["ID"]: dict(value.attrib)
+                for value in self._tables.get(table, ())
+            }
+            self._attributes[table] = attributes
+        return attributes
+
+    def as_dict(self):
+        """Returns every table as an ID to text dictionary, keyed by table name."""
+        return {table: self[table] for table in self._tables}
+
+
+def get_reference_values(root, ns):
+    """
+    Builds the ReferenceValues registry from the root or the ReferenceValueSets element.
+
+    Args:
+        root (Element): The root element, or the ReferenceValueSets element itself.
+        ns (dict): The namespace dictionary for XML parsing.
+
+    Returns:
+        ReferenceValues: The reference values registry.
+    """
+    if root.tag.endswith("}ReferenceValueSets"):
+        return ReferenceValues(root)
+    return ReferenceValues(find(root, "ns:ReferenceValueSets", ns))
+
+
 def get_mappings(root, ns):
     """
     Extracts and returns mappings for country, document type, and feature type from the XML root.
@@ -81,116 +432,196 @@ def get_mappings(root, ns):
     Returns:
         tuple: A tuple containing three dictionaries for country, document type, and feature type mappings.
     """
-    country_mapping = {}
-    country_values = root.find(".//ns:CountryValues", ns)
-    for country in country_values.findall(".//ns:Country", ns):
-        country_id = country.attrib["ID"]
-        country_name = country.text
-        country_mapping[country_id] = country_name
-
-    doc_type_mapping = {}
-    doc_type_values = root.find(".//ns:IDRegDocTypeValues", ns)
-    for doc_type in doc_type_values.findall(".//ns:IDRegDocType", ns):
-        doc_type_id = doc_type.attrib["ID"]
-        doc_type_name = doc_type.text
-        doc_type_mapping[doc_type_id] = doc_type_name
-
-    list_id_mapping = {}
-    list_values = root.find(".//ns:ListValues", ns)
-    for list_item in list_values.findall(".//ns:List", ns):
-        list_id = list_item.attrib["ID"]
-        list_name = list_item.text
-        list_id_mapping[list_id] = list_name
-
-    sanctions_type_mapping = {}
-    sanctions_type_values = root.find(".//ns:SanctionsTypeValues", ns)
-    for sanctions_type in sanctions_type_values.findall(".//ns:SanctionsType", ns):
-        sanctions_type_id = sanctions_type.attrib["ID"]
-        sanctions_type_name = sanctions_type.text
-        sanctions_type_mapping[sanctions_type_id] = sanctions_type_name
-
-    feature_type_mapping = {}
-    feature_type_values = root.find(".//ns:FeatureTypeValues", ns)
-    for feature_type in feature_type_values.findall(".//ns:FeatureType", ns):
-        feature_type_id = feature_type.attrib["ID"]
-        feature_type_name = feature_type.text
-        feature_type_mapping[feature_type_id] = feature_type_name
-
-    reliability_mapping = {}
-    reliability_values = root.find(".//ns:ReliabilityValues", ns)
-    for reliability in reliability_values.findall(".//ns:Reliability", ns):
-        reliability_id = reliability.attrib["ID"]
-        reliability_name = reliability.text
-        reliability_mapping[reliability_id] = reliability_name
-
-    detail_reference_mapping = {}
-    detail_reference_values = root.find(".//ns:DetailReferenceValues", ns)
-    for detail_reference in detail_reference_values.findall(
-        ".//ns:DetailReference", ns
-    ):
-        detail_reference_id = detail_reference.attrib["ID"]
-        detail_reference_name = detail_reference.text
-        detail_reference_mapping[detail_reference_id] = detail_reference_name
-
+    reference_values = get_reference_values(root, ns)
     return (
-        country_mapping,
-        doc_type_mapping,
-        list_id_mapping,
-        sanctions_type_mapping,
-        feature_type_mapping,
-        reliability_mapping,
-        detail_reference_mapping,
+        reference_values["Country"],
+        reference_values["IDRegDocType"],
+        reference_values["List"],
+        reference_values["SanctionsType"],
+        reference_values["FeatureType"],
+        reference_values["Reliability"],
+        reference_values["DetailReference"],
     )
 
 
+# util 4 : name part groups extractor
+def get_name_part_type_map(root, ns):
+    """Maps NamePartGroup IDs to NamePartType IDs for the root or a single DistinctParty."""
+    return {
+        group.attrib["ID"]: group.attrib["NamePartTypeID"]
+        for group in findall(
+            root, schema_path(local_name(root.tag), "NamePartGroup"), ns
+        )
+    }
+
+
 # parser functions
 # parser 1 : feature parser
-def extract_date(date_period, ns):
-    if date_period is not None:
-        end = date_period.find(".//ns:End", ns)
-        if end is not None:
-            to_element = end.find(".//ns:To", ns)
-            if to_element is not None:
-                year = to_element.find(".//ns:Year", ns).text
-                month = to_element.find(".//ns:Month", ns).text
-                day = to_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-            from_element = end.find(".//ns:From", ns)
-            if from_element is not None:
-                year = from_element.find(".//ns:Year", ns).text
-                month = from_element.find(".//ns:Month", ns).text
-                day = from_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-        start = date_period.find(".//ns:Start", ns)
-        if start is not None:
-            to_element = start.find(".//ns:To", ns)
-            if to_element is not None:
-                year = to_element.find(".//ns:Year", ns).text
-                month = to_element.find(".//ns:Month", ns).text
-                day = to_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-            from_element = start.find(".//ns:From", ns)
-            if from_element is not None:
-                year = from_element.find(".//ns:Year", ns).text
-                month = from_element.find(".//ns:Month", ns).text
-                day = from_element.find(".//ns:Day", ns).text
-                return f"{year}-{month}-{day}"
-
-    return ""
-
-
-def get_location_value(root, location_id, ns):
-    location = root.find(f".//ns:Location[@ID='{location_id}']", ns)
-    if location is not None:
-        location_part = location.find(
-            ".//ns:LocationPart[@LocPartTypeID='1']/ns:LocationPartValue/ns:Value", ns
-        )
-        if location_part is not None:
-            return location_part.text
-    return ""
+def index_location(location, ns, location_index):
+    """Adds the LocPartTypeID 1 value of a Location element to the location index."""
+    location_id = location.attrib["ID"]
+    # The first Location with a given ID wins, as with root.find
+    if location_id not in location_index:
+        location_part = find(location, LOCATION_VALUE_PATH, ns)
+        location_index[location_id] = (
+            location_part.text if location_part is not None else ""
+        )
+
+
+def build_location_index(root, ns):
+    """
+    Builds the Location ID index once per document.
+
+    Args:
+        root (Element): The root element of the parsed XML tree.
+        ns (dict): The namespace dictionary for XML parsing.
+
+    Returns:
+        dict: Location IDs mapped to their LocPartTypeID 1 value.
+    """
+    location_index = {}
+    for location in findall(root, schema_path("Sanctions", "Location"), ns):
+        index_location(location, ns, location_index)
+    return location_index
+
+
+def get_location_value(location_index, location_id):
+    return location_index.get(location_id, "")
+
+
+FEATURE_DATE_TYPES = [
+    "Aircraft Manufacture Date",
+    "Birthdate",
+    "Organization Established Date",
+    "Effective Date (EO 14024 Directive 2):",
+    "Effective Date (EO 14024 Directive 3):",
+    "Listing Date (EO 14024 Directive 2):",
+    "Listing Date (EO 14024 Directive 3):",
+]
+FEATURE_LOCATION_COUNTRY_TYPES = [
+    "Citizenship Country",
+    "Nationality Country",
+    "Nationality of Registration",
+    "Registration Country",
+]
+
+
+def get_feature_value(
+    feature_type,
+    date_range,
+    location_attrib,
+    detail_attrib,
+    detail_text,
+    detail_reference_mapping,
+    country_mapping,
+    location_value,
+):
+    """
+    Picks the Value column of a feature row from its first FeatureVersion.
+
+    Args:
+        feature_type (str): The feature type name.
+        date_range (DateRange): The decoded DatePeriod, only read for date feature types.
+        location_attrib (dict): The VersionLocation attributes, or None.
+        detail_attrib (dict): The VersionDetail attributes, or None.
+        detail_text (str): The VersionDetail text.
+        detail_reference_mapping (dict): Detail reference IDs mapped to their values.
+        country_mapping (dict): Country IDs mapped to country names.
+        location_value (callable): Returns the LocPartTypeID 1 value for a LocationID.
+
+    Returns:
+        str: The feature value.
+    """
+    value = ""
+    if feature_type in FEATURE_DATE_TYPES:
+        value = date_range.text
+    elif feature_type == "Location":
+        if location_attrib is not None:
+            value = location_attrib.get("LocationID", "")
+    elif feature_type in FEATURE_LOCATION_COUNTRY_TYPES:
+        if location_attrib is not None:
+            value = location_value(location_attrib.get("LocationID", ""))
+    elif detail_attrib is not None:
+        detail_type_id = detail_attrib.get("DetailTypeID", "")
+        if detail_type_id == "1431":  # LOOKUP
+            detail_reference_id = detail_attrib.get("DetailReferenceID", "")
+            value = detail_reference_mapping.get(detail_reference_id, "")
+        elif detail_type_id == "1432":  # TEXT
+            value = detail_text
+        elif detail_type_id == "1433":  # COUNTRY
+            country_id = detail_attrib.get("CountryID", "")
+            value = country_mapping.get(country_id, "")
+    return value
+
+
+def parse_party_features(
+    party,
+    ns,
+    feature_type_mapping,
+    reliability_mapping,
+    detail_reference_mapping,
+    country_mapping,
+    location_value,
+):
+    """
+    Parses the features of a single DistinctParty element.
+
+    Args:
+        party (Element): The DistinctParty element.
+        ns (dict): The namespace dictionary for XML parsing.
+        feature_type_mapping (dict): Feature type IDs mapped to feature type names.
+        reliability_mapping (dict): Reliability IDs mapped to reliability names.
+        detail_reference_mapping (dict): Detail reference IDs mapped to their values.
+        country_mapping (dict): Country IDs mapped to country names.
+        location_value (callable): Returns the LocPartTypeID 1 value for a LocationID.
+
+    Returns:
+        list: The feature data rows of the party.
+    """
+    data_rows = []
+    fixed_ref = party.attrib["FixedRef"]
+    features = findall(party, schema_path("DistinctParty", "Feature"), ns)
+    for feature in features:
+        feature_type_id = feature.attrib["FeatureTypeID"]
+        feature_type = feature_type_mapping.get(feature_type_id, "")
+        feature_version = find(feature, schema_path("Feature", "FeatureVersion"), ns)
+        reliability_id = feature_version.attrib.get("ReliabilityID", "")
+        reliability_value = reliability_mapping.get(reliability_id, "Unknown")
+        comment = find(feature_version, schema_path("FeatureVersion", "Comment"), ns)
+        comment = comment.text if comment is not None else ""
+
+        date_range = None
+        if feature_type in FEATURE_DATE_TYPES:
+            date_range = decode_date_period(
+                find(feature_version, schema_path("FeatureVersion", "DatePeriod"), ns)
+            )
+        version_location = find(
+            feature_version, schema_path("FeatureVersion", "VersionLocation"), ns
+        )
+        version_detail = find(
+            feature_version, schema_path("FeatureVersion", "VersionDetail"), ns
+        )
+        value = get_feature_value(
+            feature_type,
+            date_range,
+            version_location.attrib if version_location is not None else None,
+            version_detail.attrib if version_detail is not None else None,
+            version_detail.text if version_detail is not None else None,
+            detail_reference_mapping,
+            country_mapping,
+            location_value,
+        )
+
+        data = {
+            "FixedRef": fixed_ref,
+            "FeatureType": feature_type,
+            "Value": value,
+            "ReliabilityValue": reliability_value,
+            "Comment": comment,
+        }
+        data_rows.append(data)
+
+    return data_rows
 
 
 def feature_parser(
@@ -200,258 +631,297 @@ def feature_parser(
     reliability_mapping,
     detail_reference_mapping,
     country_mapping,
+    location_index=None,
 ):
-    fieldnames = ["FixedRef", "FeatureType", "Value", "ReliabilityValue", "Comment"]
     data_rows = []
+    if location_index is None:
+        location_index = build_location_index(root, ns)
 
-    distinct_parties = root.findall(".//ns:DistinctParty", ns)
+    distinct_parties = findall(root, schema_path("Sanctions", "DistinctParty"), ns)
     for party in distinct_parties:
-        fixed_ref = party.attrib["FixedRef"]
-        features = party.findall(".//ns:Feature", ns)
-        for feature in features:
-            feature_type_id = feature.attrib["FeatureTypeID"]
-            feature_type = feature_type_mapping.get(feature_type_id, "")
-            feature_version = feature.find(".//ns:FeatureVersion", ns)
-            reliability_id = feature_version.attrib.get("ReliabilityID", "")
-            reliability_value = reliability_mapping.get(reliability_id, "Unknown")
-            comment = (
-                feature_version.find(".//ns:Comment", ns).text
-                if feature_version.find(".//ns:Comment", ns) is not None
-                else ""
-            )
-
-            value = ""
-
-            if feature_type in [
-                "Aircraft Manufacture Date",
-                "Birthdate",
-                "Organization Established Date",
-                "Effective Date (EO 14024 Directive 2):",
-                "Effective Date (EO 14024 Directive 3):",
-                "Listing Date (EO 14024 Directive 2):",
-                "Listing Date (EO 14024 Directive 3):",
-            ]:
-                date_period = feature_version.find(".//ns:DatePeriod", ns)
-                value = extract_date(date_period, ns)
-            elif feature_type == "Location":
-                version_location = feature_version.find(".//ns:VersionLocation", ns)
-                if version_location is not None:
-                    location_id = version_location.attrib.get("LocationID", "")
-                    value = location_id
-            elif feature_type in [
-                "Citizenship Country",
-                "Nationality Country",
-                "Nationality of Registration",
-                "Registration Country",
-            ]:
-                version_location = feature_version.find(".//ns:VersionLocation", ns)
-                if version_location is not None:
-                    location_id = version_location.attrib.get("LocationID", "")
-                    location = root.find(f".//ns:Location[@ID='{location_id}']", ns)
-                    if location is not None:
-                        location_part = location.find(
-                            ".//ns:LocationPart[@LocPartTypeID='1']/ns:LocationPartValue/ns:Value",
-                            ns,
-                        )
-                        if location_part is not None:
-                            value = location_part.text
-            else:
-                version_detail = feature_version.find(".//ns:VersionDetail", ns)
-                if version_detail is not None:
-                    detail_type_id = version_detail.attrib.get("DetailTypeID", "")
-                    if detail_type_id == "1431":  # LOOKUP
-                        detail_reference_id = version_detail.attrib.get(
-                            "DetailReferenceID", ""
-                        )
-                        value = detail_reference_mapping.get(detail_reference_id, "")
-                    elif detail_type_id == "1432":  # TEXT
-                        value = version_detail.text
-                    elif detail_type_id == "1433":  # COUNTRY
-                        country_id = version_detail.attrib.get("CountryID", "")
-                        value = country_mapping.get(country_id, "")
-
-            data = {
-                "FixedRef": fixed_ref,
-                "FeatureType": feature_type,
-                "Value": value,
-                "ReliabilityValue": reliability_value,
-                "Comment": comment,
-            }
-            data_rows.append(data)
+        data_rows.extend(
+            parse_party_features(
+                party,
+                ns,
+                feature_type_mapping,
+                reliability_mapping,
+                detail_reference_mapping,
+                country_mapping,
+                lambda location_id: get_location_value(location_index, location_id),
+            )
+        )
 
-    return fieldnames, data_rows
+    return FEATURE_FIELDNAMES, data_rows
 
 
 # parser 2 : id parser
-def id_parser(root, ns, country_mapping, doc_type_mapping):
+def parse_id_document(idregdocument, ns, country_mapping, doc_type_mapping, fixed_ref):
+    """Parses a single IDRegDocument element into an ID data row."""
+    document_type_id = idregdocument.attrib["IDRegDocTypeID"]
+    document_type_name = doc_type_mapping.get(document_type_id, "Unknown Document Type")
+    issued_by = find(
+        idregdocument, schema_path("IDRegDocument", "IssuingAuthority"), ns
+    )
+    issued_by = issued_by.text if issued_by is not None else ""
+    issued_by_country_id = idregdocument.attrib.get("IssuedBy-CountryID", "")
+    issued_by_country_name = country_mapping.get(
+        issued_by_country_id, "Unknown Country"
+    )
+    value = find(idregdocument, schema_path("IDRegDocument", "IDRegistrationNo"), ns)
+    value = value.text if value is not None else ""
+    date_ranges = []
+    for documentdate in findall(
+        idregdocument, schema_path("IDRegDocument", "DocumentDate"), ns
+    ):
+        dateperiod = find(documentdate, schema_path("DocumentDate", "DatePeriod"), ns)
+        if dateperiod is not None:
+            date_ranges.append(decode_date_period(dateperiod))
+
+    return build_id_row(
+        fixed_ref,
+        document_type_id,
+        document_type_name,
+        issued_by,
+        issued_by_country_id,
+        issued_by_country_name,
+        date_ranges,
+        value,
+    )
+
+
+def build_id_row(
+    fixed_ref,
+    document_type_id,
+    document_type_name,
+    issued_by,
+    issued_by_country_id,
+    issued_by_country_name,
+    date_ranges,
+    value,
+):
+    """Builds an ID data row; the last DocumentDate with a Start/End sets the issue/expiration date."""
+    issue_date = ""
+    expiration_date = ""
+    for date_range in date_ranges:
+        if date_range.start is not None:
+            issue_date = format_point(bound_point(date_range.start))
+        if date_range.end is not None:
+            expiration_date = format_point(bound_point(date_range.end))
+
+    return {
+        "FixedRef": fixed_ref,
+        "Document_Type_ID": document_type_id,
+        "Document_Type_Name": document_type_name,
+        "Issued_By": issued_by,
+        "Issuing_Country_ID": issued_by_country_id,
+        "Issuing_Country_Name": issued_by_country_name,
+        "Issue_Date": issue_date,
+        "Expiration_Date": expiration_date,
+        "Value": value,
+    }
+
+
+def index_identities(party, ns, identity_index):
+    """Adds the Identities of a DistinctParty element to the identity index."""
+    for profile in findall(party, schema_path("DistinctParty", "Profile"), ns):
+        profile_id = profile.attrib.get("ID", "")
+        party_subtype_id = profile.attrib.get("PartySubTypeID", "")
+        for identity in findall(profile, schema_path("Profile", "Identity"), ns):
+            # The first Identity with a given ID wins, as with root.find
+            identity_index.setdefault(
+                identity.attrib["ID"],
+                (identity.attrib["FixedRef"], profile_id, party_subtype_id),
+            )
+
+
+def build_identity_index(root, ns):
+    """
+    Builds the Identity ID index once per document and reports its build cost.
+
+    Args:
+        root (Element): The root element of the parsed XML tree.
+        ns (dict): The namespace dictionary for XML parsing.
+
+    Returns:
+        dict: Identity IDs mapped to (FixedRef, ProfileID, PartySubTypeID) tuples.
+    """
+    start = time.perf_counter()
+    identity_index = {}
+    for party in findall(root, schema_path("Sanctions", "DistinctParty"), ns):
+        index_identities(party, ns, identity_index)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"Identity index: {len(identity_index)} identities in {elapsed_ms:.1f} ms")
+    return identity_index
+
+
+def report_identity_hits(hits, lookups):
+    """Prints how many IDRegDocuments were resolved through the identity index."""
+    hit_rate = hits / lookups * 100 if lookups else 100.0
+    print(f"Identity index: {hits}/{lookups} IDRegDocuments resolved ({hit_rate:.1f}%)")
+
+
+def build_party_links(identity_index, entry_profiles):
+    """
+    Returns the links write_sqlite needs on top of the sheet rows, gathered in the
+    same pass: which party owns each Profile, and which Profile each SanctionsEntry
+    sanctions (the SANCTIONS_ENTRIES rows only carry the SanctionsEntry ID).
+
+    Args:
+        identity_index (dict): Identity IDs mapped to (FixedRef, ProfileID, PartySubTypeID) tuples.
+        entry_profiles (dict): SanctionsEntry IDs mapped to their ProfileID.
+
+    Returns:
+        dict: "profiles" (Profile IDs mapped to the FixedRef of their party, in document
+            order) and "sanctions_entries" (SanctionsEntry IDs mapped to their ProfileID).
+    """
+    profiles = {}
+    for fixed_ref, profile_id, party_subtype_id in identity_index.values():
+        profiles.setdefault(profile_id, fixed_ref)
+    return {"profiles": profiles, "sanctions_entries": dict(entry_profiles)}
+
+
+def id_parser(root, ns, country_mapping, doc_type_mapping, identity_index=None):
     """Parses ID registration documents from the XML root and returns field names and data rows."""
-    fieldnames = [
-        "FixedRef",
-        "Document_Type_ID",
-        "Document_Type_Name",
-        "Issued_By",
-        "Issuing_Country_ID",
-        "Issuing_Country_Name",
-        "Issue_Date",
-        "Expiration_Date",
-        "Value",
-    ]
     data_rows = []
+    if identity_index is None:
+        identity_index = build_identity_index(root, ns)
 
-    for idregdocument in root.findall(".//ns:IDRegDocument", ns):
+    lookups = 0
+    for idregdocument in findall(root, schema_path("Sanctions", "IDRegDocument"), ns):
         identity_id = idregdocument.attrib["IdentityID"]
-        distinct_party = root.find(
-            f".//ns:DistinctParty/ns:Profile/ns:Identity[@ID='{identity_id}']", ns
-        )
-        if distinct_party is not None:
-            fixed_ref = distinct_party.attrib["FixedRef"]
-            document_type_id = idregdocument.attrib["IDRegDocTypeID"]
-            document_type_name = doc_type_mapping.get(
-                document_type_id, "Unknown Document Type"
-            )
-            issued_by = (
-                idregdocument.find(".//ns:IssuingAuthority", ns).text
-                if idregdocument.find(".//ns:IssuingAuthority", ns) is not None
-                else ""
-            )
-            issued_by_country_id = idregdocument.attrib.get("IssuedBy-CountryID", "")
-            issued_by_country_name = country_mapping.get(
-                issued_by_country_id, "Unknown Country"
-            )
-            value = (
-                idregdocument.find(".//ns:IDRegistrationNo", ns).text
-                if idregdocument.find(".//ns:IDRegistrationNo", ns) is not None
-                else ""
-            )
-            issue_date = ""
-            expiration_date = ""
-
-            for documentdate in idregdocument.findall(".//ns:DocumentDate", ns):
-                idregdocdatetypeid = documentdate.attrib["IDRegDocDateTypeID"]
-                dateperiod = documentdate.find(".//ns:DatePeriod", ns)
-                if dateperiod is not None:
-                    start = dateperiod.find(".//ns:Start", ns)
-                    if start is not None:
-                        start_year = (
-                            start.find(".//ns:Year", ns).text
-                            if start.find(".//ns:Year", ns) is not None
-                            else ""
-                        )
-                        start_month = (
-                            start.find(".//ns:Month", ns).text
-                            if start.find(".//ns:Month", ns) is not None
-                            else ""
-                        )
-                        start_day = (
-                            start.find(".//ns:Day", ns).text
-                            if start.find(".//ns:Day", ns) is not None
-                            else ""
-                        )
-                        issue_date = f"{start_year}-{start_month}-{start_day}"
-                    end = dateperiod.find(".//ns:End", ns)
-                    if end is not None:
-                        end_year = (
-                            end.find(".//ns:Year", ns).text
-                            if end.find(".//ns:Year", ns) is not None
-                            else ""
-                        )
-                        end_month = (
-                            end.find(".//ns:Month", ns).text
-                            if end.find(".//ns:Month", ns) is not None
-                            else ""
-                        )
-                        end_day = (
-                            end.find(".//ns:Day", ns).text
-                            if end.find(".//ns:Day", ns) is not None
-                            else ""
-                        )
-                        expiration_date = f"{end_year}-{end_month}-{end_day}"
-                if idregdocdatetypeid == "1480":
-                    issue_date = issue_date
-                elif idregdocdatetypeid == "1481":
-                    expiration_date = expiration_date
-
-            data = {
-                "FixedRef": fixed_ref,
-                "Document_Type_ID": document_type_id,
-                "Document_Type_Name": document_type_name,
-                "Issued_By": issued_by,
-                "Issuing_Country_ID": issued_by_country_id,
-                "Issuing_Country_Name": issued_by_country_name,
-                "Issue_Date": issue_date,
-                "Expiration_Date": expiration_date,
-                "Value": value,
-            }
+        lookups += 1
+        identity = identity_index.get(identity_id)
+        if identity is not None:
+            fixed_ref = identity[0]
+            data = parse_id_document(
+                idregdocument, ns, country_mapping, doc_type_mapping, fixed_ref
+            )
             data_rows.append(data)
-    return fieldnames, data_rows
+    report_identity_hits(len(data_rows), lookups)
+    return ID_FIELDNAMES, data_rows
 
 
 # parser 3 : address parser
-def address_parser(root, ns, country_mapping):
-    """Parses addresses from the XML root and returns field names and data rows."""
-    fieldnames = [
-        "ID",
-        "FixedRef",
-        "AreaCodeID",
-        "Country",
-        "CountryRelevanceID",
-        "FeatureVersionID",
-        "Unknown",
-        "Region",
-        "Address 1",
-        "Address 2",
-        "Address 3",
-        "City",
-        "State/ Province",
-        "Postal Code",
-        "Script Type",
-    ]
-    data_rows = []
+def map_feature_versions(party, ns, feature_to_fixed_ref):
+    """Maps every FeatureVersion ID of a DistinctParty element to the party's FixedRef."""
+    fixed_ref = party.attrib["FixedRef"]
+    for feature in findall(party, schema_path("DistinctParty", "Feature"), ns):
+        for version in findall(feature, schema_path("Feature", "FeatureVersion"), ns):
+            feature_version_id = version.attrib["ID"]
+            feature_to_fixed_ref[feature_version_id] = fixed_ref
 
-    # Create a mapping from FeatureVersionID to FixedRef
-    feature_to_fixed_ref = {}
-    for party in root.findall(".//ns:DistinctParty", ns):
-        fixed_ref = party.attrib["FixedRef"]
-        for feature in party.findall(".//ns:Feature", ns):
-            for version in feature.findall(".//ns:FeatureVersion", ns):
-                feature_version_id = version.attrib["ID"]
-                feature_to_fixed_ref[feature_version_id] = fixed_ref
 
-    # Track the first occurrence of each ID to set the Script Type to "Latin"
-    first_occurrence = set()
+def parse_location_addresses(
+    location, ns, country_mapping, feature_to_fixed_ref, first_occurrence
+):
+    """
+    Parses a single Location element into its Latin and non-Latin address rows.
 
-    # Process each Location and write data to CSV
-    locations = root.findall(".//ns:Location", ns)
-    for location in locations:
-        location_id = location.attrib["ID"]
-        area_code_id = location.find(".//ns:LocationAreaCode", ns)
-        area_code_id = (
-            area_code_id.attrib["AreaCodeID"] if area_code_id is not None else ""
-        )
+    Args:
+        location (Element): The Location element.
+        ns (dict): The namespace dictionary for XML parsing.
+        country_mapping (dict): Country IDs mapped to country names.
+        feature_to_fixed_ref (dict): FeatureVersion IDs mapped to FixedRefs.
+        first_occurrence (set): Location IDs that already have a Latin row.
 
-        country = location.find(".//ns:LocationCountry", ns)
-        country_id = country.attrib["CountryID"] if country is not None else ""
+    Returns:
+        list: The address data rows of the location.
+    """
+    location_id = location.attrib["ID"]
+    area_code_id = find(location, schema_path("Location", "LocationAreaCode"), ns)
+    area_code_id = area_code_id.attrib["AreaCodeID"] if area_code_id is not None else ""
 
-        # Highlight: Added condition to set country to "undetermined" for area code 11291
-        if area_code_id == "11291" and not country_id:
-            country_name = "undetermined"
-        else:
-            country_name = country_mapping.get(country_id, "")
+    country = find(location, schema_path("Location", "LocationCountry"), ns)
+    country_id = country.attrib["CountryID"] if country is not None else ""
 
-        feature_version_ref = location.find(".//ns:FeatureVersionReference", ns)
-        feature_version_id = (
-            feature_version_ref.attrib["FeatureVersionID"]
-            if feature_version_ref is not None
-            else ""
-        )
+    feature_version_ref = find(
+        location, schema_path("Location", "FeatureVersionReference"), ns
+    )
+    feature_version_id = (
+        feature_version_ref.attrib["FeatureVersionID"]
+        if feature_version_ref is not None
+        else ""
+    )
 
-        # Initialize data dictionary
-        data = {
-            "ID": location_id,
-            "FixedRef": feature_to_fixed_ref.get(feature_version_id, ""),
-            "AreaCodeID": area_code_id,
-            "Country": country_name,  # Highlight: Use the updated country_name
-            "FeatureVersionID": feature_version_id,
+    parts = []
+    for part in findall(location, schema_path("Location", "LocationPart"), ns):
+        part_type_id = part.attrib["LocPartTypeID"]
+        for part_value in findall(
+            part, schema_path("LocationPart", "LocationPartValue"), ns
+        ):
+            value = find(part_value, schema_path("LocationPartValue", "Value"), ns)
+            value = value.text if value is not None else ""
+            comment = find(part_value, schema_path("LocationPartValue", "Comment"), ns)
+            comment = comment.text if comment is not None else ""
+            parts.append((part_type_id, value, comment))
+
+    return build_address_rows(
+        location_id,
+        area_code_id,
+        country_id,
+        feature_version_id,
+        parts,
+        country_mapping,
+        feature_to_fixed_ref,
+        first_occurrence,
+    )
+
+
+def build_address_rows(
+    location_id,
+    area_code_id,
+    country_id,
+    feature_version_id,
+    parts,
+    country_mapping,
+    feature_to_fixed_ref,
+    first_occurrence,
+):
+    """
+    Builds the Latin and non-Latin address rows of a Location.
+
+    Args:
+        location_id (str): The Location ID.
+        area_code_id (str): The LocationAreaCode's AreaCodeID, or "".
+        country_id (str): The LocationCountry's CountryID, or "".
+        feature_version_id (str): The FeatureVersionReference's FeatureVersionID, or "".
+        parts (list): (LocPartTypeID, value, comment) tuples, one per LocationPartValue.
+        country_mapping (dict): Country IDs mapped to country names.
+        feature_to_fixed_ref (dict): FeatureVersion IDs mapped to FixedRefs.
+        first_occurrence (set): Location IDs that already have a Latin row.
+
+    Returns:
+        list: The address data rows of the location.
+    """
+    data_rows = []
+
+    # Highlight: Added condition to set country to "undetermined" for area code 11291
+    if area_code_id == "11291" and not country_id:
+        country_name = "undetermined"
+    else:
+        country_name = country_mapping.get(country_id, "")
+
+    # Initialize data dictionary
+    data = {
+        "ID": location_id,
+        "FixedRef": feature_to_fixed_ref.get(feature_version_id, ""),
+        "AreaCodeID": area_code_id,
+        "Country": country_name,  # Highlight: Use the updated country_name
+        "FeatureVersionID": feature_version_id,
+        "Unknown": "",
+        "Region": "",
+        "Address 1": "",
+        "Address 2": "",
+        "Address 3": "",
+        "City": "",
+        "State/ Province": "",
+        "Postal Code": "",
+        "Script Type": "",
+    }
+
+    # Collect non-Latin script values
+    non_latin_data = {
+        "Chinese Simplified": {
             "Unknown": "",
             "Region": "",
             "Address 1": "",
@@ -460,446 +930,2353 @@ def address_parser(root, ns, country_mapping):
             "City": "",
             "State/ Province": "",
             "Postal Code": "",
-            "Script Type": "",
-        }
+        },
+        "Chinese Traditional": {
+            "Unknown": "",
+            "Region": "",
+            "Address 1": "",
+            "Address 2": "",
+            "Address 3": "",
+            "City": "",
+            "State/ Province": "",
+            "Postal Code": "",
+        },
+        "Cyrillic": {
+            "Unknown": "",
+            "Region": "",
+            "Address 1": "",
+            "Address 2": "",
+            "Address 3": "",
+            "City": "",
+            "State/ Province": "",
+            "Postal Code": "",
+        },
+        "Arabic": {
+            "Unknown": "",
+            "Region": "",
+            "Address 1": "",
+            "Address 2": "",
+            "Address 3": "",
+            "City": "",
+            "State/ Province": "",
+            "Postal Code": "",
+        },
+        "Japanese": {
+            "Unknown": "",
+            "Region": "",
+            "Address 1": "",
+            "Address 2": "",
+            "Address 3": "",
+            "City": "",
+            "State/ Province": "",
+            "Postal Code": "",
+        },
+    }
+
+    for part_type_id, value, comment in parts:
+        if not comment:
+            if part_type_id == "1":
+                data["Unknown"] = value
+            elif part_type_id == "1450":
+                data["Region"] = value
+            elif part_type_id == "1451":
+                data["Address 1"] = value
+            elif part_type_id == "1452":
+                data["Address 2"] = value
+            elif part_type_id == "1453":
+                data["Address 3"] = value
+            elif part_type_id == "1454":
+                data["City"] = value
+            elif part_type_id == "1455":
+                data["State/ Province"] = value
+            elif part_type_id == "1456":
+                data["Postal Code"] = value
+        else:
+            if comment not in non_latin_data:
+                non_latin_data[comment] = {
+                    "Unknown": "",
+                    "Region": "",
+                    "Address 1": "",
+                    "Address 2": "",
+                    "Address 3": "",
+                    "City": "",
+                    "State/ Province": "",
+                    "Postal Code": "",
+                }
+
+            if part_type_id == "1":
+                non_latin_data[comment]["Unknown"] = value
+            elif part_type_id == "1450":
+                non_latin_data[comment]["Region"] = value
+            elif part_type_id == "1451":
+                non_latin_data[comment]["Address 1"] = value
+            elif part_type_id == "1452":
+                non_latin_data[comment]["Address 2"] = value
+            elif part_type_id == "1453":
+                non_latin_data[comment]["Address 3"] = value
+            elif part_type_id == "1454":
+                non_latin_data[comment]["City"] = value
+            elif part_type_id == "1455":
+                non_latin_data[comment]["State/ Province"] = value
+            elif part_type_id == "1456":
+                non_latin_data[comment]["Postal Code"] = value
+
+    # Set Script Type to "Latin" for the first occurrence of each ID
+    if data["ID"] not in first_occurrence:
+        data["Script Type"] = "Latin"
+        first_occurrence.add(data["ID"])
+
+    # Add the Latin script values to data_rows
+    data_rows.append(data)
+
+    # Add the non-Latin script values to data_rows
+    for script_type, values in non_latin_data.items():
+        if (
+            values["Unknown"]
+            or values["Region"]
+            or values["Address 1"]
+            or values["Address 2"]
+            or values["Address 3"]
+            or values["City"]
+            or values["State/ Province"]
+            or values["Postal Code"]
+        ):
+            non_latin_row = data.copy()
+            non_latin_row["Unknown"] = values["Unknown"]
+            non_latin_row["Region"] = values["Region"]
+            non_latin_row["Address 1"] = values["Address 1"]
+            non_latin_row["Address 2"] = values["Address 2"]
+            non_latin_row["Address 3"] = values["Address 3"]
+            non_latin_row["City"] = values["City"]
+            non_latin_row["State/ Province"] = values["State/ Province"]
+            non_latin_row["Postal Code"] = values["Postal Code"]
+            non_latin_row["Script Type"] = script_type
+            data_rows.append(non_latin_row)
+
+    return data_rows
 
-        # Collect non-Latin script values
-        non_latin_data = {
-            "Chinese Simplified": {
-                "Unknown": "",
-                "Region": "",
-                "Address 1": "",
-                "Address 2": "",
-                "Address 3": "",
-                "City": "",
-                "State/ Province": "",
-                "Postal Code": "",
-            },
-            "Chinese Traditional": {
-                "Unknown": "",
-                "Region": "",
-                "Address 1": "",
-                "Address 2": "",
-                "Address 3": "",
-                "City": "",
-                "State/ Province": "",
-                "Postal Code": "",
-            },
-            "Cyrillic": {
-                "Unknown": "",
-                "Region": "",
-                "Address 1": "",
-                "Address 2": "",
-                "Address 3": "",
-                "City": "",
-                "State/ Province": "",
-                "Postal Code": "",
-            },
-            "Arabic": {
-                "Unknown": "",
-                "Region": "",
-                "Address 1": "",
-                "Address 2": "",
-                "Address 3": "",
-                "City": "",
-                "State/ Province": "",
-                "Postal Code": "",
-            },
-            "Japanese": {
-                "Unknown": "",
-                "Region": "",
-                "Address 1": "",
-                "Address 2": "",
-                "Address 3": "",
-                "City": "",
-                "State/ Province": "",
-                "Postal Code": "",
-            },
-        }
 
-        for part in location.findall(".//ns:LocationPart", ns):
-            part_type_id = part.attrib["LocPartTypeID"]
-            for part_value in part.findall(".//ns:LocationPartValue", ns):
-                value = (
-                    part_value.find(".//ns:Value", ns).text
-                    if part_value.find(".//ns:Value", ns) is not None
-                    else ""
-                )
-                comment = (
-                    part_value.find(".//ns:Comment", ns).text
-                    if part_value.find(".//ns:Comment", ns) is not None
-                    else ""
-                )
+def address_parser(root, ns, country_mapping):
+    """Parses addresses from the XML root and returns field names and data rows."""
+    data_rows = []
 
-                if not comment:
-                    if part_type_id == "1":
-                        data["Unknown"] = value
-                    elif part_type_id == "1450":
-                        data["Region"] = value
-                    elif part_type_id == "1451":
-                        data["Address 1"] = value
-                    elif part_type_id == "1452":
-                        data["Address 2"] = value
-                    elif part_type_id == "1453":
-                        data["Address 3"] = value
-                    elif part_type_id == "1454":
-                        data["City"] = value
-                    elif part_type_id == "1455":
-                        data["State/ Province"] = value
-                    elif part_type_id == "1456":
-                        data["Postal Code"] = value
-                else:
-                    if comment not in non_latin_data:
-                        non_latin_data[comment] = {
-                            "Unknown": "",
-                            "Region": "",
-                            "Address 1": "",
-                            "Address 2": "",
-                            "Address 3": "",
-                            "City": "",
-                            "State/ Province": "",
-                            "Postal Code": "",
-                        }
-
-                    if part_type_id == "1":
-                        non_latin_data[comment]["Unknown"] = value
-                    elif part_type_id == "1450":
-                        non_latin_data[comment]["Region"] = value
-                    elif part_type_id == "1451":
-                        non_latin_data[comment]["Address 1"] = value
-                    elif part_type_id == "1452":
-                        non_latin_data[comment]["Address 2"] = value
-                    elif part_type_id == "1453":
-                        non_latin_data[comment]["Address 3"] = value
-                    elif part_type_id == "1454":
-                        non_latin_data[comment]["City"] = value
-                    elif part_type_id == "1455":
-                        non_latin_data[comment]["State/ Province"] = value
-                    elif part_type_id == "1456":
-                        non_latin_data[comment]["Postal Code"] = value
-
-        # Set Script Type to "Latin" for the first occurrence of each ID
-        if data["ID"] not in first_occurrence:
-            data["Script Type"] = "Latin"
-            first_occurrence.add(data["ID"])
-
-        # Add the Latin script values to data_rows
-        data_rows.append(data)
+    # Create a mapping from FeatureVersionID to FixedRef
+    feature_to_fixed_ref = {}
+    for party in findall(root, schema_path("Sanctions", "DistinctParty"), ns):
+        map_feature_versions(party, ns, feature_to_fixed_ref)
+
+    # Track the first occurrence of each ID to set the Script Type to "Latin"
+    first_occurrence = set()
+
+    # Process each Location and write data to CSV
+    locations = findall(root, schema_path("Sanctions", "Location"), ns)
+    for location in locations:
+        data_rows.extend(
+            parse_location_addresses(
+                location, ns, country_mapping, feature_to_fixed_ref, first_occurrence
+            )
+        )
+
+    return ADDRESS_FIELDNAMES, data_rows
+
+
+# parser 4 : name parser
+def format_name(name_parts, name_part_type_map):
+    """Formats a DocumentedName from (NamePartGroupID, NamePartValue text) pairs."""
+    name_dict = {
+        "Last Name": [],
+        "First Name": "",
+        "Middle Name": "",
+        "Maiden Name": "",
+        "Patronymic": "",
+        "Matronymic": "",
+        "Nickname": "",
+        "Entity Name": "",
+        "Aircraft Name": "",
+        "Vessel Name": "",
+    }
+
+    for name_part_group_id, name_part_text in name_parts:
+        name_part_value = name_part_text.strip('"')
+        name_part_type_id = name_part_type_map.get(name_part_group_id, None)
+        if name_part_type_id == "1520":
+            name_dict["Last Name"].append(name_part_value)
+        elif name_part_type_id == "1521":
+            name_dict["First Name"] = name_part_value
+        elif name_part_type_id == "1522":
+            name_dict["Middle Name"] = name_part_value
+        elif name_part_type_id == "1523":
+            name_dict["Maiden Name"] = name_part_value
+        elif name_part_type_id == "91708":
+            name_dict["Patronymic"] = name_part_value
+        elif name_part_type_id == "91709":
+            name_dict["Matronymic"] = name_part_value
+        elif name_part_type_id == "1528":
+            name_dict["Nickname"] = name_part_value
+        elif name_part_type_id == "1525":
+            name_dict["Entity Name"] = name_part_value
+        elif name_part_type_id == "1524":
+            name_dict["Aircraft Name"] = name_part_value
+        elif name_part_type_id == "1526":
+            name_dict["Vessel Name"] = name_part_value
+
+    formatted_name = ""
+    if name_dict["Last Name"]:
+        formatted_name += " ".join(name_dict["Last Name"])
+    if name_dict["First Name"]:
+        formatted_name += (
+            ", " + name_dict["First Name"]
+            if formatted_name
+            else name_dict["First Name"]
+        )
+    if name_dict["Middle Name"]:
+        formatted_name += " " + name_dict["Middle Name"]
+    if name_dict["Maiden Name"]:
+        formatted_name += " " + name_dict["Maiden Name"]
+    if name_dict["Patronymic"]:
+        formatted_name += " " + name_dict["Patronymic"]
+    if name_dict["Matronymic"]:
+        formatted_name += " " + name_dict["Matronymic"]
+    if name_dict["Nickname"]:
+        formatted_name = (
+            name_dict["Nickname"]
+            if not formatted_name
+            else formatted_name + " (" + name_dict["Nickname"] + ")"
+        )
+    if name_dict["Entity Name"]:
+        formatted_name = name_dict["Entity Name"]
+    if name_dict["Aircraft Name"]:
+        formatted_name = name_dict["Aircraft Name"]
+    if name_dict["Vessel Name"]:
+        formatted_name = name_dict["Vessel Name"]
+
+    return formatted_name.strip()
+
+
+def get_designation(party_subtype_id):
+    if party_subtype_id == "1":
+        return "Vessel"
+    elif party_subtype_id == "2":
+        return "Aircraft"
+    elif party_subtype_id == "3":
+        return "Business"
+    elif party_subtype_id == "4":
+        return "Individual"
+    else:
+        return "Unknown"
+
+
+def parse_party_names(
+    party, ns, script_values, alias_type_values, name_part_type_map, seen_records
+):
+    """
+    Parses the documented names of a single DistinctParty element.
 
-        # Add the non-Latin script values to data_rows
-        for script_type, values in non_latin_data.items():
-            if (
-                values["Unknown"]
-                or values["Region"]
-                or values["Address 1"]
-                or values["Address 2"]
-                or values["Address 3"]
-                or values["City"]
-                or values["State/ Province"]
-                or values["Postal Code"]
-            ):
-                non_latin_row = data.copy()
-                non_latin_row["Unknown"] = values["Unknown"]
-                non_latin_row["Region"] = values["Region"]
-                non_latin_row["Address 1"] = values["Address 1"]
-                non_latin_row["Address 2"] = values["Address 2"]
-                non_latin_row["Address 3"] = values["Address 3"]
-                non_latin_row["City"] = values["City"]
-                non_latin_row["State/ Province"] = values["State/ Province"]
-                non_latin_row["Postal Code"] = values["Postal Code"]
-                non_latin_row["Script Type"] = script_type
-                data_rows.append(non_latin_row)
-
-    return fieldnames, data_rows
+    Args:
+        party (Element): The DistinctParty element.
+        ns (dict): The namespace dictionary for XML parsing.
+        script_values (dict): Script IDs mapped to script names.
+        alias_type_values (dict): Alias type IDs mapped to alias type names.
+        name_part_type_map (dict): NamePartGroup IDs mapped to NamePartType IDs.
+        seen_records (set): Name records already emitted, used to drop duplicates.
+
+    Returns:
+        list: The name data rows of the party.
+    """
+    data_rows = []
+    fixed_ref = party.attrib["FixedRef"]
+    for profile in findall(party, schema_path("DistinctParty", "Profile"), ns):
+        party_subtype_id = profile.attrib["PartySubTypeID"]
+        designation = get_designation(party_subtype_id)
+        for identity in findall(profile, schema_path("Profile", "Identity"), ns):
+            for alias in findall(identity, schema_path("Identity", "Alias"), ns):
+                alias_type_id = alias.attrib["AliasTypeID"]
+                alias_type = alias_type_values.get(alias_type_id, "Unknown")
+                low_quality = alias.attrib["LowQuality"]
+                primary_entry = alias.attrib["Primary"]
+                for documented_name in findall(
+                    alias, schema_path("Alias", "DocumentedName"), ns
+                ):
+                    documented_name_id = documented_name.attrib["ID"]
+                    name_parts = findall(
+                        documented_name,
+                        schema_path("DocumentedName", "NamePartValue"),
+                        ns,
+                    )
+                    name = format_name(
+                        [
+                            (part.attrib["NamePartGroupID"], part.text)
+                            for part in name_parts
+                        ],
+                        name_part_type_map,
+                    )
+                    script_id = (
+                        name_parts[0].attrib["ScriptID"] if name_parts else "Unknown"
+                    )
+                    script = script_values.get(script_id, "Unknown")
+                    acronym = name_parts[0].attrib["Acronym"] if name_parts else "false"
+                    record = (
+                        fixed_ref,
+                        documented_name_id,
+                        designation,
+                        primary_entry,
+                        alias_type,
+                        low_quality,
+                        acronym,
+                        script,
+                        name,
+                    )
+                    if record not in seen_records:
+                        data_rows.append(record)
+                        seen_records.add(record)
+
+    return data_rows
 
 
 def name_parser(
     root, ns, script_values, party_subtype_values, alias_type_values, name_part_type_map
 ):
-    def format_name(name_parts):
-        name_dict = {
-            "Last Name": [],
-            "First Name": "",
-            "Middle Name": "",
-            "Maiden Name": "",
-            "Patronymic": "",
-            "Matronymic": "",
-            "Nickname": "",
-            "Entity Name": "",
-            "Aircraft Name": "",
-            "Vessel Name": "",
-        }
-
-        for part in name_parts:
-            name_part_group_id = part.attrib["NamePartGroupID"]
-            name_part_value = part.text.strip('"')
-            name_part_type_id = name_part_type_map.get(name_part_group_id, None)
-            if name_part_type_id == "1520":
-                name_dict["Last Name"].append(name_part_value)
-            elif name_part_type_id == "1521":
-                name_dict["First Name"] = name_part_value
-            elif name_part_type_id == "1522":
-                name_dict["Middle Name"] = name_part_value
-            elif name_part_type_id == "1523":
-                name_dict["Maiden Name"] = name_part_value
-            elif name_part_type_id == "91708":
-                name_dict["Patronymic"] = name_part_value
-            elif name_part_type_id == "91709":
-                name_dict["Matronymic"] = name_part_value
-            elif name_part_type_id == "1528":
-                name_dict["Nickname"] = name_part_value
-            elif name_part_type_id == "1525":
-                name_dict["Entity Name"] = name_part_value
-            elif name_part_type_id == "1524":
-                name_dict["Aircraft Name"] = name_part_value
-            elif name_part_type_id == "1526":
-                name_dict["Vessel Name"] = name_part_value
-
-        formatted_name = ""
-        if name_dict["Last Name"]:
-            formatted_name += " ".join(name_dict["Last Name"])
-        if name_dict["First Name"]:
-            formatted_name += (
-                ", " + name_dict["First Name"]
-                if formatted_name
-                else name_dict["First Name"]
-            )
-        if name_dict["Middle Name"]:
-            formatted_name += " " + name_dict["Middle Name"]
-        if name_dict["Maiden Name"]:
-            formatted_name += " " + name_dict["Maiden Name"]
-        if name_dict["Patronymic"]:
-            formatted_name += " " + name_dict["Patronymic"]
-        if name_dict["Matronymic"]:
-            formatted_name += " " + name_dict["Matronymic"]
-        if name_dict["Nickname"]:
-            formatted_name = (
-                name_dict["Nickname"]
-                if not formatted_name
-                else formatted_name + " (" + name_dict["Nickname"] + ")"
-            )
-        if name_dict["Entity Name"]:
-            formatted_name = name_dict["Entity Name"]
-        if name_dict["Aircraft Name"]:
-            formatted_name = name_dict["Aircraft Name"]
-        if name_dict["Vessel Name"]:
-            formatted_name = name_dict["Vessel Name"]
-
-        return formatted_name.strip()
-
-    def get_designation(party_subtype_id):
-        if party_subtype_id == "1":
-            return "Vessel"
-        elif party_subtype_id == "2":
-            return "Aircraft"
-        elif party_subtype_id == "3":
-            return "Business"
-        elif party_subtype_id == "4":
-            return "Individual"
-        else:
-            return "Unknown"
-
-    fieldnames = [
-        "FixedRef",
-        "DocumentedNameID",
-        "Designation",
-        "Primary Entry",
-        "Alias Type",
-        "Low Quality",
-        "Acronym",
-        "Script",
-        "Name",
-    ]
     data_rows = []
     seen_records = set()
 
-    for party in root.findall(".//ns:DistinctParty", ns):
-        fixed_ref = party.attrib["FixedRef"]
-        for profile in party.findall(".//ns:Profile", ns):
-            party_subtype_id = profile.attrib["PartySubTypeID"]
-            designation = get_designation(party_subtype_id)
-            for identity in profile.findall(".//ns:Identity", ns):
-                for alias in identity.findall(".//ns:Alias", ns):
-                    alias_type_id = alias.attrib["AliasTypeID"]
-                    alias_type = alias_type_values.get(alias_type_id, "Unknown")
-                    low_quality = alias.attrib["LowQuality"]
-                    primary_entry = alias.attrib["Primary"]
-                    for documented_name in alias.findall(".//ns:DocumentedName", ns):
-                        documented_name_id = documented_name.attrib["ID"]
-                        name_parts = documented_name.findall(
-                            ".//ns:DocumentedNamePart/ns:NamePartValue", ns
-                        )
-                        name = format_name(name_parts)
-                        script_id = (
-                            name_parts[0].attrib["ScriptID"]
-                            if name_parts
-                            else "Unknown"
-                        )
-                        script = script_values.get(script_id, "Unknown")
-                        acronym = (
-                            name_parts[0].attrib["Acronym"] if name_parts else "false"
-                        )
-                        record = (
-                            fixed_ref,
-                            documented_name_id,
-                            designation,
-                            primary_entry,
-                            alias_type,
-                            low_quality,
-                            acronym,
-                            script,
-                            name,
-                        )
-                        if record not in seen_records:
-                            data_rows.append(record)
-                            seen_records.add(record)
-
-    return fieldnames, data_rows
-
-
-def sanctions_entries_parser(root, ns, list_id_mapping, sanctions_type_mapping):
-    """Parses sanctions entries from the XML root and returns field names and data rows."""
-    fieldnames = ["FixedRef", "ListID", "SanctionsTypeID", "SanctionsProgramID"]
-    data_rows = []
+    for party in findall(root, schema_path("Sanctions", "DistinctParty"), ns):
+        data_rows.extend(
+            parse_party_names(
+                party,
+                ns,
+                script_values,
+                alias_type_values,
+                name_part_type_map,
+                seen_records,
+            )
+        )
 
-    for entry in root.findall(".//ns:SanctionsEntry", ns):
-        entry_id = entry.attrib.get("ID", "")
-        list_id = entry.attrib.get("ListID", "")
-        list_name = list_id_mapping.get(list_id, "Unknown List")
-        sanctions_measures = entry.findall(".//ns:SanctionsMeasure", ns)
-        for measure in sanctions_measures:
-            sanctions_type_id = measure.attrib.get("SanctionsTypeID", "")
-            sanctions_type = sanctions_type_mapping.get(
-                sanctions_type_id, "Unknown Type"
-            )
-            sanctions_program_id = ""
-            comment = measure.find(".//ns:Comment", ns)
-            if comment is not None:
-                sanctions_program_id = comment.text
-            data_rows.append(
-                [entry_id, list_name, sanctions_type, sanctions_program_id]
-            )
-    return fieldnames, data_rows
-
-
-def main():
-    if download_xml(XML_URL, XML_FILE_PATH):
-        tree, root = parse_xml(XML_FILE_PATH)
-        (
-            country_mapping,
-            doc_type_mapping,
-            list_id_mapping,
-            sanctions_type_mapping,
-            feature_type_mapping,
-            reliability_mapping,
-            detail_reference_mapping,
-        ) = get_mappings(root, NAMESPACE)
+    return NAME_FIELDNAMES, data_rows
 
-        # Extract reference values for name parser
-        script_values = {
-            script_elem.attrib["ID"]: script_elem.text
-            for script_elem in root.findall(".//ns:ScriptValues/ns:Script", NAMESPACE)
-        }
-        party_subtype_values = {
-            subtype_elem.attrib["ID"]: subtype_elem.text
-            for subtype_elem in root.findall(
-                ".//ns:PartySubTypeValues/ns:PartySubType", NAMESPACE
-            )
-        }
-        alias_type_values = {
-            alias_elem.attrib["ID"]: alias_elem.text
-            for alias_elem in root.findall(
-                ".//ns:AliasTypeValues/ns:AliasType", NAMESPACE
-            )
-        }
-        name_part_type_map = {
-            group.attrib["ID"]: group.attrib["NamePartTypeID"]
-            for group in root.findall(
-                ".//ns:MasterNamePartGroup/ns:NamePartGroup", NAMESPACE
-            )
-        }
-        # party_type_values = {
-        #     type_elem.attrib["ID"]: type_elem.text
-        #     for type_elem in root.findall(
-        #         ".//ns:PartyTypeValues/ns:PartyType", NAMESPACE
-        #     )
-        # }
-
-        # Parse features
-        feature_fieldnames, feature_data_rows = feature_parser(
-            root,
-            NAMESPACE,
-            feature_type_mapping,
-            reliability_mapping,
-            detail_reference_mapping,
+
+# parser 5 : sanctions entries parser
+def parse_sanctions_entry(entry, ns, list_id_mapping, sanctions_type_mapping):
+    """Parses a single SanctionsEntry element into one row per SanctionsMeasure."""
+    data_rows = []
+    entry_id = entry.attrib.get("ID", "")
+    list_id = entry.attrib.get("ListID", "")
+    list_name = list_id_mapping.get(list_id, "Unknown List")
+    sanctions_measures = findall(
+        entry, schema_path("SanctionsEntry", "SanctionsMeasure"), ns
+    )
+    for measure in sanctions_measures:
+        sanctions_type_id = measure.attrib.get("SanctionsTypeID", "")
+        sanctions_type = sanctions_type_mapping.get(sanctions_type_id, "Unknown Type")
+        sanctions_program_id = ""
+        comment = find(measure, schema_path("SanctionsMeasure", "Comment"), ns)
+        if comment is not None:
+            sanctions_program_id = comment.text
+        data_rows.append([entry_id, list_name, sanctions_type, sanctions_program_id])
+    return data_rows
+
+
+def sanctions_entries_parser(
+    root, ns, list_id_mapping, sanctions_type_mapping, entry_profiles=None
+):
+    """
+    Parses sanctions entries from the XML root and returns field names and data rows;
+    an entry_profiles dict passed in is filled with each SanctionsEntry's ProfileID.
+    """
+    data_rows = []
+
+    for entry in findall(root, schema_path("Sanctions", "SanctionsEntry"), ns):
+        if entry_profiles is not None:
+            entry_profiles[entry.attrib.get("ID", "")] = entry.attrib.get(
+                "ProfileID", ""
+            )
+        data_rows.extend(
+            parse_sanctions_entry(entry, ns, list_id_mapping, sanctions_type_mapping)
+        )
+    return SANCTIONS_ENTRIES_FIELDNAMES, data_rows
+
+
+# extraction functions
+# extract 1 : five-pass tree extraction
+def extract_tables(root, ns, reference_tables=None, party_links=None):
+    """
+    Runs the five parsers one after another over a fully parsed XML tree.
+
+    Args:
+        root (Element): The root element of the parsed XML tree.
+        ns (dict): The namespace dictionary for XML parsing.
+        reference_tables (dict): If given, filled with every reference table's ID to text dictionary.
+        party_links (dict): If given, filled with the party links (see build_party_links).
+
+    Returns:
+        dict: Sheet names mapped to (fieldnames, data_rows) tuples, in workbook order.
+    """
+    if STRICT_SCHEMA:
+        drift = Counter()
+        check_structure(root, drift)
+        report_schema_drift(drift)
+
+    reference_values = get_reference_values(root, ns)
+    if reference_tables is not None:
+        reference_tables.update(reference_values.as_dict())
+    country_mapping = reference_values["Country"]
+    name_part_type_map = get_name_part_type_map(root, ns)
+    identity_index = build_identity_index(root, ns)
+    entry_profiles = {} if party_links is not None else None
+
+    tables = {
+        "FEATURE": feature_parser(
+            root,
+            ns,
+            reference_values["FeatureType"],
+            reference_values["Reliability"],
+            reference_values["DetailReference"],
             country_mapping,
+        ),
+        "ID": id_parser(
+            root, ns, country_mapping, reference_values["IDRegDocType"], identity_index
+        ),
+        "ADDRESS": address_parser(root, ns, country_mapping),
+        "SANCTIONS_ENTRIES": sanctions_entries_parser(
+            root,
+            ns,
+            reference_values["List"],
+            reference_values["SanctionsType"],
+            entry_profiles,
+        ),
+        "NAME": name_parser(
+            root,
+            ns,
+            reference_values["Script"],
+            reference_values["PartySubType"],
+            reference_values["AliasType"],
+            name_part_type_map,
+        ),
+    }
+    if party_links is not None:
+        party_links.update(build_party_links(identity_index, entry_profiles))
+    return tables
+
+
+# extract 2 : single-pass record handlers
+def build_record_handlers(ns, sheets=SHEET_NAMES, strict=None):
+    """
+    Registers the per-sheet record handlers used by the single-pass extraction.
+
+    Each sheet registers a handler for the record elements it reads, next to the
+    shared handlers that load the reference values and build the ID lookups, so a
+    walk over the document only has to visit every record once. Locations and
+    IDRegDocuments come before the DistinctParties in the file, so their FixedRefs
+    are filled in by finish() once the walk is done.
+
+    Args:
+        ns (dict): The namespace dictionary for XML parsing.
+        sheets (list): The sheet names to extract.
+        strict (bool): Check each record against the schema, defaults to STRICT_SCHEMA.
+
+    Returns:
+        tuple: The handlers dict (local tag name mapped to a list of callables)
+            and a finish(reference_tables=None, party_links=None) callable returning
+            the sheet tables; a reference_tables dict passed to it is filled with the
+            reference values, a party_links dict with the party links.
+    """
+    handlers = {}
+    reference_values = None
+    location_index = {}
+    identity_index = {}
+    feature_to_fixed_ref = {}
+    name_part_type_map = {}
+    first_occurrence = set()
+    seen_records = set()
+    data_rows = {sheet: [] for sheet in sheets}
+    pending_id_rows = []
+    entry_profiles = {}
+
+    def register(tag, handler):
+        handlers.setdefault(tag, []).append(handler)
+
+    # shared handlers
+    def on_reference_value_sets(reference_value_sets):
+        # Tables are built lazily, the first time a sheet handler asks for them
+        nonlocal reference_values
+        reference_values = ReferenceValues(reference_value_sets)
+
+    def on_location_value(location):
+        index_location(location, ns, location_index)
+
+    def on_party_references(party):
+        index_identities(party, ns, identity_index)
+        map_feature_versions(party, ns, feature_to_fixed_ref)
+        name_part_type_map.update(get_name_part_type_map(party, ns))
+
+    register("ReferenceValueSets", on_reference_value_sets)
+    register("Location", on_location_value)
+    register("DistinctParty", on_party_references)
+
+    # sheet handlers
+    def on_feature_party(party):
+        data_rows["FEATURE"].extend(
+            parse_party_features(
+                party,
+                ns,
+                reference_values["FeatureType"],
+                reference_values["Reliability"],
+                reference_values["DetailReference"],
+                reference_values["Country"],
+                lambda location_id: get_location_value(location_index, location_id),
+            )
         )
 
-        # Remove duplicates from feature_data_rows
-        feature_data_rows = list(set(feature_data_rows))
+    def on_id_reg_document(idregdocument):
+        data = parse_id_document(
+            idregdocument,
+            ns,
+            reference_values["Country"],
+            reference_values["IDRegDocType"],
+            "",
+        )
+        pending_id_rows.append((idregdocument.attrib["IdentityID"], data))
 
-        # Parse IDs
-        id_fieldnames, id_data_rows = id_parser(
-            root, NAMESPACE, country_mapping, doc_type_mapping
+    def on_address_location(location):
+        data_rows["ADDRESS"].extend(
+            parse_location_addresses(
+                location, ns, reference_values["Country"], {}, first_occurrence
+            )
         )
-        # Parse addresses
-        address_fieldnames, address_data_rows = address_parser(
-            root, NAMESPACE, country_mapping
+
+    def on_sanctions_entry(entry):
+        entry_profiles[entry.attrib.get("ID", "")] = entry.attrib.get("ProfileID", "")
+        data_rows["SANCTIONS_ENTRIES"].extend(
+            parse_sanctions_entry(
+                entry, ns, reference_values["List"], reference_values["SanctionsType"]
+            )
         )
 
-        # Parse names
-        name_fieldnames, name_data_rows = name_parser(
-            root,
-            NAMESPACE,
-            script_values,
-            party_subtype_values,
-            alias_type_values,
-            name_part_type_map,
+    def on_name_party(party):
+        data_rows["NAME"].extend(
+            parse_party_names(
+                party,
+                ns,
+                reference_values["Script"],
+                reference_values["AliasType"],
+                name_part_type_map,
+                seen_records,
+            )
+        )
+
+    sheet_handlers = {
+        "FEATURE": ("DistinctParty", on_feature_party),
+        "ID": ("IDRegDocument", on_id_reg_document),
+        "ADDRESS": ("Location", on_address_location),
+        "SANCTIONS_ENTRIES": ("SanctionsEntry", on_sanctions_entry),
+        "NAME": ("DistinctParty", on_name_party),
+    }
+    for sheet in sheets:
+        register(*sheet_handlers[sheet])
+
+    # strict mode flags structural drift in every record
+    drift = Counter()
+    if strict is None:
+        strict = STRICT_SCHEMA
+    if strict:
+        for tag in ("Location", "IDRegDocument", "DistinctParty", "SanctionsEntry"):
+            register(tag, lambda record: check_structure(record, drift))
+
+    def finish(reference_tables=None, party_links=None):
+        # Resolve the FixedRefs that were not known when the element was parsed
+        if "ID" in data_rows:
+            for identity_id, data in pending_id_rows:
+                identity = identity_index.get(identity_id)
+                if identity is not None:
+                    data["FixedRef"] = identity[0]
+                    data_rows["ID"].append(data)
+            report_identity_hits(len(data_rows["ID"]), len(pending_id_rows))
+        for data in data_rows.get("ADDRESS", []):
+            data["FixedRef"] = feature_to_fixed_ref.get(data["FeatureVersionID"], "")
+        if strict:
+            report_schema_drift(drift)
+        if reference_tables is not None and reference_values is not None:
+            reference_tables.update(reference_values.as_dict())
+        if party_links is not None:
+            party_links.update(build_party_links(identity_index, entry_profiles))
+        return {sheet: (SHEET_FIELDNAMES[sheet], data_rows[sheet]) for sheet in sheets}
+
+    return handlers, finish
+
+
+def walk_records(root, handlers):
+    """
+    Walks a parsed tree once, sending each top-level section and each record below it
+    to the handlers registered for its local tag name.
+
+    Args:
+        root (Element): The root element of the parsed XML tree.
+        handlers (dict): Local tag names mapped to lists of callables.
+    """
+    for section in root:
+        section_tag = local_name(section.tag)
+        for handler in handlers.get(section_tag, ()):
+            handler(section)
+        if section_tag == "ReferenceValueSets":
+            continue
+        for record in section:
+            for handler in handlers.get(local_name(record.tag), ()):
+                handler(record)
+
+
+def extract_tables_single_pass(
+    root, ns, sheets=SHEET_NAMES, reference_tables=None, party_links=None
+):
+    """
+    Extracts the sheets from a fully parsed XML tree in a single traversal.
+
+    Args:
+        root (Element): The root element of the parsed XML tree.
+        ns (dict): The namespace dictionary for XML parsing.
+        sheets (list): The sheet names to extract.
+        reference_tables (dict): If given, filled with every reference table's ID to text dictionary.
+        party_links (dict): If given, filled with the party links (see build_party_links).
+
+    Returns:
+        dict: Sheet names mapped to (fieldnames, data_rows) tuples, in workbook order.
+    """
+    handlers, finish = build_record_handlers(ns, sheets)
+    walk_records(root, handlers)
+    return finish(reference_tables, party_links)
+
+
+# extract 3 : streaming extraction
+def stream_extract_tables(
+    file_path, ns=None, sheets=SHEET_NAMES, reference_tables=None, party_links=None
+):
+    """
+    Extracts the sheets in a single iterparse pass without loading the whole tree.
+
+    Each DistinctParty, Location, IDRegDocument and SanctionsEntry is sent to the
+    same handlers as extract_tables_single_pass as soon as it closes and is then
+    dropped, so only the output rows and a few ID lookups stay in memory.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+        ns (dict): The namespace dictionary for XML parsing, None to detect it from the root element.
+        sheets (list): The sheet names to extract.
+        reference_tables (dict): If given, filled with every reference table's ID to text dictionary.
+        party_links (dict): If given, filled with the party links (see build_party_links).
+
+    Returns:
+        dict: Sheet names mapped to (fieldnames, data_rows) tuples, in workbook order.
+    """
+    if ns is None:
+        ns = detect_namespace(file_path)
+    handlers, finish = build_record_handlers(ns, sheets)
+    iterparse_xml(file_path, handlers)
+    return finish(reference_tables, party_links)
+
+
+# extract 4 : extraction benchmark
+def benchmark_extraction(file_path, ns):
+    """
+    Times the five-pass, single-pass and streaming extraction on the same file and
+    checks that all three produce the same rows.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+        ns (dict): The namespace dictionary for XML parsing.
+    """
+    start = time.perf_counter()
+    tree, root = parse_xml(file_path)
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    five_pass_tables = extract_tables(root, ns)
+    five_pass_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single_pass_tables = extract_tables_single_pass(root, ns)
+    single_pass_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stream_tables = stream_extract_tables(file_path, ns)
+    stream_seconds = time.perf_counter() - start
+
+    print(f"ET.parse:                  {parse_seconds:8.2f}s")
+    print(f"five-pass extraction:      {five_pass_seconds:8.2f}s")
+    print(f"single-pass extraction:    {single_pass_seconds:8.2f}s")
+    print(f"streaming (incl. parsing): {stream_seconds:8.2f}s")
+    for sheet, (fieldnames, data_rows) in five_pass_tables.items():
+        single_pass_match = single_pass_tables[sheet][1] == data_rows
+        stream_match = stream_tables[sheet][1] == data_rows
+        status = "match" if single_pass_match and stream_match else "MISMATCH"
+        print(f"{sheet}: {len(data_rows)} rows, {status}")
+
+
+# extract 5 : xml backend benchmark
+def benchmark_backends(file_path, ns):
+    """
+    Runs the tree and streaming extraction with every installed XML backend on the
+    same file, prints the timings and checks that the rows match the etree backend.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+        ns (dict): The namespace dictionary for XML parsing.
+    """
+    reference_tables = None
+    for backend in available_xml_backends():
+        start = time.perf_counter()
+        tree, root = parse_xml(file_path, backend)
+        tree_tables = extract_tables_single_pass(root, ns)
+        tree_seconds = time.perf_counter() - start
+        del tree, root
+
+        start = time.perf_counter()
+        handlers, finish = build_record_handlers(ns)
+        iterparse_xml(file_path, handlers, backend)
+        stream_tables = finish()
+        stream_seconds = time.perf_counter() - start
+
+        if reference_tables is None:
+            reference_tables = tree_tables
+        rows_match = all(
+            tree_tables[sheet][1] == data_rows and stream_tables[sheet][1] == data_rows
+            for sheet, (fieldnames, data_rows) in reference_tables.items()
+        )
+        print(
+            f"{backend:>6}: tree {tree_seconds:8.2f}s, stream {stream_seconds:8.2f}s, "
+            f"rows {'match' if rows_match else 'MISMATCH'}"
+        )
+
+
+# extract 6 : expat push-parser extraction
+EXPAT_CHUNK_SIZE = 1024 * 1024
+_MISSING = object()
+
+
+class ExpatTableExtractor:
+    """
+    Push parser that extracts the sheets with pyexpat, without building Element objects.
+
+    Start/end handlers are keyed by (parent tag, tag). They copy only the attributes
+    and texts the sheets read into a few per-record variables, and emit the rows
+    through the same row builders as the tree parsers as soon as each Location,
+    IDRegDocument, DistinctParty or SanctionsEntry closes. Bytes are pushed with
+    feed(), from a memory-mapped file or any other source, and close() returns the
+    sheet tables. Without ns, the namespace is taken from the root element as it
+    streams in and kept in the namespace attribute.
+    """
+
+    def __init__(self, ns=None, sheets=SHEET_NAMES, strict=None):
+        self.strict = STRICT_SCHEMA if strict is None else strict
+        self.drift = Counter()
+        self.reference_values = {}
+        self.data_rows = {sheet: [] for sheet in sheets}
+        self.namespace = ns
+        self._prefix = ns["ns"] + "}" if ns is not None else None
+        self._local_names = {}
+        self._path = [None]
+        self._checked = [False]
+        self._text = None
+        self._in_reference_values = False
+        self._table = None
+        self._value_id = None
+        self._pending_id_rows = []
+        self._entry_profiles = {}
+        self._location_index = {}
+        self._identity_index = {}
+        self._feature_to_fixed_ref = {}
+        self._name_part_type_map = {}
+        self._first_occurrence = set()
+        self._seen_records = set()
+        # Record being read, and the Feature / LocationPartValue / DocumentedName /
+        # SanctionsMeasure being read inside it
+        self._record = None
+        self._item = None
+        self._part_type_id = None
+        self._profile = None
+        self._alias = None
+        self._name_part = None
+        self._version = None
+        self._document_date = None
+        # DatePeriod being decoded: bound name mapped to (from, to)
+        self._date = None
+        self._bound = None
+        self._point = None
+
+        self._start_handlers = {
+            ("Sanctions", "ReferenceValueSets"): self._start_reference_values,
+            ("Locations", "Location"): self._start_location,
+            ("Location", "LocationAreaCode"): self._start_area_code,
+            ("Location", "LocationCountry"): self._start_location_country,
+            ("Location", "FeatureVersionReference"): self._start_version_reference,
+            ("Location", "LocationPart"): self._start_location_part,
+            ("LocationPart", "LocationPartValue"): self._start_part_value,
+            ("IDRegDocuments", "IDRegDocument"): self._start_id_document,
+            ("IDRegDocument", "DocumentDate"): self._start_document_date,
+            ("DocumentDate", "DatePeriod"): self._start_document_date_period,
+            ("DistinctParties", "DistinctParty"): self._start_party,
+            ("DistinctParty", "Profile"): self._start_profile,
+            ("Profile", "Identity"): self._start_identity,
+            ("Profile", "Feature"): self._start_feature,
+            ("Feature", "FeatureVersion"): self._start_feature_version,
+            ("FeatureVersion", "DatePeriod"): self._start_version_date_period,
+            ("FeatureVersion", "VersionLocation"): self._start_version_location,
+            ("FeatureVersion", "VersionDetail"): self._start_version_detail,
+            ("Identity", "Alias"): self._start_alias,
+            ("Alias", "DocumentedName"): self._start_documented_name,
+            ("DocumentedNamePart", "NamePartValue"): self._start_name_part_value,
+            ("MasterNamePartGroup", "NamePartGroup"): self._start_name_part_group,
+            ("SanctionsEntries", "SanctionsEntry"): self._start_sanctions_entry,
+            ("SanctionsEntry", "SanctionsMeasure"): self._start_sanctions_measure,
+        }
+        self._end_handlers = {
+            ("Sanctions", "ReferenceValueSets"): self._end_reference_values,
+            ("Locations", "Location"): self._end_location,
+            ("LocationPart", "LocationPartValue"): self._end_part_value,
+            ("LocationPartValue", "Value"): self._end_part_value_value,
+            ("LocationPartValue", "Comment"): self._end_part_value_comment,
+            ("IDRegDocuments", "IDRegDocument"): self._end_id_document,
+            ("IDRegDocument", "IssuingAuthority"): self._end_issuing_authority,
+            ("IDRegDocument", "IDRegistrationNo"): self._end_registration_no,
+            ("DocumentDate", "DatePeriod"): self._end_document_date_period,
+            ("DistinctParties", "DistinctParty"): self._end_party,
+            ("Profile", "Feature"): self._end_feature,
+            ("Feature", "FeatureVersion"): self._end_feature_version,
+            ("FeatureVersion", "Comment"): self._end_version_comment,
+            ("FeatureVersion", "DatePeriod"): self._end_version_date_period,
+            ("FeatureVersion", "VersionDetail"): self._end_version_detail,
+            ("DocumentedNamePart", "NamePartValue"): self._end_name_part_value,
+            ("Alias", "DocumentedName"): self._end_documented_name,
+            ("SanctionsEntry", "SanctionsMeasure"): self._end_sanctions_measure,
+            ("SanctionsMeasure", "Comment"): self._end_measure_comment,
+        }
+        for bound in ("Start", "End"):
+            self._start_handlers[("DatePeriod", bound)] = self._start_date_bound
+            self._end_handlers[("DatePeriod", bound)] = self._end_date_bound
+            for point in ("From", "To"):
+                self._start_handlers[(bound, point)] = self._start_date_point
+                self._end_handlers[(bound, point)] = self._end_date_point
+        for point in ("From", "To"):
+            for index, part in enumerate(("Year", "Month", "Day")):
+                self._end_handlers[(point, part)] = partial(self._end_date_part, index)
+        # Elements whose text is read; every other text node is skipped
+        self._text_tags = {
+            key
+            for key in self._end_handlers
+            if key[1]
+            in (
+                "Value",
+                "Comment",
+                "IssuingAuthority",
+                "IDRegistrationNo",
+                "VersionDetail",
+                "NamePartValue",
+                "Year",
+                "Month",
+                "Day",
+            )
+        }
+
+        parser = expat.ParserCreate(namespace_separator="}")
+        parser.buffer_text = True
+        parser.buffer_size = 65536
+        parser.StartElementHandler = self._start
+        parser.EndElementHandler = self._end
+        parser.CharacterDataHandler = self._characters
+        self._parser = parser
+
+    def feed(self, data):
+        """Parses the next chunk of the document (bytes or any buffer, e.g. a memoryview)."""
+        self._parser.Parse(data, False)
+
+    def close(self):
+        """
+        Finishes parsing and returns the sheet tables.
+
+        Returns:
+            dict: Sheet names mapped to (fieldnames, data_rows) tuples, in workbook order.
+        """
+        self._parser.Parse(b"", True)
+        data_rows = self.data_rows
+        # Resolve the FixedRefs that were not known when the record was parsed
+        if "ID" in data_rows:
+            for identity_id, data in self._pending_id_rows:
+                identity = self._identity_index.get(identity_id)
+                if identity is not None:
+                    data["FixedRef"] = identity[0]
+                    data_rows["ID"].append(data)
+            report_identity_hits(len(data_rows["ID"]), len(self._pending_id_rows))
+        for data in data_rows.get("ADDRESS", []):
+            data["FixedRef"] = self._feature_to_fixed_ref.get(
+                data["FeatureVersionID"], ""
+            )
+        if self.strict:
+            report_schema_drift(self.drift)
+        return {
+            sheet: (SHEET_FIELDNAMES[sheet], rows) for sheet, rows in data_rows.items()
+        }
+
+    def party_links(self):
+        """Returns the party links of the parsed document (see build_party_links)."""
+        return build_party_links(self._identity_index, self._entry_profiles)
+
+    # expat callbacks
+    def _start(self, name, attrs):
+        if self._prefix is None:
+            # The root element: expat reports "<namespace URI>}<local name>"
+            namespace, _, root = name.rpartition("}")
+            if root != "Sanctions" or not namespace:
+                raise ValueError(
+                    f"Not an ADVANCED_XML publication (root element {name})"
+                )
+            self.namespace = {"ns": namespace}
+            self._prefix = namespace + "}"
+        local = self._local_names.get(name)
+        if local is None:
+            local = name[len(self._prefix) :] if name.startswith(self._prefix) else ""
+            self._local_names[name] = local
+        parent = self._path[-1]
+        self._path.append(local)
+        if self.strict:
+            self._check_structure(parent, local)
+        if self._in_reference_values:
+            self._start_reference_value(parent, local, attrs)
+            return
+        key = (parent, local)
+        handler = self._start_handlers.get(key)
+        if handler is not None:
+            handler(attrs)
+        if key in self._text_tags:
+            self._text = []
+
+    def _end(self, name):
+        local = self._path.pop()
+        if self.strict:
+            self._checked.pop()
+        text = None
+        if self._text is not None:
+            text = "".join(self._text) if self._text else None
+            self._text = None
+        if self._in_reference_values and local != "ReferenceValueSets":
+            if self._table is not None and len(self._path) == 4:
+                self._table[self._value_id] = text
+            return
+        handler = self._end_handlers.get((self._path[-1], local))
+        if handler is not None:
+            handler(text)
+
+    def _characters(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def _check_structure(self, parent, local):
+        # Same rules as check_structure(): records are checked, and so is every
+        # element the schema allows below a checked element
+        checked = False
+        if self._checked[-1]:
+            allowed = SCHEMA_CHILDREN.get(parent)
+            if allowed is not None:
+                if local in allowed:
+                    checked = True
+                else:
+                    self.drift[f"{parent}/{local}"] += 1
+        elif len(self._path) == 4:
+            checked = local in (
+                "Location",
+                "IDRegDocument",
+                "DistinctParty",
+                "SanctionsEntry",
+            )
+        self._checked.append(checked)
+
+    def _values(self, table):
+        return self.reference_values.get(table, {})
+
+    # reference values
+    def _start_reference_values(self, attrs):
+        self._in_reference_values = True
+
+    def _start_reference_value(self, parent, local, attrs):
+        if parent == "ReferenceValueSets":
+            self._table = None
+            if local.endswith("Values"):
+                # A later table of the same name replaces the earlier one, as in ReferenceValues
+                self._table = {}
+                self.reference_values[local[: -len("Values")]] = self._table
+        elif self._table is not None and len(self._path) == 5:
+            self._value_id = attrs["ID"]
+            self._text = []
+
+    def _end_reference_values(self, text):
+        self._in_reference_values = False
+
+    # Location
+    def _start_location(self, attrs):
+        self._record = {
+            "ID": attrs["ID"],
+            "AreaCodeID": None,
+            "CountryID": None,
+            "FeatureVersionID": None,
+            "LocationValue": _MISSING,
+            "parts": [],
+        }
+
+    def _start_area_code(self, attrs):
+        if self._record["AreaCodeID"] is None:
+            self._record["AreaCodeID"] = attrs["AreaCodeID"]
+
+    def _start_location_country(self, attrs):
+        if self._record["CountryID"] is None:
+            self._record["CountryID"] = attrs["CountryID"]
+
+    def _start_version_reference(self, attrs):
+        if self._record["FeatureVersionID"] is None:
+            self._record["FeatureVersionID"] = attrs["FeatureVersionID"]
+
+    def _start_location_part(self, attrs):
+        self._part_type_id = attrs["LocPartTypeID"]
+
+    def _start_part_value(self, attrs):
+        # [Value text, Comment text] of the first Value and Comment
+        self._item = [_MISSING, _MISSING]
+
+    def _end_part_value_value(self, text):
+        if self._item[0] is _MISSING:
+            self._item[0] = text
+        # LOCATION_VALUE_PATH: the first Value below a LocPartTypeID 1 part
+        if self._part_type_id == "1" and self._record["LocationValue"] is _MISSING:
+            self._record["LocationValue"] = text
+
+    def _end_part_value_comment(self, text):
+        if self._item[1] is _MISSING:
+            self._item[1] = text
+
+    def _end_part_value(self, text):
+        value, comment = self._item
+        self._record["parts"].append(
+            (
+                self._part_type_id,
+                "" if value is _MISSING else value,
+                "" if comment is _MISSING else comment,
+            )
+        )
+
+    def _end_location(self, text):
+        location = self._record
+        if location["ID"] not in self._location_index:
+            location_value = location["LocationValue"]
+            self._location_index[location["ID"]] = (
+                "" if location_value is _MISSING else location_value
+            )
+        if "ADDRESS" in self.data_rows:
+            self.data_rows["ADDRESS"].extend(
+                build_address_rows(
+                    location["ID"],
+                    location["AreaCodeID"] or "",
+                    location["CountryID"] or "",
+                    location["FeatureVersionID"] or "",
+                    location["parts"],
+                    self._values("Country"),
+                    {},
+                    self._first_occurrence,
+                )
+            )
+
+    # IDRegDocument
+    def _start_id_document(self, attrs):
+        self._record = {
+            "attrs": attrs,
+            "IssuingAuthority": _MISSING,
+            "IDRegistrationNo": _MISSING,
+            "date_ranges": [],
+        }
+
+    def _end_issuing_authority(self, text):
+        if self._record["IssuingAuthority"] is _MISSING:
+            self._record["IssuingAuthority"] = text
+
+    def _end_registration_no(self, text):
+        if self._record["IDRegistrationNo"] is _MISSING:
+            self._record["IDRegistrationNo"] = text
+
+    def _start_document_date(self, attrs):
+        self._document_date = False
+
+    def _start_document_date_period(self, attrs):
+        # Only the first DatePeriod of a DocumentDate is read
+        if not self._document_date:
+            self._document_date = True
+            self._date = {}
+
+    def _end_document_date_period(self, text):
+        if self._date is not None:
+            self._record["date_ranges"].append(
+                decode_date_bounds(*self._end_date_period())
+            )
+
+    def _end_id_document(self, text):
+        document = self._record
+        attrs = document["attrs"]
+        document_type_id = attrs["IDRegDocTypeID"]
+        issued_by_country_id = attrs.get("IssuedBy-CountryID", "")
+        issued_by = document["IssuingAuthority"]
+        value = document["IDRegistrationNo"]
+        data = build_id_row(
+            "",
+            document_type_id,
+            self._values("IDRegDocType").get(document_type_id, "Unknown Document Type"),
+            "" if issued_by is _MISSING else issued_by,
+            issued_by_country_id,
+            self._values("Country").get(issued_by_country_id, "Unknown Country"),
+            document["date_ranges"],
+            "" if value is _MISSING else value,
+        )
+        self._pending_id_rows.append((attrs["IdentityID"], data))
+
+    # DistinctParty
+    def _start_party(self, attrs):
+        self._record = {"FixedRef": attrs["FixedRef"], "names": []}
+
+    def _start_profile(self, attrs):
+        self._profile = attrs
+
+    def _start_identity(self, attrs):
+        # The first Identity with a given ID wins, as in index_identities()
+        self._identity_index.setdefault(
+            attrs["ID"],
+            (
+                attrs["FixedRef"],
+                self._profile.get("ID", ""),
+                self._profile.get("PartySubTypeID", ""),
+            ),
+        )
+
+    def _start_feature(self, attrs):
+        self._item = {"FeatureTypeID": attrs["FeatureTypeID"], "version": None}
+
+    def _start_feature_version(self, attrs):
+        self._feature_to_fixed_ref[attrs["ID"]] = self._record["FixedRef"]
+        # Only the first FeatureVersion of a Feature fills the row
+        self._version = None
+        if self._item["version"] is None:
+            self._version = {
+                "ReliabilityID": attrs.get("ReliabilityID", ""),
+                "Comment": _MISSING,
+                "DatePeriod": (None, None),
+                "date_seen": False,
+                "VersionLocation": None,
+                "VersionDetail": None,
+                "detail_text": _MISSING,
+            }
+            self._item["version"] = self._version
+
+    def _end_feature_version(self, text):
+        self._version = None
+
+    def _end_version_comment(self, text):
+        if self._version is not None and self._version["Comment"] is _MISSING:
+            self._version["Comment"] = text
+
+    def _start_version_date_period(self, attrs):
+        if self._version is not None and not self._version["date_seen"]:
+            self._version["date_seen"] = True
+            self._date = {}
+
+    def _end_version_date_period(self, text):
+        if self._date is not None:
+            self._version["DatePeriod"] = self._end_date_period()
+
+    def _start_version_location(self, attrs):
+        if self._version is not None and self._version["VersionLocation"] is None:
+            self._version["VersionLocation"] = attrs
+
+    def _start_version_detail(self, attrs):
+        if self._version is not None and self._version["VersionDetail"] is None:
+            self._version["VersionDetail"] = attrs
+
+    def _end_version_detail(self, text):
+        if self._version is not None and self._version["detail_text"] is _MISSING:
+            self._version["detail_text"] = text
+
+    def _end_feature(self, text):
+        version = self._item["version"]
+        if version is None or "FEATURE" not in self.data_rows:
+            return
+        feature_type = self._values("FeatureType").get(self._item["FeatureTypeID"], "")
+        date_range = None
+        if feature_type in FEATURE_DATE_TYPES:
+            date_range = decode_date_bounds(*version["DatePeriod"])
+        comment = version["Comment"]
+        self.data_rows["FEATURE"].append(
+            {
+                "FixedRef": self._record["FixedRef"],
+                "FeatureType": feature_type,
+                "Value": get_feature_value(
+                    feature_type,
+                    date_range,
+                    version["VersionLocation"],
+                    version["VersionDetail"],
+                    version["detail_text"],
+                    self._values("DetailReference"),
+                    self._values("Country"),
+                    self._location_value,
+                ),
+                "ReliabilityValue": self._values("Reliability").get(
+                    version["ReliabilityID"], "Unknown"
+                ),
+                "Comment": "" if comment is _MISSING else comment,
+            }
+        )
+
+    def _location_value(self, location_id):
+        return get_location_value(self._location_index, location_id)
+
+    def _start_alias(self, attrs):
+        self._alias = attrs
+
+    def _start_documented_name(self, attrs):
+        self._item = {"ID": attrs["ID"], "parts": [], "first_part": None}
+        self._record["names"].append((self._profile, self._alias, self._item))
+
+    def _start_name_part_value(self, attrs):
+        self._name_part = attrs
+
+    def _end_name_part_value(self, text):
+        self._item["parts"].append((self._name_part["NamePartGroupID"], text))
+        if self._item["first_part"] is None:
+            self._item["first_part"] = self._name_part
+
+    def _end_documented_name(self, text):
+        self._item = None
+
+    def _start_name_part_group(self, attrs):
+        self._name_part_type_map[attrs["ID"]] = attrs["NamePartTypeID"]
+
+    def _end_party(self, text):
+        if "NAME" not in self.data_rows:
+            return
+        # NamePartGroups close after the Aliases, so names are formatted once the party is complete
+        script_values = self._values("Script")
+        alias_type_values = self._values("AliasType")
+        for profile, alias, documented_name in self._record["names"]:
+            first_part = documented_name["first_part"]
+            script_id = first_part["ScriptID"] if first_part else "Unknown"
+            record = (
+                self._record["FixedRef"],
+                documented_name["ID"],
+                get_designation(profile["PartySubTypeID"]),
+                alias["Primary"],
+                alias_type_values.get(alias["AliasTypeID"], "Unknown"),
+                alias["LowQuality"],
+                first_part["Acronym"] if first_part else "false",
+                script_values.get(script_id, "Unknown"),
+                format_name(documented_name["parts"], self._name_part_type_map),
+            )
+            if record not in self._seen_records:
+                self.data_rows["NAME"].append(record)
+                self._seen_records.add(record)
+
+    # SanctionsEntry
+    def _start_sanctions_entry(self, attrs):
+        self._entry_profiles[attrs.get("ID", "")] = attrs.get("ProfileID", "")
+        self._record = (
+            attrs.get("ID", ""),
+            self._values("List").get(attrs.get("ListID", ""), "Unknown List"),
+        )
+
+    def _start_sanctions_measure(self, attrs):
+        self._item = [
+            self._values("SanctionsType").get(
+                attrs.get("SanctionsTypeID", ""), "Unknown Type"
+            ),
+            _MISSING,
+        ]
+
+    def _end_measure_comment(self, text):
+        if self._item[1] is _MISSING:
+            self._item[1] = text
+
+    def _end_sanctions_measure(self, text):
+        if "SANCTIONS_ENTRIES" in self.data_rows:
+            entry_id, list_name = self._record
+            sanctions_type, comment = self._item
+            self.data_rows["SANCTIONS_ENTRIES"].append(
+                [
+                    entry_id,
+                    list_name,
+                    sanctions_type,
+                    "" if comment is _MISSING else comment,
+                ]
+            )
+
+    # DatePeriod: Start/End -> From/To -> Year/Month/Day, read as in decode_date_period()
+    def _start_date_bound(self, attrs):
+        # Only the first Start and the first End are read
+        self._bound = None
+        bound = self._path[-1]
+        if self._date is not None and bound not in self._date:
+            self._bound = {}
+            self._date[bound] = self._bound
+
+    def _end_date_bound(self, text):
+        self._bound = None
+
+    def _start_date_point(self, attrs):
+        # Only the first From and the first To are read; a missing part is ""
+        self._point = None
+        point = self._path[-1]
+        if self._bound is not None and point not in self._bound:
+            self._point = ["", "", "", [False, False, False]]
+            self._bound[point] = self._point
+
+    def _end_date_point(self, text):
+        self._point = None
+
+    def _end_date_part(self, index, text):
+        point = self._point
+        if point is not None and not point[3][index]:
+            point[index] = text
+            point[3][index] = True
+
+    def _end_date_period(self):
+        # (start, end) arguments of decode_date_bounds()
+        date = self._date
+        self._date = None
+        return tuple(
+            (
+                None
+                if bound is None
+                else tuple(
+                    None if point is None else tuple(point[:3])
+                    for point in (bound.get("From"), bound.get("To"))
+                )
+            )
+            for bound in (date.get("Start"), date.get("End"))
+        )
+
+
+def expat_extract_tables(
+    file_path, ns=None, sheets=SHEET_NAMES, reference_tables=None, party_links=None
+):
+    """
+    Extracts the sheets by feeding a memory-mapped XML file to an ExpatTableExtractor.
+
+    The file is pushed to pyexpat in EXPAT_CHUNK_SIZE slices of the mapping, so it is
+    never copied into Python objects and no Element objects are created. A gzip or
+    zstd file is decompressed in EXPAT_CHUNK_SIZE chunks instead.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+        ns (dict): The namespace dictionary for XML parsing, None to detect it from the root element.
+        sheets (list): The sheet names to extract.
+        reference_tables (dict): If given, filled with every reference table's ID to text dictionary.
+        party_links (dict): If given, filled with the party links (see build_party_links).
+
+    Returns:
+        dict: Sheet names mapped to (fieldnames, data_rows) tuples, in workbook order.
+    """
+    extractor = ExpatTableExtractor(ns, sheets)
+    if detect_compression(file_path) is not None:
+        with open_xml(file_path) as file:
+            for chunk in iter(lambda: file.read(EXPAT_CHUNK_SIZE), b""):
+                extractor.feed(chunk)
+    else:
+        with open(file_path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), EXPAT_CHUNK_SIZE):
+                    # Release each slice even when feed() raises, or the mapping cannot close
+                    with view[offset : offset + EXPAT_CHUNK_SIZE] as chunk:
+                        extractor.feed(chunk)
+            finally:
+                view.release()
+    tables = extractor.close()
+    if reference_tables is not None:
+        reference_tables.update(extractor.reference_values)
+    if party_links is not None:
+        party_links.update(extractor.party_links())
+    return tables
+
+
+# extract 7 : expat benchmark
+def measure_extraction(mode, file_path, ns):
+    """
+    Runs one extraction mode and measures it; meant to run in a fresh worker process
+    so the peak RSS belongs to that mode alone.
+
+    Returns:
+        tuple: (seconds, peak RSS in MB, sheet row counts, SHA-256 of the pickled rows).
+    """
+    import resource  # Unix only, like ru_maxrss itself
+
+    start = time.perf_counter()
+    if mode == "expat":
+        tables = expat_extract_tables(file_path, ns)
+    elif mode == "stream":
+        tables = stream_extract_tables(file_path, ns)
+    else:
+        tree, root = parse_xml(file_path)
+        tables = extract_tables_single_pass(root, ns)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    rows = {sheet: data_rows for sheet, (fieldnames, data_rows) in tables.items()}
+    return (
+        seconds,
+        peak_rss_mb,
+        {sheet: len(data_rows) for sheet, data_rows in rows.items()},
+        hashlib.sha256(pickle.dumps(rows)).hexdigest(),
+    )
+
+
+def benchmark_expat(file_path, ns):
+    """
+    Compares the expat push parser with the ElementTree tree and iterparse paths:
+    throughput and peak RSS, each mode in its own process, and whether the rows match.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+        ns (dict): The namespace dictionary for XML parsing.
+    """
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    reference_digest = None
+    for mode in ("tree", "stream", "expat"):
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            seconds, peak_rss_mb, row_counts, digest = executor.submit(
+                measure_extraction, mode, file_path, ns
+            ).result()
+        if reference_digest is None:
+            reference_digest = digest
+        print(
+            f"{mode:>6}: {seconds:8.2f}s, {size_mb / seconds:7.1f} MB/s, "
+            f"peak RSS {peak_rss_mb:8.1f} MB, "
+            f"{sum(row_counts.values())} rows "
+            f"{'match' if digest == reference_digest else 'MISMATCH'}"
+        )
+
+
+# extract 8 : snapshot-backed extraction
+def load_or_extract_tables(file_path, ns=None, digest=None, party_links=None):
+    """
+    Returns the sheet tables of an XML file, from its parse snapshot when the file is
+    unchanged since a previous run, otherwise by parsing it with PARSE_MODE and saving
+    a new snapshot.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+        ns (dict): The namespace dictionary for XML parsing, None to detect it from the root element.
+        digest (str): The SHA-256 of the XML, if the caller already has it.
+        party_links (dict): If given, filled with the party links (see build_party_links).
+
+    Returns:
+        dict: Sheet names mapped to (fieldnames, data_rows) tuples, in workbook order.
+    """
+    if not SNAPSHOT_DIR:
+        digest = None
+    elif digest is None:
+        digest = xml_sha256(file_path)
+    if digest is not None:
+        snapshot = load_snapshot(SNAPSHOT_DIR, digest)
+        if snapshot is not None:
+            print(f"XML file unchanged, loaded parse snapshot {digest[:12]} ⚡")
+            if party_links is not None:
+                party_links.update(snapshot["party_links"])
+            return snapshot["tables"]
+
+    if ns is None:
+        ns = detect_namespace(file_path)
+    reference_tables = {}
+    links = {}
+    if PARSE_MODE == "stream":
+        tables = stream_extract_tables(
+            file_path, ns, reference_tables=reference_tables, party_links=links
+        )
+    elif PARSE_MODE == "expat":
+        tables = expat_extract_tables(
+            file_path, ns, reference_tables=reference_tables, party_links=links
+        )
+    elif PARSE_MODE == "multipass":
+        tree, root = parse_xml(file_path)
+        tables = extract_tables(root, ns, reference_tables, links)
+    else:
+        tree, root = parse_xml(file_path)
+        tables = extract_tables_single_pass(
+            root, ns, reference_tables=reference_tables, party_links=links
+        )
+
+    if digest is not None:
+        save_snapshot(
+            SNAPSHOT_DIR, digest, tables, reference_tables, SNAPSHOT_KEEP, links
+        )
+    if party_links is not None:
+        party_links.update(links)
+    return tables
+
+
+# extract 9 : parse while downloading
+# Errors of a publication that cannot be parsed: ParseError is a SyntaxError, a file that is not ADVANCED_XML
+# is a ValueError
+PARSE_ERRORS = (ValueError, OSError, SyntaxError, expat.ExpatError)
+
+
+def download_extract_tables(
+    url,
+    file_path,
+    ns=None,
+    sheets=SHEET_NAMES,
+    archive=ARCHIVE_STREAMED_XML,
+    state_path=DOWNLOAD_STATE_PATH,
+    compression=ARCHIVE_COMPRESSION,
+    party_links=None,
+):
+    """
+    Downloads and parses a publication at the same time, without waiting for the file.
+
+    A receiver thread reads the response through a ResumableDownload (so a dropped
+    connection is resumed, not restarted) and queues the chunks; this thread feeds
+    them to an ExpatTableExtractor as they arrive, so the run takes about as long as
+    the slower of the two instead of their sum. A compressed transfer is decoded on
+    the fly. With archive set, the XML is also teed to file_path with the given
+    compression (through a temp file renamed once the body is verified) and the
+    request is conditional on the last archived download. The body is length-checked,
+    and SHA-256-checked only when the server announces a digest or the ETag is that of
+    the last archived download (see xml_download.ResumableDownload).
+
+    Args:
+        url (str): The URL to download the XML file from.
+        file_path (str): The local file path the raw XML is archived to.
+        ns (dict): The namespace dictionary for XML parsing, None to detect it from the root element.
+        sheets (list): The sheet names to extract.
+        archive (bool): Save the XML to file_path.
+        state_path (str): The JSON file holding the validators of the last archived download.
+        compression (str): Archive the XML as "gzip", "zstd" or plain (None).
+        party_links (dict): If given and the status is DOWNLOADED, filled with the party
+            links (see build_party_links).
+
+    Returns:
+        tuple: The download status (DOWNLOADED, NOT_MODIFIED or False) and the sheet
+            tables, which are None unless the status is DOWNLOADED. A download that
+            fails or a body that cannot be parsed gives False; nothing is archived then.
+    """
+    extractor = ExpatTableExtractor(ns, sheets)
+    chunks = queue.Queue(maxsize=PARSE_QUEUE_CHUNKS)
+    stop = threading.Event()
+    temp_path = file_path + ".stream"
+    state = load_download_state(state_path) if archive else {}
+
+    with requests.Session() as session:
+        download = ResumableDownload(
+            session,
+            url,
+            chunk_size=DOWNLOAD_CHUNK_SIZE,
+            retries=DOWNLOAD_RETRIES,
+            backoff_seconds=DOWNLOAD_BACKOFF_SECONDS,
+            timeout=DOWNLOAD_TIMEOUT,
+            verify=False,
+            headers=(
+                conditional_headers(state, url) if os.path.exists(file_path) else {}
+            ),
+            accept_encoding=DOWNLOAD_ACCEPT_ENCODING,
+        )
+        try:
+            if download.open() == 304:
+                print("XML file not modified since the last download ⏭️")
+                return NOT_MODIFIED, None
+        except requests.exceptions.RequestException as e:
+            print(f"Error downloading XML: {e}")
+            return False, None
+        # The server announces no digest; the same ETag as last time has to hash the same
+        download.expected_sha256 = download.expected_sha256 or stored_sha256(
+            state, url, download.etag
+        )
+
+        def put(item):
+            # Gives up once the parser has stopped, so a full queue cannot block the receiver
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def receive():
+            try:
+                for chunk in download:
+                    if not put(chunk):
+                        return
+                put(None)
+            except BaseException as e:
+                put(e)
+
+        receiver = threading.Thread(target=receive, daemon=True)
+        receiver.start()
+        decoder = transfer_decoder(download.content_encoding)
+        # The snapshot is keyed by the XML itself, like load_or_extract_tables() does
+        xml_digest = hashlib.sha256()
+        try:
+            with open_compressed_writer(
+                temp_path if archive else os.devnull,
+                compression if archive else None,
+            ) as tee:
+                while True:
+                    chunk = chunks.get()
+                    if chunk is None:
+                        xml = decoder.flush()
+                    elif isinstance(chunk, BaseException):
+                        raise chunk
+                    else:
+                        xml = decoder.decompress(chunk)
+                    xml_digest.update(xml)
+                    tee.write(xml)
+                    extractor.feed(xml)
+                    if chunk is None:
+                        break
+            tables = extractor.close()
+        except requests.exceptions.RequestException as e:
+            print(f"Error downloading XML: {e}")
+            remove_file(temp_path)
+            return False, None
+        except PARSE_ERRORS as e:
+            print(f"Error parsing XML: {e}")
+            remove_file(temp_path)
+            return False, None
+        except BaseException:
+            remove_file(temp_path)
+            raise
+        finally:
+            stop.set()
+            # Closing the response wakes a receiver blocked on the socket, so the join
+            # does not wait for the read timeout after a parse error
+            download.close()
+            receiver.join()
+
+    links = extractor.party_links()
+    if party_links is not None:
+        party_links.update(links)
+    if archive:
+        os.replace(temp_path, file_path)
+        save_download_state(
+            state_path,
+            {
+                "url": url,
+                "etag": download.etag,
+                "last_modified": download.last_modified,
+                "size": download.offset,
+                "sha256": download.sha256,
+            },
+        )
+    # A later run that parses the saved file picks the tables up from the snapshot
+    if SNAPSHOT_DIR:
+        save_snapshot(
+            SNAPSHOT_DIR,
+            xml_digest.hexdigest(),
+            tables,
+            extractor.reference_values,
+            SNAPSHOT_KEEP,
+            links,
+        )
+    download.report("XML file downloaded and parsed 🔖")
+    return DOWNLOADED, tables
+
+
+# extract 10 : per-party JSON Lines
+# The first SANCTIONS_ENTRIES column holds the SanctionsEntry ID; parties are matched through its ProfileID
+PARTY_MEASURE_FIELDNAMES = [
+    "SanctionsEntryID",
+    "ListID",
+    "SanctionsTypeID",
+    "SanctionsProgramID",
+]
+# Sheets mapped to the key of their rows in a party document
+PARTY_DOCUMENT_KEYS = {
+    "NAME": "names",
+    "FEATURE": "features",
+    "ID": "documents",
+    "ADDRESS": "addresses",
+    "SANCTIONS_ENTRIES": "sanctions_measures",
+}
+
+
+def party_document(fixed_ref, tables):
+    """
+    Builds the JSON document of one DistinctParty from its rows: its FixedRef and its
+    names, features, documents (ID rows), addresses and sanctions measures, each a list
+    of dicts with the sheet's columns minus FixedRef, as in sheet_rows (so duplicate
+    features are dropped).
+
+    Args:
+        fixed_ref (str): The party's FixedRef.
+        tables (dict): Sheet names mapped to (fieldnames, data_rows) tuples holding the
+            party's rows only; SANCTIONS_ENTRIES is filled in later (see write_party_jsonl).
+
+    Returns:
+        dict: The party document.
+    """
+    document = {"FixedRef": fixed_ref}
+    for sheet, fieldnames, rows in sheet_rows(tables):
+        fixed_ref_index = fieldnames.index("FixedRef")
+        document[PARTY_DOCUMENT_KEYS[sheet]] = [
+            {
+                field: row[index]
+                for index, field in enumerate(fieldnames)
+                if index != fixed_ref_index
+            }
+            for row in rows
+        ]
+    document["sanctions_measures"] = []
+    return document
+
+
+def write_party_jsonl(file_path, jsonl_path, ns=None):
+    """
+    Streams a publication and writes one JSON document per DistinctParty (see
+    party_document) to a JSON Lines file as each party closes, so a reader can ingest
+    the parties while the file is written.
+
+    This is a pass of its own over the XML and does not use the extracted tables: it
+    holds only the rows still waiting for their party. Locations and IDRegDocuments
+    come before the DistinctParties in the file, so their address and ID rows are
+    buffered by FeatureVersion ID and Identity ID until the party that references them
+    closes. The SanctionsEntries come last, when every party is written, so their
+    measures are indexed by the FixedRef their ProfileID resolves to and added by a
+    final pass over the JSON Lines (not the XML), which replaces the file once done.
+
+    Rows whose party cannot be found (an address whose FeatureVersion no party
+    references, an IDRegDocument of an unknown Identity or a SanctionsEntry of an
+    unknown Profile) are returned apart rather than dropped.
+
+    Args:
+        file_path (str): The path to the (plain, gzip or zstd) XML file.
+        jsonl_path (str): The JSON Lines file to write.
+        ns (dict): The namespace dictionary for XML parsing, None to detect it from the root element.
+
+    Returns:
+        tuple: The number of parties written, and a dict of sheet names mapped to their
+            unclaimed rows (lists of values in column order).
+    """
+    if ns is None:
+        ns = detect_namespace(file_path)
+    start = time.perf_counter()
+    directory = os.path.dirname(jsonl_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    reference_values = None
+    location_index = {}
+    name_part_type_map = {}
+    seen_records = set()
+    first_occurrence = set()
+    # Rows waiting for their party, with their position in the file to keep the sheet order
+    pending_addresses = {}
+    pending_documents = {}
+    profiles = {}
+    measures = {}
+    unclaimed = {}
+    position = itertools.count()
+    parties = 0
+
+    def on_reference_value_sets(reference_value_sets):
+        nonlocal reference_values
+        reference_values = ReferenceValues(reference_value_sets)
+
+    def on_location(location):
+        index_location(location, ns, location_index)
+        for data in parse_location_addresses(
+            location, ns, reference_values["Country"], {}, first_occurrence
+        ):
+            pending_addresses.setdefault(data["FeatureVersionID"], []).append(
+                (next(position), data)
+            )
+
+    def on_id_reg_document(idregdocument):
+        data = parse_id_document(
+            idregdocument,
+            ns,
+            reference_values["Country"],
+            reference_values["IDRegDocType"],
+            "",
+        )
+        pending_documents.setdefault(idregdocument.attrib["IdentityID"], []).append(
+            (next(position), data)
+        )
+
+    def on_party(party):
+        nonlocal parties
+        fixed_ref = party.attrib["FixedRef"]
+        identities = {}
+        index_identities(party, ns, identities)
+        for identity_fixed_ref, profile_id, party_subtype_id in identities.values():
+            profiles.setdefault(profile_id, fixed_ref)
+        feature_versions = {}
+        map_feature_versions(party, ns, feature_versions)
+        name_part_type_map.update(get_name_part_type_map(party, ns))
+
+        claimed = {"ID": [], "ADDRESS": []}
+        for sheet, pending, keys in (
+            ("ID", pending_documents, identities),
+            ("ADDRESS", pending_addresses, feature_versions),
+        ):
+            for key in keys:
+                claimed[sheet].extend(pending.pop(key, ()))
+        for sheet, rows in claimed.items():
+            rows.sort(key=lambda item: item[0])
+            for _, data in rows:
+                data["FixedRef"] = fixed_ref
+        party_rows = {
+            "NAME": parse_party_names(
+                party,
+                ns,
+                reference_values["Script"],
+                reference_values["AliasType"],
+                name_part_type_map,
+                seen_records,
+            ),
+            "FEATURE": parse_party_features(
+                party,
+                ns,
+                reference_values["FeatureType"],
+                reference_values["Reliability"],
+                reference_values["DetailReference"],
+                reference_values["Country"],
+                lambda location_id: get_location_value(location_index, location_id),
+            ),
+            "ID": [data for _, data in claimed["ID"]],
+            "ADDRESS": [data for _, data in claimed["ADDRESS"]],
+        }
+        tables = {
+            sheet: (SHEET_FIELDNAMES[sheet], party_rows[sheet])
+            for sheet in PARTY_DOCUMENT_KEYS
+            if sheet in party_rows
+        }
+        file.write(
+            json.dumps(
+                party_document(fixed_ref, tables),
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        )
+        file.write("\n")
+        parties += 1
+
+    def on_sanctions_entry(entry):
+        rows = parse_sanctions_entry(
+            entry, ns, reference_values["List"], reference_values["SanctionsType"]
+        )
+        fixed_ref = profiles.get(entry.attrib.get("ProfileID", ""))
+        if fixed_ref is None:
+            unclaimed.setdefault("SANCTIONS_ENTRIES", []).extend(
+                list(row) for row in rows
+            )
+            return
+        measures.setdefault(fixed_ref, []).extend(
+            dict(zip(PARTY_MEASURE_FIELDNAMES, row)) for row in rows
+        )
+
+    handlers = {
+        "ReferenceValueSets": [on_reference_value_sets],
+        "Location": [on_location],
+        "IDRegDocument": [on_id_reg_document],
+        "DistinctParty": [on_party],
+        "SanctionsEntry": [on_sanctions_entry],
+    }
+    with open(jsonl_path, "w", encoding="utf-8") as file:
+        iterparse_xml(file_path, handlers)
+
+    # Final pass: the sanctions measures of every party, then the file is replaced at once
+    temp_path = jsonl_path + ".tmp"
+    with open(jsonl_path, encoding="utf-8") as source, open(
+        temp_path, "w", encoding="utf-8"
+    ) as target:
+        for line in source:
+            document = json.loads(line)
+            document["sanctions_measures"] = measures.pop(document["FixedRef"], [])
+            target.write(
+                json.dumps(document, ensure_ascii=False, separators=(",", ":"))
+            )
+            target.write("\n")
+    os.replace(temp_path, jsonl_path)
+
+    for sheet, pending in (("ADDRESS", pending_addresses), ("ID", pending_documents)):
+        rows = sorted(item for items in pending.values() for item in items)
+        if rows:
+            unclaimed[sheet] = list(
+                _row_values(sheet, SHEET_FIELDNAMES[sheet], [data for _, data in rows])
+            )
+    for sheet, rows in unclaimed.items():
+        print(
+            f"{len(rows)} {sheet} rows belong to no party and are not in {jsonl_path}"
+        )
+    print(
+        f"{parties} parties written to {jsonl_path} in {time.perf_counter() - start:.2f}s 🎉"
+    )
+    return parties, unclaimed
+
+
+# util 5 : publication archive
+def archive_dir_for(list_name):
+    """Returns the archive subdirectory of a list, e.g. "<ARCHIVE_DIR>/sdn" for SDN."""
+    return os.path.join(ARCHIVE_DIR, list_name.lower())
+
+
+def archive_xml(file_path, state_path=DOWNLOAD_STATE_PATH, list_name="SDN"):
+    """
+    Adds a downloaded publication to the archive of its list and applies the
+    retention policy to that list.
+
+    Args:
+        file_path (str): The downloaded publication.
+        state_path (str): The JSON file holding the validators of its download.
+        list_name (str): The list it belongs to (a LIST_SOURCES name).
+
+    Returns:
+        dict: The archived publication's metadata.
+    """
+    archive_dir = archive_dir_for(list_name)
+    metadata, stored = archive_publication(
+        archive_dir, file_path, load_download_state(state_path)
+    )
+    print(
+        f"{list_name} publication {metadata['id'][:12]} (published {metadata['publish_date']}) "
+        f"{'archived' if stored else 'already in the archive'} 📦"
+    )
+    deleted = apply_retention(archive_dir, ARCHIVE_KEEP, ARCHIVE_KEEP_DAYS)
+    if deleted:
+        print(
+            f"Removed {len(deleted)} {list_name} publications past the archive retention"
+        )
+    return metadata
+
+
+# util 6 : excel workbook writer
+def sheet_rows(tables):
+    """
+    Yields the sheets as they are written out: duplicate FEATURE rows are removed,
+    a missing ADDRESS CountryRelevanceID is written as "" and every row becomes a
+    list of values in column order.
+
+    Args:
+        tables (dict): Sheet names mapped to (fieldnames, data_rows) tuples.
+
+    Yields:
+        tuple: (sheet name, fieldnames, iterator of row value lists), in workbook order.
+    """
+    for sheet, (fieldnames, data_rows) in tables.items():
+        if sheet == "FEATURE":
+            # Remove duplicates from feature_data_rows (rows are dicts, so key on their values)
+            data_rows = list({tuple(row.values()): row for row in data_rows}.values())
+        yield sheet, fieldnames, _row_values(sheet, fieldnames, data_rows)
+
+
+def _row_values(sheet, fieldnames, data_rows):
+    # A generator of its own, so the rows of every sheet can be read after the next sheet is yielded
+    if sheet == "ADDRESS":
+        # Ensure 'CountryRelevanceID' is present in the row dictionary
+        for row in data_rows:
+            yield [
+                row.get(field, "") if field == "CountryRelevanceID" else row[field]
+                for field in fieldnames
+            ]
+    elif data_rows and isinstance(data_rows[0], dict):
+        for row in data_rows:
+            yield [row[field] for field in fieldnames]
+    else:
+        for row in data_rows:
+            yield list(row)
+
+
+def write_workbook(tables, xlsx_path, write_only=True):
+    """
+    Writes the sheet tables to an Excel workbook, one sheet per table in workbook order.
+
+    With write_only (the default) openpyxl streams each row to the sheet's XML as it
+    is appended instead of keeping a cell object per value, so memory does not grow
+    with the workbook and saving is a matter of zipping the written sheets.
+
+    Args:
+        tables (dict): Sheet names mapped to (fieldnames, data_rows) tuples.
+        xlsx_path (str): The path of the workbook to write.
+        write_only (bool): Use openpyxl's write-only workbook; False builds a regular one.
+    """
+    wb = Workbook(write_only=write_only)
+    for sheet, fieldnames, rows in sheet_rows(tables):
+        ws = wb.create_sheet(sheet)
+        ws.append(fieldnames)
+        for row in rows:
+            ws.append(row)
+    # Remove the default sheet a regular openpyxl workbook starts with
+    if "Sheet" in wb.sheetnames:
+        wb.remove(wb["Sheet"])
+    # Save the workbook
+    wb.save(xlsx_path)
+    print("Excel file created successfully 🎉")
+
+
+def measure_workbook(file_path, write_only, parallel=False):
+    """
+    Writes the workbook of a publication once and measures it; meant to run in a
+    fresh worker process so the peak RSS belongs to this writer alone.
+
+    Returns:
+        tuple: (seconds, peak RSS in MB before writing, peak RSS in MB after, workbook size in MB).
+    """
+    import resource  # Unix only, like ru_maxrss itself
+    import tempfile
+
+    tables = load_or_extract_tables(file_path)
+    # ru_maxrss is in kilobytes on Linux
+    rss_before_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    with tempfile.TemporaryDirectory() as temp_dir:
+        xlsx_path = os.path.join(temp_dir, "benchmark.xlsx")
+        start = time.perf_counter()
+        if parallel:
+            write_workbook_parallel(sheet_rows(tables), xlsx_path, XLSX_WORKERS)
+        else:
+            write_workbook(tables, xlsx_path, write_only)
+        seconds = time.perf_counter() - start
+        size_mb = os.path.getsize(xlsx_path) / (1024 * 1024)
+    rss_after_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return seconds, rss_before_mb, rss_after_mb, size_mb
+
+
+def benchmark_workbook(file_path):
+    """
+    Compares the regular and the write-only openpyxl workbook and the parallel writer
+    on a publication: time to build and save the workbook and the peak memory it adds
+    on top of the tables (for the parallel writer, in the parent process only).
+    Each writer runs in its own process; the tables come from the parse snapshot.
+
+    Args:
+        file_path (str): The path to the XML file to be parsed.
+    """
+    load_or_extract_tables(file_path)  # Parse once so every worker loads the snapshot
+    for name, write_only, parallel in (
+        ("regular", False, False),
+        ("write-only", True, False),
+        ("parallel", True, True),
+    ):
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            seconds, rss_before_mb, rss_after_mb, size_mb = executor.submit(
+                measure_workbook, file_path, write_only, parallel
+            ).result()
+        print(
+            f"{name:>10}: {seconds:7.2f}s, "
+            f"peak RSS {rss_after_mb:7.1f} MB (+{rss_after_mb - rss_before_mb:.1f} MB "
+            f"over the tables), {size_mb:.1f} MB workbook"
         )
 
-        # Parse sanctions entries
-        sanctions_entries_fieldnames, sanctions_entries_data_rows = (
-            sanctions_entries_parser(
-                root, NAMESPACE, list_id_mapping, sanctions_type_mapping
-            )
-        )
-
-        # Create Excel workbook
-        wb = Workbook()
-        # Add feature data to sheet
-        ws_feature = wb.create_sheet("FEATURE")
-        ws_feature.append(feature_fieldnames)
-        for row in feature_data_rows:
-            ws_feature.append([row[field] for field in feature_fieldnames])
-        # Add ID data to sheet
-        ws_id = wb.create_sheet("ID")
-        ws_id.append(id_fieldnames)
-        for row in id_data_rows:
-            ws_id.append([row[field] for field in id_fieldnames])
-        # Add address data to sheet
-        ws_address = wb.create_sheet("ADDRESS")
-        ws_address.append(address_fieldnames)
-        for row in address_data_rows:
-            # Ensure 'CountryRelevanceID' is present in the row dictionary
-            row.setdefault("CountryRelevanceID", "")
-            ws_address.append([row[field] for field in address_fieldnames])
-        # Add sanctions entries data to sheet
-        ws_sanctions_entries = wb.create_sheet("SANCTIONS_ENTRIES")
-        ws_sanctions_entries.append(sanctions_entries_fieldnames)
-        for row in sanctions_entries_data_rows:
-            ws_sanctions_entries.append(row)
-        # Add name data to sheet
-        ws_name = wb.create_sheet("NAME")
-        ws_name.append(name_fieldnames)
-        for row in name_data_rows:
-            ws_name.append(row)
-        # Remove the default sheet created by openpyxl
-        if "Sheet" in wb.sheetnames:
-            wb.remove(wb["Sheet"])
-        # Save the workbook
-        wb.save(XLSX_FILE_PATH)
-        print("Excel file created successfully 🎉")
+
+# util 7 : concurrent multi-list fetcher
+def fetch_and_extract_lists(sources=LIST_SOURCES):
+    """
+    Downloads every list in sources concurrently and writes a workbook for each one.
+
+    The downloads share one pooled session (see list_fetcher.fetch_lists). A list's
+    parse is submitted to a process pool the moment its download is saved, so parsing
+    overlaps the downloads still in flight, and its workbook is written as soon as
+    the parse is done. Unchanged lists (304) keep their existing workbook. A list that
+    fails to download, archive or parse is reported and does not stop the others.
+
+    Args:
+        sources (list): The ListSource entries to fetch.
+
+    Returns:
+        dict: List names mapped to their download status (DOWNLOADED, NOT_MODIFIED, or
+            False if the list failed to download or parse).
+    """
+    sources = [
+        source._replace(
+            file_path=compressed_path(source.file_path, ARCHIVE_COMPRESSION)
+        )
+        for source in sources
+    ]
+    parses = {}
+    failed = set()
+    with ProcessPoolExecutor(
+        max_workers=LIST_PARSE_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as parsers:
+
+        def parse(source, status):
+            xlsx_path = os.path.join(
+                LIST_OUTPUT_DIR, f"{source.name.lower()}_advanced.xlsx"
+            )
+            if not status or (status == NOT_MODIFIED and os.path.exists(xlsx_path)):
+                print(f"{source.name}: {status or 'failed'}, nothing to parse")
+                return None
+            digest = None
+            if status == DOWNLOADED and ARCHIVE_DIR:
+                try:
+                    digest = archive_xml(
+                        source.file_path, state_path_for(source.file_path), source.name
+                    )["id"]
+                except (ArchiveError, OSError) as e:
+                    print(f"{source.name}: cannot be archived: {e}")
+            print(f"{source.name}: {status}, parsing {source.file_path}")
+            future = parsers.submit(
+                load_or_extract_tables, source.file_path, None, digest
+            )
+            parses[future] = (source, xlsx_path)
+            return future
+
+        start = time.perf_counter()
+        results = fetch_lists(
+            sources,
+            parse,
+            max_downloads=LIST_DOWNLOAD_WORKERS,
+            chunk_size=DOWNLOAD_CHUNK_SIZE,
+            retries=DOWNLOAD_RETRIES,
+            backoff_seconds=DOWNLOAD_BACKOFF_SECONDS,
+            verify=False,
+            accept_encoding=DOWNLOAD_ACCEPT_ENCODING,
+            compression=ARCHIVE_COMPRESSION,
+        )
+        for future in as_completed(parses):
+            source, xlsx_path = parses[future]
+            try:
+                tables = future.result()
+            except PARSE_ERRORS as e:
+                print(f"{source.name}: cannot be parsed: {e}")
+                failed.add(source.name)
+                continue
+            write_workbook(tables, xlsx_path)
+            print(f"{source.name}: {xlsx_path} written")
+    print(f"Fetched {len(sources)} lists in {time.perf_counter() - start:.2f}s 🎉")
+    return {
+        name: False if name in failed else status
+        for name, (status, future) in results.items()
+    }
+
+
+# util 8 : mixed-format batch
+def extract_batch(file_paths):
+    """
+    Parses several publications in parallel and writes a "<name>.xlsx" workbook for each
+    one to LIST_OUTPUT_DIR.
+
+    Each publication is parsed with the namespace of its own root element, so one batch
+    can mix lists and schema variants. A file that cannot be parsed is reported and
+    does not stop the others.
+
+    Args:
+        file_paths (list): The plain, gzip or zstd XML files to process.
+
+    Returns:
+        dict: File paths mapped to their workbook path, or None if the file failed.
+    """
+    results = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=min(len(file_paths), os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as parsers:
+        futures = {
+            parsers.submit(load_or_extract_tables, file_path): file_path
+            for file_path in file_paths
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                tables = future.result()
+            except PARSE_ERRORS as e:
+                print(f"{file_path}: cannot be parsed: {e}")
+                results[file_path] = None
+                continue
+            name = os.path.basename(file_path).split(".")[0]
+            xlsx_path = os.path.join(LIST_OUTPUT_DIR, f"{name}.xlsx")
+            write_workbook(tables, xlsx_path)
+            print(f"{file_path}: {xlsx_path} written")
+            results[file_path] = xlsx_path
+    print(
+        f"Processed {len(file_paths)} publications in {time.perf_counter() - start:.2f}s 🎉"
+    )
+    return results
+
+
+# util 9 : configured outputs
+def configured_outputs():
+    """
+    Returns the files every enabled output writes, so a run on an unchanged publication
+    can tell which of them are still missing.
+
+    Returns:
+        dict: Output names ("xlsx", "delimited", "parquet", "arrow", "sqlite", "jsonl")
+            mapped to lists of paths, for the enabled outputs only.
+    """
+    outputs = {"xlsx": [XLSX_FILE_PATH]}
+    if DELIMITED_OUTPUT_DIR:
+        outputs["delimited"] = [
+            delimited_path(DELIMITED_OUTPUT_DIR, sheet) for sheet in SHEET_NAMES
+        ]
+    if PARQUET_OUTPUT_DIR:
+        outputs["parquet"] = [
+            (
+                os.path.join(PARQUET_OUTPUT_DIR, sheet.lower())
+                if PARQUET_PARTITION_BY_DESIGNATION
+                and "Designation" in SHEET_FIELDNAMES[sheet]
+                else os.path.join(PARQUET_OUTPUT_DIR, f"{sheet.lower()}.parquet")
+            )
+            for sheet in SHEET_NAMES
+        ]
+    if ARROW_OUTPUT_DIR:
+        outputs["arrow"] = [
+            os.path.join(ARROW_OUTPUT_DIR, f"{sheet.lower()}.arrow")
+            for sheet in SHEET_NAMES
+        ]
+    if SQLITE_PATH:
+        outputs["sqlite"] = [SQLITE_PATH]
+    if JSONL_PATH:
+        outputs["jsonl"] = [JSONL_PATH]
+    return outputs
+
+
+def main(publication_id=None):
+    """
+    Downloads the latest publication, or takes an archived one, and writes the workbook
+    and the other enabled outputs. When the publication is unchanged (304), the run
+    stops if every output exists, and otherwise builds only the missing ones from the
+    local XML or its parse snapshot.
+
+    Args:
+        publication_id (str): Process this archived SDN publication instead of downloading,
+            by SHA-256 prefix, publish date or "latest" (see find_publication).
+    """
+    tables = None
+    digest = None
+    party_links = {}
+    if publication_id is not None:
+        metadata, xml_file_path = find_publication(
+            archive_dir_for("SDN"), publication_id
+        )
+        print(
+            f"Processing archived publication {metadata['id'][:12]} "
+            f"(published {metadata['publish_date']}) 📦"
+        )
+        download_status = DOWNLOADED
+        digest = metadata["id"]
+    else:
+        xml_file_path = compressed_path(XML_FILE_PATH, ARCHIVE_COMPRESSION)
+        if PARSE_WHILE_DOWNLOADING:
+            download_status, tables = download_extract_tables(
+                XML_URL,
+                xml_file_path,
+                compression=ARCHIVE_COMPRESSION,
+                party_links=party_links,
+            )
+        else:
+            download_status = download_xml(XML_URL, xml_file_path)
+        if (
+            download_status == DOWNLOADED
+            and ARCHIVE_DIR
+            and os.path.exists(xml_file_path)
+        ):
+            digest = archive_xml(xml_file_path)["id"]
+    outputs = configured_outputs()
+    if download_status == NOT_MODIFIED:
+        # Outputs enabled since the last run are built from the local XML (or its snapshot)
+        missing = [
+            name
+            for name, paths in outputs.items()
+            if not all(os.path.exists(path) for path in paths)
+        ]
+        if not missing:
+            print("Publication unchanged, keeping the existing outputs 🎉")
+            return
+        if not os.path.exists(xml_file_path):
+            print(f"Publication unchanged but {xml_file_path} is missing ⚠️")
+            return
+        print(
+            f"Publication unchanged, building the missing outputs: {', '.join(missing)}"
+        )
+    else:
+        missing = list(outputs)
+    if download_status:
+        if tables is None:
+            tables = load_or_extract_tables(
+                xml_file_path, digest=digest, party_links=party_links
+            )
+
+        if "xlsx" in missing:
+            if XLSX_PARALLEL:
+                write_workbook_parallel(
+                    sheet_rows(tables), XLSX_FILE_PATH, XLSX_WORKERS
+                )
+            else:
+                write_workbook(tables, XLSX_FILE_PATH)
+        if "delimited" in missing:
+            write_delimited(
+                sheet_rows(tables),
+                DELIMITED_OUTPUT_DIR,
+                parallel=DELIMITED_PARALLEL,
+                header=DELIMITED_HEADER,
+            )
+        if "parquet" in missing:
+            write_parquet(
+                sheet_rows(tables),
+                PARQUET_OUTPUT_DIR,
+                row_group_rows=PARQUET_ROW_GROUP_ROWS,
+                partition_column=(
+                    "Designation" if PARQUET_PARTITION_BY_DESIGNATION else None
+                ),
+            )
+        if "arrow" in missing:
+            write_arrow_ipc(sheet_rows(tables), ARROW_OUTPUT_DIR)
+        if "sqlite" in missing:
+            write_sqlite(sheet_rows(tables), SQLITE_PATH, party_links=party_links)
+        if "jsonl" in missing:
+            if os.path.exists(xml_file_path):
+                write_party_jsonl(xml_file_path, JSONL_PATH)
+            else:
+                print(f"{xml_file_path} was not archived, no JSON Lines written ⚠️")
 
 
 if __name__ == "__main__":
-    main()
+    if "--url" in sys.argv:
+        # Download from another server, e.g. fixture_server.py for offline runs
+        XML_URL = sys.argv[sys.argv.index("--url") + 1]
+    if "--csv-dir" in sys.argv:
+        DELIMITED_OUTPUT_DIR = sys.argv[sys.argv.index("--csv-dir") + 1]
+    if "--csv-no-header" in sys.argv:
+        DELIMITED_HEADER = False
+    if "--sqlite" in sys.argv:
+        SQLITE_PATH = sys.argv[sys.argv.index("--sqlite") + 1]
+    if "--archive-dir" in sys.argv:
+        ARCHIVE_DIR = sys.argv[sys.argv.index("--archive-dir") + 1]
+    if not ARCHIVE_DIR and ("--list-archive" in sys.argv or "--archive-id" in sys.argv):
+        sys.exit("Archiving is off: set ARCHIVE_DIR or pass --archive-dir <dir>")
+    if "--benchmark" in sys.argv:
+        benchmark_extraction(XML_FILE_PATH, detect_namespace(XML_FILE_PATH))
+    elif "--benchmark-backends" in sys.argv:
+        benchmark_backends(XML_FILE_PATH, detect_namespace(XML_FILE_PATH))
+    elif "--benchmark-xlsx" in sys.argv:
+        benchmark_workbook(XML_FILE_PATH)
+    elif "--benchmark-expat" in sys.argv:
+        benchmark_expat(XML_FILE_PATH, detect_namespace(XML_FILE_PATH))
+    elif "--invalidate-snapshots" in sys.argv:
+        print(f"Deleted {invalidate_snapshots(SNAPSHOT_DIR)} parse snapshots")
+    elif "--batch" in sys.argv:
+        batch = sys.argv[sys.argv.index("--batch") + 1 :]
+        if not batch:
+            sys.exit("--batch needs one or more XML files")
+        extract_batch(batch)
+    elif "--fetch-lists" in sys.argv:
+        fetch_and_extract_lists()
+    elif "--list-archive" in sys.argv:
+        for source in LIST_SOURCES:
+            print(f"{source.name}:")
+            report_archive(archive_dir_for(source.name))
+    elif "--archive-id" in sys.argv:
+        index = sys.argv.index("--archive-id") + 1
+        if index >= len(sys.argv):
+            sys.exit("--archive-id needs a SHA-256 prefix, publish date or 'latest'")
+        try:
+            main(sys.argv[index])
+        except ArchiveError as e:
+            sys.exit(f"Cannot process the archived publication: {e}")
+    else:
+        main()
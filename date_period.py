@@ -0,0 +1,130 @@
+# Description: DatePeriod decoding shared by the feature and ID parsers. A DatePeriod is read in a single
+# scan of its Start/End -> From/To -> Year/Month/Day children (no find() calls), turned into a compact DateRange
+# and formatted once. The scan runs for every DatePeriod; only building and formatting the DateRange is memoized,
+# keyed on the scanned texts, so identical DatePeriods share one DateRange object.
+
+from collections import namedtuple
+from functools import lru_cache
+
+from xml_backends import local_name
+
+# year, month and day hold the element text; a missing element is ""
+DatePoint = namedtuple("DatePoint", ["year", "month", "day"])
+# from_ and to are DatePoints, or None when the bound has no such element
+DateBound = namedtuple("DateBound", ["from_", "to"])
+# start and end are DateBounds, or None when the DatePeriod has no such element.
+# text is the latest known date ("End To", "End From", "Start To", then "Start From"),
+# span is the "<start> to <end>" / "From <start>" / "Until <end>" form, where a bound is its From, or its To
+# when it has no From (see bound_point).
+DateRange = namedtuple("DateRange", ["start", "end", "text", "span"])
+
+EMPTY_POINT = DatePoint("", "", "")
+_POINT_PARTS = {"Year": 0, "Month": 1, "Day": 2}
+
+
+def format_point(point):
+    """Formats a DatePoint as "year-month-day"; a missing point formats as "--"."""
+    if point is None:
+        point = EMPTY_POINT
+    return f"{point.year}-{point.month}-{point.day}"
+
+
+def bound_point(bound):
+    """
+    Returns the point a Start or End bound stands for: its From, or its To when it has
+    no From, as the ".//Year" lookups of the original parsers found them; None for no bound.
+    """
+    if bound is None:
+        return None
+    return bound.from_ or bound.to
+
+
+def _scan_bound(bound):
+    # First From and first To of a Start/End element, each as a (year, month, day) tuple
+    points = {}
+    for point in bound:
+        name = local_name(point.tag) if isinstance(point.tag, str) else None
+        if name not in ("From", "To") or name in points:
+            continue
+        parts = ["", "", ""]
+        seen = [False, False, False]
+        for part in point:
+            index = (
+                _POINT_PARTS.get(local_name(part.tag))
+                if isinstance(part.tag, str)
+                else None
+            )
+            if index is not None and not seen[index]:
+                parts[index] = part.text
+                seen[index] = True
+        points[name] = tuple(parts)
+    return points.get("From"), points.get("To")
+
+
+@lru_cache(maxsize=65536)
+def _decode(start_key, end_key):
+    start = None
+    if start_key is not None:
+        start = DateBound(
+            *(DatePoint(*point) if point else None for point in start_key)
+        )
+    end = None
+    if end_key is not None:
+        end = DateBound(*(DatePoint(*point) if point else None for point in end_key))
+
+    text = ""
+    for bound in (end, start):
+        if bound is not None:
+            point = bound.to or bound.from_
+            if point is not None:
+                text = format_point(point)
+                break
+
+    if start is not None and end is not None:
+        span = f"{format_point(bound_point(start))} to {format_point(bound_point(end))}"
+    elif start is not None:
+        span = f"From {format_point(bound_point(start))}"
+    elif end is not None:
+        span = f"Until {format_point(bound_point(end))}"
+    else:
+        span = ""
+    return DateRange(start, end, text, span)
+
+
+def decode_date_period(date_period):
+    """
+    Decodes a DatePeriod element into a DateRange.
+
+    Args:
+        date_period (Element): The DatePeriod element, or None.
+
+    Returns:
+        DateRange: The decoded range; an empty range when date_period is None.
+    """
+    start_key = None
+    end_key = None
+    if date_period is not None:
+        for bound in date_period:
+            if not isinstance(bound.tag, str):
+                continue
+            name = local_name(bound.tag)
+            if name == "Start" and start_key is None:
+                start_key = _scan_bound(bound)
+            elif name == "End" and end_key is None:
+                end_key = _scan_bound(bound)
+    return _decode(start_key, end_key)
+
+
+def decode_date_bounds(start, end):
+    """
+    Decodes a DatePeriod that was read without building elements, e.g. by a SAX parser.
+
+    Args:
+        start (tuple): (from, to) of the first Start element, or None if there is none;
+            from and to are (year, month, day) text tuples, or None if missing.
+        end (tuple): (from, to) of the first End element, or None if there is none.
+
+    Returns:
+        DateRange: The decoded range, shared with decode_date_period()'s cache.
+    """
+    return _decode(start, end)
@@ -0,0 +1,277 @@
+# Description: Local stand-in for the treasury.gov download server, for offline and reproducible runs. FixtureServer
+# serves publications over HTTP/1.1 with ETag / Last-Modified validators (answering 304), Range / If-Range resumes,
+# gzip Content-Encoding and an optional Repr-Digest checksum, and can misbehave on purpose: throttled (slow link)
+# or stalled bodies, truncated bodies and 503 errors on the first requests. Run "python fixture_server.py
+# --run-pipeline" to serve a synthetic publication and run the whole pipeline against it in a scratch directory.
+
+import argparse
+import base64
+import email.utils
+import gzip
+import hashlib
+import http.server
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from synthetic_publication import publication_bytes
+
+PIPELINE_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "consolidate_parsers_new_namechange_testnewformats.py",
+)
+
+
+class FixturePublication:
+    """
+    A publication served by FixtureServer, and how its responses misbehave.
+
+    Args:
+        body (bytes): The XML document.
+        rate (int): Bytes per second to send the body at, None for full speed.
+        truncate_requests (int): The first N body responses stop a third of the way in.
+        fail_requests (int): The first N requests get a 503 before any of the above.
+        gzip (bool): Send the body gzip-encoded to clients that accept it.
+        digest (bool): Announce the body's SHA-256 in Repr-Digest; the OFAC server does not.
+        stall (float): Seconds to go quiet after the first third of every body, like a stalled connection.
+    """
+
+    def __init__(
+        self,
+        body,
+        rate=None,
+        truncate_requests=0,
+        fail_requests=0,
+        gzip=True,
+        digest=True,
+        stall=None,
+    ):
+        self.rate = rate
+        self.stall = stall
+        self.truncate_requests = truncate_requests
+        self.fail_requests = fail_requests
+        self.gzip = gzip
+        self.digest = digest
+        self.requests = 0
+        self.update(body)
+
+    def update(self, body):
+        """Replaces the document, as a new publication with new validators."""
+        self.body = body
+        self.gzip_body = gzip.compress(body, 6, mtime=0) if self.gzip else None
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        self.last_modified = email.utils.formatdate(time.time(), usegmt=True)
+
+    def representation(self, accept_encoding):
+        """Returns the (body, ETag, Content-Encoding) sent for an Accept-Encoding header."""
+        if self.gzip and "gzip" in (accept_encoding or ""):
+            return self.gzip_body, self.etag[:-1] + '-gzip"', "gzip"
+        return self.body, self.etag, None
+
+
+class _FixtureHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        publication = server.publications.get(self.path.split("?")[0])
+        if publication is None:
+            return self._reply(404)
+        with server.lock:
+            publication.requests += 1
+            number = publication.requests
+        if number <= publication.fail_requests:
+            return self._reply(503, {"Retry-After": "0"})
+
+        body, etag, content_encoding = publication.representation(
+            self.headers.get("Accept-Encoding")
+        )
+        validators = {"ETag": etag, "Last-Modified": publication.last_modified}
+        if self.headers.get("If-None-Match") == etag or (
+            "If-None-Match" not in self.headers
+            and self.headers.get("If-Modified-Since") == publication.last_modified
+        ):
+            return self._reply(304, validators)
+
+        headers = dict(validators, **{"Accept-Ranges": "bytes"})
+        if content_encoding:
+            headers["Content-Encoding"] = content_encoding
+        if publication.digest:
+            digest = base64.b64encode(hashlib.sha256(body).digest()).decode()
+            headers["Repr-Digest"] = f"sha-256=:{digest}:"
+        start = 0
+        match = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match and if_range in (None, etag, publication.last_modified):
+            start = int(match.group(1))
+            if start >= len(body):
+                return self._reply(416, {"Content-Range": f"bytes */{len(body)}"})
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+        body = body[start:]
+        truncated = number <= publication.fail_requests + publication.truncate_requests
+        self._reply(206 if start else 200, headers, len(body))
+        self._send_body(
+            body[: len(body) // 3] if truncated else body,
+            publication.rate,
+            publication.stall,
+        )
+        if truncated:
+            self.close_connection = True
+
+    def _reply(self, status, headers=None, length=0):
+        # Logged first, so a client that has its response finds it in the log
+        self.server.log.append((self.path, status, self.headers.get("Range")))
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(length))
+        self.end_headers()
+
+    def _send_body(self, body, rate, stall=None):
+        if stall:
+            self._send_body(body[: len(body) // 3], rate)
+            time.sleep(stall)
+            body = body[len(body) // 3 :]
+        # Throttled bodies go out in tenth-of-a-second slices
+        step = max(rate // 10, 1) if rate else len(body) or 1
+        for offset in range(0, len(body), step):
+            self.wfile.write(body[offset : offset + step])
+            self.wfile.flush()
+            if rate:
+                time.sleep(0.1)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    A threaded HTTP server for FixturePublications, running in a background thread.
+
+    Use it as a context manager; with port 0 the OS picks a free port.
+
+    Args:
+        host (str): The interface to listen on.
+        port (int): The port to listen on.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self._server = http.server.ThreadingHTTPServer((host, port), _FixtureHandler)
+        self._server.daemon_threads = True
+        self._server.publications = {}
+        self._server.lock = threading.Lock()
+        # (path, status, Range header) of every response
+        self._server.log = []
+        self._thread = None
+
+    @property
+    def log(self):
+        return self._server.log
+
+    def publish(self, path, body, **behaviour):
+        """
+        Serves body at path, replacing what was published there; behaviour as for FixturePublication.
+
+        Returns:
+            FixturePublication: The publication, whose settings can be changed between requests.
+        """
+        publication = FixturePublication(body, **behaviour)
+        self._server.publications[path] = publication
+        return publication
+
+    def url(self, path):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def run_pipeline(url, workdir, *arguments):
+    """
+    Runs the pipeline script in workdir against url and returns its exit code.
+
+    The XML, its download state, snapshots, archive and workbook all go to workdir.
+    """
+    os.makedirs(os.path.join(workdir, "output"), exist_ok=True)
+    command = [sys.executable, PIPELINE_SCRIPT, "--url", url, *arguments]
+    print(f"$ {' '.join(command)}  (in {workdir})")
+    return subprocess.run(command, cwd=workdir).returncode
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(
+        description="Serves a synthetic or given ADVANCED_XML publication locally."
+    )
+    arguments.add_argument(
+        "--file", help="serve this XML file instead of a synthetic one"
+    )
+    arguments.add_argument("--parties", type=int, default=2000)
+    arguments.add_argument("--seed", type=int, default=1)
+    arguments.add_argument("--port", type=int, default=8765)
+    arguments.add_argument(
+        "--rate", type=int, help="throttle bodies to bytes per second"
+    )
+    arguments.add_argument("--truncate", type=int, default=0)
+    arguments.add_argument("--fail", type=int, default=0)
+    arguments.add_argument("--no-gzip", action="store_true")
+    arguments.add_argument(
+        "--no-digest",
+        action="store_true",
+        help="announce no Repr-Digest, like the OFAC server",
+    )
+    arguments.add_argument(
+        "--run-pipeline",
+        action="store_true",
+        help="run the pipeline twice (download, then 304) and exit",
+    )
+    arguments.add_argument("--workdir", default="fixture_run")
+    options = arguments.parse_args()
+
+    if options.file:
+        with open(options.file, "rb") as file:
+            body = file.read()
+    else:
+        body = publication_bytes(parties=options.parties, seed=options.seed)
+    with FixtureServer(port=options.port) as server:
+        server.publish(
+            "/sdn_advanced.xml",
+            body,
+            rate=options.rate,
+            truncate_requests=options.truncate,
+            fail_requests=options.fail,
+            gzip=not options.no_gzip,
+            digest=not options.no_digest,
+        )
+        url = server.url("/sdn_advanced.xml")
+        print(f"Serving {len(body) / (1024 * 1024):.1f} MB at {url}")
+        if options.run_pipeline:
+            for run in range(2):
+                code = run_pipeline(url, options.workdir)
+                if code:
+                    sys.exit(code)
+            for path, status, range_header in server.log:
+                print(
+                    f"  {status} {path}{f' ({range_header})' if range_header else ''}"
+                )
+        else:
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
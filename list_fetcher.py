@@ -0,0 +1,83 @@
+# Description: Concurrent download of several OFAC list publications. All downloads share one requests.Session whose
+# connection pool is sized for the number of parallel downloads; each one goes through xml_download.download_file
+# (conditional GET, exponential-backoff retries, Range resumes) with its own timeouts. As soon as a list is saved it
+# is handed to a callback, so its parse can start while the other lists are still downloading.
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from xml_compression import COMPRESSION_SUFFIXES
+from xml_download import download_file
+
+# name identifies the list, timeout is its (connect, read) timeouts in seconds
+ListSource = namedtuple("ListSource", ["name", "url", "file_path", "timeout"])
+
+
+def create_session(pool_size):
+    """Returns a requests.Session that keeps up to pool_size connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def state_path_for(file_path):
+    """
+    Returns the download state file of a list, e.g. "sdn_advanced.xml.http.json", for
+    its plain or compressed file alike, so every entry point shares one state file.
+    """
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if file_path.endswith(suffix):
+            file_path = file_path[: -len(suffix)]
+            break
+    return file_path + ".http.json"
+
+
+def fetch_lists(sources, on_downloaded, max_downloads=4, **download_options):
+    """
+    Downloads several lists concurrently and hands each one to on_downloaded as soon as it is saved.
+
+    on_downloaded runs on the calling thread, in download completion order, so it can
+    submit the list's parse to an executor without waiting for the remaining downloads.
+
+    Args:
+        sources (list): The ListSource entries to download.
+        on_downloaded (callable): Called with (source, status) for every list, where status is
+            DOWNLOADED, NOT_MODIFIED or False if the download failed.
+        max_downloads (int): The number of downloads running at the same time.
+        **download_options: chunk_size, retries, backoff_seconds, verify, accept_encoding and
+            compression, passed on to download_file for every list.
+
+    Returns:
+        dict: List names mapped to (status, value returned by on_downloaded) tuples, in sources order.
+    """
+    results = {}
+    with create_session(max_downloads) as session, ThreadPoolExecutor(
+        max_workers=max_downloads
+    ) as downloads:
+        futures = {
+            downloads.submit(
+                download_file,
+                session,
+                source.url,
+                source.file_path,
+                state_path_for(source.file_path),
+                timeout=source.timeout,
+                **download_options,
+            ): source
+            for source in sources
+        }
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                status = future.result()
+            except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                # A failed list is reported and does not stop the others
+                print(f"Error downloading {source.name}: {e}")
+                status = False
+            results[source.name] = (status, on_downloaded(source, status))
+    return {source.name: results[source.name] for source in sources}
@@ -0,0 +1,144 @@
+# Description: On-disk snapshots of the extracted sheet tables, keyed by the SHA-256 of the publication they
+# were parsed from. A re-run on a byte-identical sdn_advanced.xml loads the snapshot and skips XML parsing.
+# Snapshots are pickled and gzip-compressed, written atomically, stamped with SNAPSHOT_FORMAT so a parser change
+# invalidates them, and evicted down to the most recently used N.
+
+import gzip
+import hashlib
+import os
+import pickle
+import tempfile
+
+# Bump when the parsers change what they extract, so older snapshots are ignored and evicted
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_SUFFIX = ".snapshot.pkl.gz"
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Returns the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(snapshot_dir, digest):
+    return os.path.join(snapshot_dir, f"{digest}{SNAPSHOT_SUFFIX}")
+
+
+def list_snapshots(snapshot_dir):
+    """Returns the snapshot file paths in a directory, most recently used first."""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    snapshots = []
+    for name in os.listdir(snapshot_dir):
+        if not name.endswith(SNAPSHOT_SUFFIX):
+            continue
+        path = os.path.join(snapshot_dir, name)
+        try:
+            snapshots.append((os.path.getmtime(path), path))
+        except FileNotFoundError:  # Evicted by a parse running in parallel
+            continue
+    return [path for mtime, path in sorted(snapshots, reverse=True)]
+
+
+def load_snapshot(snapshot_dir, digest):
+    """
+    Loads the snapshot of a publication.
+
+    A snapshot written by another SNAPSHOT_FORMAT, or one that cannot be read, is
+    deleted and treated as missing.
+
+    Args:
+        snapshot_dir (str): The directory holding the snapshots.
+        digest (str): The SHA-256 digest of the publication.
+
+    Returns:
+        dict: The snapshot payload ("tables", "reference_values" and "party_links"), or None if there is none.
+    """
+    path = snapshot_path(snapshot_dir, digest)
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rb") as file:
+            snapshot = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError) as e:
+        print(f"Discarding unreadable snapshot {path}: {e}")
+        os.remove(path)
+        return None
+    if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("digest") != digest:
+        os.remove(path)
+        return None
+    # Loading counts as a use for the keep-last-N eviction
+    os.utime(path)
+    return snapshot
+
+
+def save_snapshot(
+    snapshot_dir, digest, tables, reference_values=None, keep=None, party_links=None
+):
+    """
+    Saves the extracted tables of a publication, then evicts older snapshots.
+
+    Args:
+        snapshot_dir (str): The directory holding the snapshots.
+        digest (str): The SHA-256 digest of the publication.
+        tables (dict): Sheet names mapped to (fieldnames, data_rows) tuples.
+        reference_values (dict): Reference table names mapped to ID to text dictionaries.
+        keep (int): The number of snapshots to keep, None keeps all of them.
+        party_links (dict): The Profile and SanctionsEntry links the per-party JSON Lines are built from.
+
+    Returns:
+        str: The path of the snapshot file.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "digest": digest,
+        "tables": tables,
+        "reference_values": reference_values or {},
+        "party_links": party_links or {},
+    }
+    path = snapshot_path(snapshot_dir, digest)
+    # Write next to the target and rename, so a crash never leaves a partial snapshot
+    fd, temp_path = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(
+            fileobj=raw, mode="wb", compresslevel=1
+        ) as file:
+            pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if keep is not None:
+        evict_snapshots(snapshot_dir, keep)
+    return path
+
+
+def evict_snapshots(snapshot_dir, keep):
+    """Deletes all but the `keep` most recently used snapshots and returns the deleted paths."""
+    evicted = list_snapshots(snapshot_dir)[max(keep, 0) :]
+    for path in evicted:
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # Already evicted by a parse running in parallel
+            pass
+    return evicted
+
+
+def invalidate_snapshots(snapshot_dir, digest=None):
+    """
+    Deletes the snapshot of one publication, or every snapshot when digest is None.
+
+    Returns:
+        int: The number of snapshots deleted.
+    """
+    if digest is not None:
+        path = snapshot_path(snapshot_dir, digest)
+        if not os.path.exists(path):
+            return 0
+        os.remove(path)
+        return 1
+    return len(evict_snapshots(snapshot_dir, 0))
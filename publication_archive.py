@@ -0,0 +1,212 @@
+# Description: Content-addressed archive of downloaded publications. Each publication is stored once under the
+# SHA-256 of its XML as "<sha256>.xml[.gz|.zst]", next to a "<sha256>.json" metadata file (publish date from the
+# DateOfIssue header, ETag, Last-Modified, size, when it was first and last archived). Archiving a publication that
+# is already stored only refreshes its metadata. Retention keeps the newest N and/or the ones seen in the last N days.
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+from xml_backends import local_name
+from xml_compression import (
+    COMPRESSION_SUFFIXES,
+    detect_compression,
+    xml_sha256,
+    xml_source,
+)
+
+METADATA_SUFFIX = ".json"
+
+
+class ArchiveError(LookupError):
+    """An archive ID that matches no publication, or more than one."""
+
+
+def read_publish_date(file_path):
+    """
+    Reads the DateOfIssue header of a publication without parsing the rest of it.
+
+    Returns:
+        str: The date as "year-month-day", or None if the header has no DateOfIssue.
+    """
+    parts = {}
+    with xml_source(file_path) as source:
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            name = local_name(element.tag)
+            if event == "start":
+                # DateOfIssue comes first; any other section means there is none
+                if name not in ("Sanctions", "DateOfIssue", "Year", "Month", "Day"):
+                    break
+            elif name in ("Year", "Month", "Day"):
+                parts[name] = (element.text or "").strip()
+            elif name == "DateOfIssue":
+                break
+    if not parts:
+        return None
+    return f"{parts.get('Year', '')}-{parts.get('Month', '').zfill(2)}-{parts.get('Day', '').zfill(2)}"
+
+
+def _metadata_path(archive_dir, publication_id):
+    return os.path.join(archive_dir, publication_id + METADATA_SUFFIX)
+
+
+def _write_metadata(archive_dir, metadata):
+    # Write next to the target and rename, so a crash never leaves partial metadata
+    fd, temp_path = tempfile.mkstemp(dir=archive_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        json.dump(metadata, file, indent=2)
+    os.replace(temp_path, _metadata_path(archive_dir, metadata["id"]))
+
+
+def list_publications(archive_dir):
+    """Returns the metadata of every archived publication, most recently seen first."""
+    if not os.path.isdir(archive_dir):
+        return []
+    publications = []
+    for name in os.listdir(archive_dir):
+        if not name.endswith(METADATA_SUFFIX):
+            continue
+        try:
+            with open(os.path.join(archive_dir, name), encoding="utf-8") as file:
+                metadata = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if os.path.exists(os.path.join(archive_dir, metadata.get("file", ""))):
+            publications.append(metadata)
+    return sorted(publications, key=lambda item: item["last_seen"], reverse=True)
+
+
+def archive_publication(archive_dir, file_path, download_state=None, digest=None):
+    """
+    Stores a publication in the archive, unless the same XML is already there.
+
+    The file is hard-linked into the archive when the file system allows it (the
+    downloads replace the working file rather than writing into it), otherwise copied.
+
+    Args:
+        archive_dir (str): The archive directory.
+        file_path (str): The plain, gzip or zstd publication to archive.
+        download_state (dict): The url / etag / last_modified of its download, if any.
+        digest (str): The SHA-256 of the XML, if the caller already has it.
+
+    Returns:
+        tuple: The publication's metadata and whether it was newly stored.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    digest = digest or xml_sha256(file_path)
+    download_state = download_state or {}
+    now = time.time()
+    metadata_path = _metadata_path(archive_dir, digest)
+    if os.path.exists(metadata_path):
+        with open(metadata_path, encoding="utf-8") as file:
+            metadata = json.load(file)
+        if os.path.exists(os.path.join(archive_dir, metadata["file"])):
+            metadata["last_seen"] = now
+            metadata["etag"] = download_state.get("etag") or metadata.get("etag")
+            _write_metadata(archive_dir, metadata)
+            return metadata, False
+
+    compression = detect_compression(file_path)
+    stored_name = digest + ".xml" + COMPRESSION_SUFFIXES.get(compression, "")
+    stored_path = os.path.join(archive_dir, stored_name)
+    temp_path = stored_path + ".tmp"
+    try:
+        os.link(file_path, temp_path)
+    except OSError:
+        shutil.copyfile(file_path, temp_path)
+    os.replace(temp_path, stored_path)
+    metadata = {
+        "id": digest,
+        "file": stored_name,
+        "publish_date": read_publish_date(stored_path),
+        "url": download_state.get("url"),
+        "etag": download_state.get("etag"),
+        "last_modified": download_state.get("last_modified"),
+        "compression": compression,
+        "size": os.path.getsize(stored_path),
+        "archived_at": now,
+        "last_seen": now,
+    }
+    _write_metadata(archive_dir, metadata)
+    return metadata, True
+
+
+def find_publication(archive_dir, publication_id):
+    """
+    Looks up an archived publication by its SHA-256, a unique prefix of it, its
+    publish date ("2024-07-12", the latest one archived for that date) or "latest".
+
+    Returns:
+        tuple: The publication's metadata and the path of its XML file.
+
+    Raises:
+        ArchiveError: If no publication, or more than one by prefix, matches.
+    """
+    publications = list_publications(archive_dir)
+    if publication_id == "latest":
+        matches = publications[:1]
+    else:
+        matches = [
+            item for item in publications if item["id"].startswith(publication_id)
+        ]
+        if not matches:
+            matches = [
+                item
+                for item in publications
+                if item.get("publish_date") == publication_id
+            ][:1]
+    if not matches:
+        raise ArchiveError(f"No archived publication matches {publication_id!r}")
+    if len(matches) > 1:
+        raise ArchiveError(
+            f"{publication_id!r} matches {len(matches)} archived publications"
+        )
+    return matches[0], os.path.join(archive_dir, matches[0]["file"])
+
+
+def apply_retention(archive_dir, keep=None, keep_days=None):
+    """
+    Deletes the publications outside the retention policy. The most recently
+    seen publication is always kept.
+
+    Args:
+        archive_dir (str): The archive directory.
+        keep (int): Keep at most this many publications, None for no limit.
+        keep_days (float): Keep only publications seen in the last keep_days days, None for no limit.
+
+    Returns:
+        list: The metadata of the deleted publications.
+    """
+    publications = list_publications(archive_dir)
+    cutoff = time.time() - keep_days * 86400 if keep_days is not None else None
+    deleted = []
+    for index, metadata in enumerate(publications):
+        if index == 0:
+            continue
+        if (keep is not None and index >= keep) or (
+            cutoff is not None and metadata["last_seen"] < cutoff
+        ):
+            os.remove(os.path.join(archive_dir, metadata["file"]))
+            os.remove(_metadata_path(archive_dir, metadata["id"]))
+            deleted.append(metadata)
+    return deleted
+
+
+def report_archive(archive_dir):
+    """Prints the archived publications, newest first."""
+    publications = list_publications(archive_dir)
+    if not publications:
+        print(f"No publications archived in {archive_dir}")
+        return
+    for metadata in publications:
+        archived_at = time.strftime(
+            "%Y-%m-%d %H:%M", time.localtime(metadata["archived_at"])
+        )
+        print(
+            f"{metadata['id'][:12]}  published {metadata.get('publish_date') or '?':<10}  "
+            f"archived {archived_at}  {metadata['size'] / (1024 * 1024):7.1f} MB  "
+            f"ETag {metadata.get('etag') or '-'}"
+        )
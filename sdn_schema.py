@@ -0,0 +1,226 @@
+# Description: Accessor layer for the OFAC ADVANCED_XML schema. SCHEMA_CHILDREN holds the content model
+# (allowed child elements, in schema order) of every element the parsers read, and schema_path() turns it into
+# direct child paths such as "ns:Profile/ns:Feature", so lookups never fall back to ".//" descendant searches.
+# Unlike those searches, a direct path does not reach into nested elements when the direct child is missing.
+# check_structure() is the strict mode: it flags any element a new publication has where the schema has none.
+
+import xml.etree.ElementTree as ET
+from collections import deque
+from functools import lru_cache
+
+from xml_backends import local_name
+
+XSD_NAMESPACE = {"xs": "http://www.w3.org/2001/XMLSchema"}
+
+# Content models from ADVANCED_XML.xsd for the elements we read. Leaves map to an empty tuple.
+# Regenerate with children_from_xsd() when OFAC publishes a new schema version.
+SCHEMA_CHILDREN = {
+    "Sanctions": (
+        "DateOfIssue",
+        "ReferenceValueSets",
+        "Locations",
+        "IDRegDocuments",
+        "DistinctParties",
+        "ProfileRelationships",
+        "SanctionsEntries",
+        "SanctionsEntryLinks",
+    ),
+    "Locations": ("Location",),
+    "IDRegDocuments": ("IDRegDocument",),
+    "DistinctParties": ("DistinctParty",),
+    "SanctionsEntries": ("SanctionsEntry",),
+    # DistinctParty / Profile
+    "DistinctParty": ("Comment", "Profile"),
+    "Profile": (
+        "Comment",
+        "Identity",
+        "Feature",
+        "SanctionsEntryReference",
+        "ExternalReference",
+    ),
+    "Identity": ("Alias", "NamePartGroups"),
+    "Alias": ("Comment", "DatePeriod", "DocumentedName"),
+    "DocumentedName": ("DocumentedNamePart", "DocumentedNameCountry"),
+    "DocumentedNamePart": ("NamePartValue",),
+    "NamePartValue": (),
+    "NamePartGroups": ("MasterNamePartGroup",),
+    "MasterNamePartGroup": ("NamePartGroup",),
+    "NamePartGroup": (),
+    "Feature": ("FeatureVersion", "IdentityReference"),
+    "FeatureVersion": ("Comment", "DatePeriod", "VersionDetail", "VersionLocation"),
+    "VersionDetail": (),
+    "VersionLocation": (),
+    "IdentityReference": (),
+    # Location
+    "Location": (
+        "Comment",
+        "LocationAreaCode",
+        "LocationCountry",
+        "LocationPart",
+        "FeatureVersionReference",
+        "IDRegDocumentReference",
+    ),
+    "LocationAreaCode": (),
+    "LocationCountry": (),
+    "LocationPart": ("LocationPartValue",),
+    "LocationPartValue": ("Comment", "Value"),
+    "FeatureVersionReference": (),
+    "IDRegDocumentReference": (),
+    # IDRegDocument
+    "IDRegDocument": (
+        "Comment",
+        "IDRegistrationNo",
+        "IssuingAuthority",
+        "DocumentDate",
+        "IDRegDocumentMention",
+        "FeatureVersionReference",
+        "DocumentedNameReference",
+        "ProfileRelationshipReference",
+    ),
+    "IDRegistrationNo": (),
+    "IssuingAuthority": (),
+    "DocumentDate": ("DatePeriod",),
+    # SanctionsEntry
+    "SanctionsEntry": ("EntryEvent", "SanctionsMeasure"),
+    "EntryEvent": ("Date", "Comment"),
+    "SanctionsMeasure": ("Comment", "DatePeriod"),
+    # Dates
+    "DatePeriod": ("Comment", "Start", "End", "DurationMinimum", "DurationMaximum"),
+    "Start": ("From", "To"),
+    "End": ("From", "To"),
+    "From": ("Year", "Month", "Day"),
+    "To": ("Year", "Month", "Day"),
+    "Date": ("Year", "Month", "Day"),
+    "Year": (),
+    "Month": (),
+    "Day": (),
+    "Comment": (),
+    "Value": (),
+}
+
+
+@lru_cache(maxsize=None)
+def schema_path(parent, target, prefix="ns"):
+    """
+    Returns the direct child path from a parent element to the first target element
+    the schema allows below it, e.g. schema_path("DistinctParty", "Feature") is
+    "ns:Profile/ns:Feature" and schema_path("Start", "Year") is "ns:From/ns:Year".
+
+    Children are searched in schema order, so when the element exists at that path it
+    is the one a ".//" search found first. When it does not, the path matches nothing,
+    where ".//" fell through to a nested element of the same name: a FeatureVersion or
+    SanctionsMeasure without a Comment of its own no longer takes the Comment of its
+    DatePeriod, and a Start without From no longer finds the Year of its To (date
+    bounds fall back to To explicitly, see date_period.bound_point).
+
+    Raises:
+        KeyError: If the schema has no path from parent to target.
+    """
+    queue = deque([(parent, ())])
+    seen = {parent}
+    while queue:
+        tag, steps = queue.popleft()
+        for child in SCHEMA_CHILDREN.get(tag, ()):
+            if child == target:
+                return "/".join(f"{prefix}:{step}" for step in steps + (child,))
+            if child not in seen:
+                seen.add(child)
+                queue.append((child, steps + (child,)))
+    raise KeyError(f"No {target} element below {parent} in the ADVANCED_XML schema")
+
+
+def check_structure(element, drift):
+    """
+    Strict mode check: counts every child element the schema does not allow under its parent.
+
+    Args:
+        element (Element): The element to check, e.g. a DistinctParty record.
+        drift (Counter): "Parent/Child" keys mapped to the number of times they were seen.
+    """
+    parent = local_name(element.tag)
+    allowed = SCHEMA_CHILDREN.get(parent)
+    if allowed is None:
+        return
+    for child in element:
+        if not isinstance(child.tag, str):
+            continue
+        child_name = local_name(child.tag)
+        if child_name not in allowed:
+            drift[f"{parent}/{child_name}"] += 1
+        else:
+            check_structure(child, drift)
+
+
+def report_schema_drift(drift):
+    """Prints the elements that are not in the schema, or a confirmation if there are none."""
+    if not drift:
+        print("Schema check: publication matches the ADVANCED_XML schema ✅")
+        return
+    print(
+        f"Schema check: {sum(drift.values())} elements not in the ADVANCED_XML schema ⚠️"
+    )
+    for path, count in drift.most_common():
+        print(f"  {path}: {count}")
+
+
+def children_from_xsd(xsd_path):
+    """
+    Builds a SCHEMA_CHILDREN style table from an ADVANCED_XML.xsd file.
+
+    Named complex types, inline complex types and complexContent extensions are
+    followed; the child elements of an element name are merged across every place
+    the schema declares it.
+
+    Args:
+        xsd_path (str): The path to the XSD file.
+
+    Returns:
+        dict: Element names mapped to tuples of child element names, in schema order.
+    """
+    schema = ET.parse(xsd_path).getroot()
+    complex_types = {
+        complex_type.attrib["name"]: complex_type
+        for complex_type in schema.iter(f"{{{XSD_NAMESPACE['xs']}}}complexType")
+        if "name" in complex_type.attrib
+    }
+    children = {}
+
+    def content_elements(node, visited_types):
+        for child in node:
+            tag = local_name(child.tag)
+            if tag == "element":
+                yield child
+            elif tag == "extension":
+                base = complex_types.get(
+                    child.attrib.get("base", "").rpartition(":")[2]
+                )
+                if base is not None and base not in visited_types:
+                    yield from content_elements(base, visited_types | {base})
+                yield from content_elements(child, visited_types)
+            elif tag in ("sequence", "choice", "all", "complexContent", "complexType"):
+                yield from content_elements(child, visited_types)
+
+    def visit(element_node):
+        name = element_node.attrib.get("name") or element_node.attrib.get("ref", "")
+        name = name.rpartition(":")[2]
+        complex_type = element_node.find("xs:complexType", XSD_NAMESPACE)
+        if complex_type is None:
+            complex_type = complex_types.get(
+                element_node.attrib.get("type", "").rpartition(":")[2]
+            )
+        names = children.setdefault(name, [])
+        # Shared and recursive types are only expanded once per element name
+        if complex_type is None or (name, complex_type) in expanded:
+            return
+        expanded.add((name, complex_type))
+        for child in content_elements(complex_type, frozenset([complex_type])):
+            child_name = child.attrib.get("name") or child.attrib.get("ref", "")
+            child_name = child_name.rpartition(":")[2]
+            if child_name not in names:
+                names.append(child_name)
+            visit(child)
+
+    expanded = set()
+    for element_node in schema.findall("xs:element", XSD_NAMESPACE):
+        visit(element_node)
+    return {name: tuple(names) for name, names in children.items()}
@@ -0,0 +1,463 @@
+# Description: Writers for the sheet tables besides the Excel workbook. Every writer takes the sheets as
+# (sheet name, fieldnames, rows) tuples, with rows as lists of values in column order, as yielded by
+# sheet_rows() in the pipeline script. write_delimited() writes the tab-separated "<sheet>.csv" files of the
+# "csv files" layout in buffered batches, optionally one sheet per worker process. write_parquet() writes one
+# Parquet file per sheet with the low-cardinality columns dictionary-encoded, and write_arrow_ipc() one uncompressed
+# Arrow IPC (Feather V2) file per sheet that readers memory-map with read_arrow_ipc() (both need pyarrow).
+# write_sqlite() bulk-loads all sheets into one indexed SQLite database, one table per sheet, and lookup_fixed_ref()
+# reads a party back from it.
+
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, only needed for Parquet and Arrow
+    pa = pq = None
+
+# Characters that would break a row of the unquoted tab-separated layout
+_DELIMITED_ESCAPES = str.maketrans({"\t": " ", "\r": " ", "\n": " "})
+# Columns holding a handful of distinct values, stored as a dictionary plus small integer indices
+CATEGORICAL_COLUMNS = {
+    "FeatureType",
+    "ReliabilityValue",
+    "Designation",
+    "Alias Type",
+    "Script",
+    "Country",
+    "Document_Type_Name",
+}
+# Columns indexed in every SQLite table that has them, and the per-sheet ones (document numbers)
+SQLITE_INDEXED_COLUMNS = ("FixedRef", "DocumentedNameID", "Country")
+SQLITE_SHEET_INDEXES = {"ID": ("Value",)}
+# Tables whose "FixedRef" column holds another ID: the SANCTIONS_ENTRIES one is the SanctionsEntry ID
+NOT_PARTY_FIXED_REF_TABLES = {"SANCTIONS_ENTRIES"}
+# The table linking every SanctionsEntry ID to the ProfileID and FixedRef of its party, written from the party
+# links; lookup_fixed_ref() finds a party's SANCTIONS_ENTRIES rows through it
+SQLITE_PARTY_LINKS_TABLE = "SANCTIONS_ENTRY_PARTIES"
+SQLITE_PARTY_LINKS_FIELDNAMES = ["SanctionsEntryID", "ProfileID", "FixedRef"]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError(
+            "The Parquet and Arrow exports need the pyarrow package installed"
+        )
+
+
+def delimited_path(output_dir, sheet):
+    """Returns the file a sheet is written to, e.g. "<output_dir>/name.csv" for NAME."""
+    return os.path.join(output_dir, f"{sheet.lower()}.csv")
+
+
+def _delimited_line(row):
+    values = ["" if value is None else str(value) for value in row]
+    line = "\t".join(values)
+    # Values almost never hold a tab or line break, so only escape when the joined line shows one
+    if line.count("\t") != len(values) - 1 or "\n" in line or "\r" in line:
+        line = "\t".join(value.translate(_DELIMITED_ESCAPES) for value in values)
+    return line
+
+
+def write_delimited_sheet(path, fieldnames, rows, batch_rows=10000, header=True):
+    """
+    Writes one sheet as tab-separated UTF-8 text with "\\n" line ends and no quoting,
+    like the files in "csv files". None is written as an empty field, and tabs or line
+    breaks inside a value are replaced by spaces.
+
+    Rows are formatted batch_rows at a time and each batch goes out in a single write.
+
+    Args:
+        path (str): The file to write.
+        fieldnames (list): The column names, in column order.
+        rows (iterable): The rows, as lists of values in column order.
+        batch_rows (int): The number of rows formatted per write.
+        header (bool): Write the column names as the first line.
+
+    Returns:
+        int: The number of rows written, without the header.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="", buffering=1024 * 1024) as file:
+        if header:
+            file.write(_delimited_line(fieldnames) + "\n")
+        batch = []
+        for row in rows:
+            batch.append(_delimited_line(row))
+            if len(batch) >= batch_rows:
+                file.write("\n".join(batch) + "\n")
+                count += len(batch)
+                batch = []
+        if batch:
+            file.write("\n".join(batch) + "\n")
+            count += len(batch)
+    return count
+
+
+# Sheets handed to forked writer processes; they inherit the rows instead of receiving them pickled
+_FORKED_SHEETS = {}
+
+
+def _write_forked_sheet(sheet, path, batch_rows, header):
+    fieldnames, rows = _FORKED_SHEETS[sheet]
+    return write_delimited_sheet(path, fieldnames, rows, batch_rows, header)
+
+
+def write_delimited(sheets, output_dir, parallel=False, batch_rows=10000, header=True):
+    """
+    Writes every sheet to "<output_dir>/<sheet>.csv".
+
+    With parallel set, each sheet is written by its own forked process, which inherits
+    the rows from this one, so nothing is pickled; where fork is not available the
+    sheets are written one after another.
+
+    Args:
+        sheets (iterable): (sheet name, fieldnames, rows) tuples.
+        output_dir (str): The directory to write the files to.
+        parallel (bool): Write the sheets in parallel processes.
+        batch_rows (int): The number of rows formatted per write.
+        header (bool): Write the column names as the first line of every file.
+
+    Returns:
+        dict: Sheet names mapped to the number of rows written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    sheets = list(sheets)
+    counts = {}
+    if parallel and "fork" in multiprocessing.get_all_start_methods():
+        _FORKED_SHEETS.update(
+            (sheet, (fieldnames, rows)) for sheet, fieldnames, rows in sheets
+        )
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(len(sheets), os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("fork"),
+            ) as writers:
+                futures = {
+                    sheet: writers.submit(
+                        _write_forked_sheet,
+                        sheet,
+                        delimited_path(output_dir, sheet),
+                        batch_rows,
+                        header,
+                    )
+                    for sheet, fieldnames, rows in sheets
+                }
+                counts = {sheet: future.result() for sheet, future in futures.items()}
+        finally:
+            _FORKED_SHEETS.clear()
+    else:
+        for sheet, fieldnames, rows in sheets:
+            counts[sheet] = write_delimited_sheet(
+                delimited_path(output_dir, sheet), fieldnames, rows, batch_rows, header
+            )
+    print(
+        f"Tab-separated files written to {output_dir} in {time.perf_counter() - start:.2f}s "
+        f"({sum(counts.values())} rows) 🎉"
+    )
+    return counts
+
+
+def sheet_table(fieldnames, rows):
+    """
+    Builds an Arrow table of one sheet. Every column is a string column, with None as
+    null; the CATEGORICAL_COLUMNS are dictionary-encoded.
+
+    Args:
+        fieldnames (list): The column names, in column order.
+        rows (iterable): The rows, as lists of values in column order.
+
+    Returns:
+        pyarrow.Table: The sheet.
+    """
+    _require_pyarrow()
+    columns = list(zip(*rows)) or [()] * len(fieldnames)
+    arrays = []
+    for field, values in zip(fieldnames, columns):
+        array = pa.array(values, type=pa.string())
+        arrays.append(
+            array.dictionary_encode() if field in CATEGORICAL_COLUMNS else array
+        )
+    return pa.Table.from_arrays(arrays, names=fieldnames)
+
+
+def write_parquet(
+    sheets,
+    output_dir,
+    row_group_rows=32768,
+    partition_column=None,
+    compression="zstd",
+):
+    """
+    Writes every sheet to "<output_dir>/<sheet>.parquet".
+
+    Each column is stored on its own in every row group, so a reader can load one
+    column, or one row group per thread, without scanning the rest of the file. The
+    CATEGORICAL_COLUMNS are kept dictionary-encoded and read back as dictionary columns.
+
+    With partition_column set, the sheets that have that column (NAME for "Designation")
+    are written instead as a "<output_dir>/<sheet>/<column>=<value>/" dataset, one
+    directory per value, so a reader can skip the partitions it does not need.
+
+    Args:
+        sheets (iterable): (sheet name, fieldnames, rows) tuples.
+        output_dir (str): The directory to write the files to.
+        row_group_rows (int): The maximum number of rows per row group.
+        partition_column (str): The column to partition by, None to write plain files.
+        compression (str): The Parquet compression codec.
+
+    Returns:
+        dict: Sheet names mapped to the file or dataset directory written.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    _require_pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    paths = {}
+    for sheet, fieldnames, rows in sheets:
+        table = sheet_table(fieldnames, rows)
+        dictionary_columns = [
+            field for field in fieldnames if field in CATEGORICAL_COLUMNS
+        ]
+        if partition_column in fieldnames:
+            path = os.path.join(output_dir, sheet.lower())
+            # A stale partition would otherwise stay in the dataset
+            shutil.rmtree(path, ignore_errors=True)
+            pq.write_to_dataset(
+                table,
+                path,
+                partition_cols=[partition_column],
+                row_group_size=row_group_rows,
+                use_dictionary=dictionary_columns,
+                compression=compression,
+            )
+        else:
+            path = os.path.join(output_dir, f"{sheet.lower()}.parquet")
+            pq.write_table(
+                table,
+                path,
+                row_group_size=row_group_rows,
+                use_dictionary=dictionary_columns,
+                compression=compression,
+            )
+        paths[sheet] = path
+    print(
+        f"Parquet files written to {output_dir} in {time.perf_counter() - start:.2f}s 🎉"
+    )
+    return paths
+
+
+def write_arrow_ipc(sheets, output_dir):
+    """
+    Writes every sheet to "<output_dir>/<sheet>.arrow", an uncompressed Arrow IPC file
+    (Feather V2) laid out exactly as Arrow keeps it in memory, so a reader that
+    memory-maps it uses the columns in place instead of decoding them.
+
+    Each file is written next to its target and renamed over it, so a service that has
+    the previous file mapped keeps reading the old version until it reloads.
+
+    Args:
+        sheets (iterable): (sheet name, fieldnames, rows) tuples.
+        output_dir (str): The directory to write the files to.
+
+    Returns:
+        dict: Sheet names mapped to the file written.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    _require_pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    paths = {}
+    for sheet, fieldnames, rows in sheets:
+        table = sheet_table(fieldnames, rows)
+        path = os.path.join(output_dir, f"{sheet.lower()}.arrow")
+        temp_path = path + ".tmp"
+        with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(
+            sink, table.schema
+        ) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, path)
+        paths[sheet] = path
+    print(
+        f"Arrow IPC files written to {output_dir} in {time.perf_counter() - start:.2f}s 🎉"
+    )
+    return paths
+
+
+def read_arrow_ipc(path):
+    """
+    Memory-maps a sheet written by write_arrow_ipc. The columns point into the mapped
+    file, so loading takes no time or memory up front and pages are read on access.
+
+    Returns:
+        pyarrow.Table: The sheet.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    _require_pyarrow()
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _quote(identifier):
+    # Column names such as "Alias Type" and "State/ Province" need quoting in SQL
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def write_sqlite(sheets, db_path, batch_rows=50000, party_links=None):
+    """
+    Loads every sheet into a table of the same name in a new SQLite database, then
+    indexes the FixedRef, DocumentedNameID and Country columns wherever they occur and
+    the document numbers (ID.Value).
+
+    With party_links, the SQLITE_PARTY_LINKS_TABLE maps every SanctionsEntry ID to the
+    ProfileID and FixedRef of its party (FixedRef is NULL for an unknown Profile), so
+    the SANCTIONS_ENTRIES rows can be joined to their party.
+
+    The rows go in with executemany, batch_rows at a time, inside a single transaction,
+    with the rollback journal and fsyncs turned off for the load. That is safe because
+    the database is built under a temporary name and only renamed over db_path once
+    it is complete and back on the default journal_mode and synchronous settings.
+
+    Args:
+        sheets (iterable): (sheet name, fieldnames, rows) tuples.
+        db_path (str): The database file to write; an existing one is replaced.
+        batch_rows (int): The number of rows per executemany call.
+        party_links (dict): The party links of the same parse (see build_party_links in
+            the pipeline script), None to leave the link table out.
+
+    Returns:
+        dict: Sheet names mapped to the number of rows loaded.
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = db_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    start = time.perf_counter()
+    counts = {}
+    connection = sqlite3.connect(temp_path, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute("PRAGMA cache_size = -262144")  # 256 MB
+        connection.execute("BEGIN")
+        indexes = []
+        for sheet, fieldnames, rows in sheets:
+            columns = ", ".join(f"{_quote(field)} TEXT" for field in fieldnames)
+            connection.execute(f"CREATE TABLE {_quote(sheet)} ({columns})")
+            insert = (
+                f"INSERT INTO {_quote(sheet)} VALUES "
+                f"({', '.join('?' * len(fieldnames))})"
+            )
+            counts[sheet] = 0
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    connection.executemany(insert, batch)
+                    counts[sheet] += len(batch)
+                    batch = []
+            connection.executemany(insert, batch)
+            counts[sheet] += len(batch)
+            indexes.extend(
+                (sheet, field)
+                for field in fieldnames
+                if field in SQLITE_INDEXED_COLUMNS
+                or field in SQLITE_SHEET_INDEXES.get(sheet, ())
+            )
+        if party_links is not None:
+            _load_party_links(connection, party_links)
+            indexes.extend(
+                (SQLITE_PARTY_LINKS_TABLE, field)
+                for field in ("SanctionsEntryID", "FixedRef")
+            )
+        load_seconds = time.perf_counter() - start
+        for sheet, field in indexes:
+            name = f"{sheet}_{field}".lower().replace(" ", "_")
+            connection.execute(
+                f"CREATE INDEX {_quote(name)} ON {_quote(sheet)} ({_quote(field)})"
+            )
+        connection.execute("COMMIT")
+        connection.execute("ANALYZE")
+        connection.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        connection.close()
+    os.replace(temp_path, db_path)
+    print(
+        f"SQLite database {db_path} written in {time.perf_counter() - start:.2f}s "
+        f"({sum(counts.values())} rows loaded in {load_seconds:.2f}s, "
+        f"{len(indexes)} indexes, {os.path.getsize(db_path) / (1024 * 1024):.1f} MB) 🎉"
+    )
+    return counts
+
+
+def _load_party_links(connection, party_links):
+    profiles = party_links.get("profiles", {})
+    columns = ", ".join(
+        f"{_quote(field)} TEXT" for field in SQLITE_PARTY_LINKS_FIELDNAMES
+    )
+    connection.execute(f"CREATE TABLE {_quote(SQLITE_PARTY_LINKS_TABLE)} ({columns})")
+    connection.executemany(
+        f"INSERT INTO {_quote(SQLITE_PARTY_LINKS_TABLE)} VALUES (?, ?, ?)",
+        (
+            (entry_id, profile_id, profiles.get(profile_id))
+            for entry_id, profile_id in party_links.get("sanctions_entries", {}).items()
+        ),
+    )
+
+
+def lookup_fixed_ref(connection, fixed_ref):
+    """
+    Returns the rows of a party from every table of a database written by write_sqlite.
+
+    The FixedRef column of SANCTIONS_ENTRIES holds the SanctionsEntry ID, which is not
+    the party's FixedRef, so its rows are joined to the party through the
+    SQLITE_PARTY_LINKS_TABLE instead; without that table (a database written without
+    party links) SANCTIONS_ENTRIES is left out.
+
+    Args:
+        connection (sqlite3.Connection): The open database.
+        fixed_ref (str): The party's FixedRef.
+
+    Returns:
+        dict: Table names mapped to lists of row tuples, for the sheet tables with a FixedRef column.
+    """
+    names = [
+        name
+        for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+    ]
+    rows = {}
+    for name in names:
+        if name == SQLITE_PARTY_LINKS_TABLE or not any(
+            column[1] == "FixedRef"
+            for column in connection.execute(f"PRAGMA table_info({_quote(name)})")
+        ):
+            continue
+        if name not in NOT_PARTY_FIXED_REF_TABLES:
+            query = f"SELECT * FROM {_quote(name)} WHERE FixedRef = ?"
+        elif SQLITE_PARTY_LINKS_TABLE in names:
+            query = (
+                f"SELECT {_quote(name)}.* FROM {_quote(name)} "
+                f"JOIN {_quote(SQLITE_PARTY_LINKS_TABLE)} AS links "
+                f"ON links.SanctionsEntryID = {_quote(name)}.FixedRef "
+                "WHERE links.FixedRef = ?"
+            )
+        else:
+            continue
+        rows[name] = connection.execute(query, (str(fixed_ref),)).fetchall()
+    return rows
@@ -0,0 +1,361 @@
+# Description: Generator of synthetic ADVANCED_XML publications for offline runs and benchmarks. The documents keep
+# the structure the parsers read (ReferenceValueSets, Locations, IDRegDocuments, DistinctParties with aliases,
+# name part groups and features, SanctionsEntries) with made-up values, and scale with the number of parties.
+# The same parties / seed always give the same bytes. Run "python synthetic_publication.py out.xml --parties 20000".
+
+import argparse
+import io
+import random
+
+from xml_compression import open_compressed_writer
+
+ADVANCED_XML_NAMESPACE = "https://sanctionslistservice.ofac.treas.gov/api/PublicationPreview/exports/ADVANCED_XML"
+
+# Reference tables: name -> [(ID, text, extra attributes)]
+_COUNTRIES = [(str(10000 + i), f"Country {i}", f' ISO2="C{i:02d}"') for i in range(40)]
+_FEATURE_TYPES = [
+    ("8", "Birthdate"),
+    ("9", "Place of Birth"),
+    ("10", "Citizenship Country"),
+    ("11", "Nationality Country"),
+    ("12", "Gender"),
+    ("13", "Website"),
+    ("14", "Aircraft Manufacture Date"),
+    ("15", "Registration Country"),
+    ("16", "Vessel Flag"),
+    ("25", "Location"),
+]
+_NAME_PART_TYPES = [
+    ("1520", "Last Name"),
+    ("1521", "First Name"),
+    ("1522", "Middle Name"),
+    ("1525", "Entity Name"),
+    ("1526", "Vessel Name"),
+    ("1528", "Nickname"),
+    ("91708", "Patronymic"),
+]
+_LOCATION_PART_TYPES = [
+    ("1", "Unknown"),
+    ("1450", "Region"),
+    ("1451", "Address 1"),
+    ("1452", "Address 2"),
+    ("1453", "Address 3"),
+    ("1454", "City"),
+    ("1455", "State/Province"),
+    ("1456", "Postal Code"),
+]
+REFERENCE_VALUES = {
+    "AliasType": [
+        ("1400", "A.K.A.", ""),
+        ("1401", "F.K.A.", ""),
+        ("1402", "N.K.A.", ""),
+        ("1403", "Name", ""),
+    ],
+    "AreaCode": [
+        ("11291", "undetermined", ' CountryID="11291" Description="undetermined"')
+    ],
+    "CalendarType": [("1", "Gregorian", "")],
+    "Country": _COUNTRIES,
+    "DetailReference": [(str(90000 + i), f"Reference {i}", "") for i in range(10)],
+    "DetailType": [
+        ("1431", "REFERENCE", ""),
+        ("1432", "TEXT", ""),
+        ("1433", "COUNTRY", ""),
+    ],
+    "EntryEventType": [("1", "Created", "")],
+    "FeatureType": [(k, v, ' FeatureTypeGroupID="1"') for k, v in _FEATURE_TYPES],
+    "IDRegDocDateType": [("1480", "Issue Date", ""), ("1481", "Expiration Date", "")],
+    "IDRegDocType": [
+        ("1570", "Passport", ""),
+        ("1571", "National ID No.", ""),
+        ("1572", "Tax ID No.", ""),
+    ],
+    "LegalBasis": [("1", "Executive Order", ' LegalBasisShortRef="EO"')],
+    "List": [("91", "SDN List", ""), ("92", "Non-SDN List", "")],
+    "LocPartType": [(k, v, "") for k, v in _LOCATION_PART_TYPES],
+    "NamePartType": [(k, v, "") for k, v in _NAME_PART_TYPES],
+    "PartySubType": [
+        ("1", "Vessel", ' PartyTypeID="2"'),
+        ("2", "Aircraft", ' PartyTypeID="2"'),
+        ("3", "Unknown", ' PartyTypeID="2"'),
+        ("4", "Unknown", ' PartyTypeID="1"'),
+    ],
+    "PartyType": [("1", "Individual", ""), ("2", "Entity", "")],
+    "Reliability": [("1", "Reliable", ""), ("2", "Low", ""), ("3", "Fake", "")],
+    "SanctionsType": [("1", "Program", ""), ("2", "Block", "")],
+    "Script": [
+        ("215", "Latin", ' ScriptCode="Latn"'),
+        ("220", "Arabic", ' ScriptCode="Arab"'),
+        ("225", "Cyrillic", ' ScriptCode="Cyrl"'),
+    ],
+    "ScriptStatus": [("1", "Original", "")],
+    "Validity": [("1", "Valid", "")],
+}
+
+# Features every party has, one of each, the last one pointing at a Location
+_PARTY_FEATURES = 6
+
+
+def _date(tag, year, month, day):
+    return f"<{tag}><Year>{year}</Year><Month>{month}</Month><Day>{day}</Day></{tag}>"
+
+
+def _date_period(rng, year):
+    start = f'<Start Approximate="false">{_date("From", year, 1, 2)}{_date("To", year, 1, 2)}</Start>'
+    end = ""
+    if rng.random() < 0.5:
+        end = f'<End Approximate="false">{_date("From", year + 5, 3, 4)}{_date("To", year + 5, 3, 4)}</End>'
+    return f'<DatePeriod CalendarTypeID="1">{start}{end}</DatePeriod>'
+
+
+def _feature_version_ids(party):
+    return [str(500000 + party * 10 + index) for index in range(_PARTY_FEATURES)]
+
+
+def _location(rng, party, location_ids):
+    parts = []
+    for part_type_id in ("1", "1451", "1454", "1456", "1450"):
+        if rng.random() >= 0.6:
+            continue
+        values = f'<LocationPartValue Primary="true"><Value>{part_type_id}-value {party}</Value></LocationPartValue>'
+        if rng.random() < 0.2:
+            script = rng.choice(["Arabic", "Cyrillic", "Korean"])
+            values += f'<LocationPartValue Primary="false"><Comment>{script}</Comment><Value>alternate {part_type_id}-{party}</Value></LocationPartValue>'
+        parts.append(
+            f'<LocationPart ID="{rng.randint(1, 99999)}" LocPartTypeID="{part_type_id}">{values}</LocationPart>'
+        )
+    area_code = '<LocationAreaCode AreaCodeID="11291"/>' if rng.random() < 0.2 else ""
+    country = ""
+    if not area_code or rng.random() < 0.3:
+        country = f'<LocationCountry CountryID="{rng.choice(_COUNTRIES)[0]}" CountryRelevanceID="1"/>'
+    reference = ""
+    if rng.random() < 0.9:
+        reference = f'<FeatureVersionReference FeatureVersionID="{_feature_version_ids(party)[-1]}"/>'
+    return f'<Location ID="{location_ids[party]}">{area_code}{country}{"".join(parts)}{reference}</Location>\n'
+
+
+def _id_documents(rng, party):
+    documents = []
+    for index in range(rng.randint(0, 3)):
+        # A few documents point at an identity that does not exist, as in the live list
+        identity_id = str(4000 + party) if rng.random() < 0.95 else "999999"
+        dates = "".join(
+            f'<DocumentDate IDRegDocDateTypeID="{date_type}">{_date_period(rng, 1990 + index)}</DocumentDate>'
+            for date_type in ("1480", "1481")
+            if rng.random() < 0.6
+        )
+        authority = (
+            f"<IssuingAuthority>Authority {party}</IssuingAuthority>"
+            if rng.random() < 0.5
+            else ""
+        )
+        issued_by = (
+            f' IssuedBy-CountryID="{rng.choice(_COUNTRIES)[0]}"'
+            if rng.random() < 0.7
+            else ""
+        )
+        document_type = rng.choice(["1570", "1571", "1572", "1599"])
+        documents.append(
+            f'<IDRegDocument ID="{70000 + party * 5 + index}" IDRegDocTypeID="{document_type}" '
+            f'IdentityID="{identity_id}"{issued_by} ValidityID="1"><Comment/>'
+            f"<IDRegistrationNo>NO{party}-{index}</IDRegistrationNo>{authority}{dates}</IDRegDocument>\n"
+        )
+    return "".join(documents)
+
+
+def _distinct_party(rng, party, location_ids):
+    fixed_ref = str(party + 1)
+    subtype = rng.choice(["1", "2", "3", "4"])
+    groups = {
+        part_type: str(60000 + party * 10 + index)
+        for index, (part_type, _) in enumerate(_NAME_PART_TYPES)
+    }
+    out = [
+        f'<DistinctParty FixedRef="{fixed_ref}"><Comment/><Profile ID="{fixed_ref}" PartySubTypeID="{subtype}">'
+        f'<Identity ID="{4000 + party}" FixedRef="{fixed_ref}" Primary="true" False="false">'
+    ]
+    for alias in range(rng.randint(1, 3)):
+        alias_type = rng.choice(["1400", "1401", "1403"])
+        out.append(
+            f'<Alias FixedRef="{fixed_ref}" AliasTypeID="{alias_type}" '
+            f'Primary="{str(alias == 0).lower()}" LowQuality="false">'
+        )
+        for name in range(rng.randint(1, 2)):
+            script = rng.choice(["215", "215", "220"])
+            if subtype == "4":
+                parts = [("1520", "DOE"), ("1521", "John"), ("1522", "Q")]
+                if rng.random() < 0.3:
+                    parts.append(("1520", "SMITH"))
+                if rng.random() < 0.2:
+                    parts.append(("1528", "JJ"))
+            else:
+                parts = [("1525", f"ENTITY {party}")]
+            out.append(
+                f'<DocumentedName ID="{party * 100 + alias * 10 + name}" FixedRef="{fixed_ref}" DocNameStatusID="1">'
+            )
+            for part_type, value in parts:
+                acronym = "true" if subtype != "4" and rng.random() < 0.5 else "false"
+                out.append(
+                    f'<DocumentedNamePart><NamePartValue NamePartGroupID="{groups[part_type]}" '
+                    f'ScriptID="{script}" ScriptStatusID="1" Acronym="{acronym}">{value} {party}</NamePartValue></DocumentedNamePart>'
+                )
+            out.append("</DocumentedName>")
+        out.append("</Alias>")
+    out.append("<NamePartGroups><MasterNamePartGroup>")
+    for part_type, group_id in groups.items():
+        out.append(f'<NamePartGroup ID="{group_id}" NamePartTypeID="{part_type}"/>')
+    out.append("</MasterNamePartGroup></NamePartGroups></Identity>")
+
+    feature_types = rng.sample(_FEATURE_TYPES, _PARTY_FEATURES)
+    feature_types[-1] = ("25", "Location")
+    for index, ((feature_type, name), version_id) in enumerate(
+        zip(feature_types, _feature_version_ids(party))
+    ):
+        if name in ("Birthdate", "Aircraft Manufacture Date"):
+            body = _date_period(rng, 1950 + party % 40)
+        elif name in (
+            "Citizenship Country",
+            "Nationality Country",
+            "Registration Country",
+            "Location",
+        ):
+            body = f'<VersionLocation LocationID="{rng.choice(location_ids)}"/>'
+        elif name == "Gender":
+            body = f'<VersionDetail DetailTypeID="1431" DetailReferenceID="{90000 + rng.randint(0, 9)}"/>'
+        elif name == "Vessel Flag":
+            body = f'<VersionDetail DetailTypeID="1433" CountryID="{rng.choice(_COUNTRIES)[0]}"/>'
+        else:
+            body = f'<VersionDetail DetailTypeID="1432">text {party} {index}</VersionDetail>'
+        comment = (
+            f"<Comment>comment {party}</Comment>"
+            if rng.random() < 0.3
+            else "<Comment/>"
+        )
+        reliability = (
+            f' ReliabilityID="{rng.choice(["1", "2", "3"])}"'
+            if rng.random() < 0.9
+            else ""
+        )
+        out.append(
+            f'<Feature ID="{800000 + party * 10 + index}" FeatureTypeID="{feature_type}">'
+            f'<FeatureVersion{reliability} ID="{version_id}">{comment}{body}</FeatureVersion>'
+            f'<IdentityReference IdentityID="{4000 + party}" IdentityFeatureLinkTypeID="1"/></Feature>'
+        )
+    out.append("</Profile></DistinctParty>\n")
+    return "".join(out)
+
+
+def _sanctions_entry(rng, party):
+    out = [
+        f'<SanctionsEntry ID="{30000 + party}" ProfileID="{party + 1}" ListID="{rng.choice(["91", "92"])}">'
+        f'<EntryEvent ID="{party}" EntryEventTypeID="1" LegalBasisID="1">{_date("Date", 2020, 1, 1)}<Comment/></EntryEvent>'
+    ]
+    for measure in range(rng.randint(1, 3)):
+        if measure == 0:
+            out.append(
+                f'<SanctionsMeasure ID="{party * 10}" SanctionsTypeID="1"><Comment>PROGRAM-{party % 12}</Comment>'
+                f'<DatePeriod CalendarTypeID="1"><Start Approximate="false">{_date("From", 2020, 1, 1)}{_date("To", 2020, 1, 1)}</Start></DatePeriod>'
+                "</SanctionsMeasure>"
+            )
+        else:
+            out.append(
+                f'<SanctionsMeasure ID="{party * 10 + measure}" SanctionsTypeID="2"><Comment/></SanctionsMeasure>'
+            )
+    out.append("</SanctionsEntry>\n")
+    return "".join(out)
+
+
+def write_publication(
+    file,
+    parties=1000,
+    seed=1,
+    namespace=ADVANCED_XML_NAMESPACE,
+    issue_date=(2024, 7, 12),
+):
+    """
+    Writes a synthetic ADVANCED_XML publication to a binary file object, one record at a time.
+
+    Every party has a Location, 0 to 3 IDRegDocuments and a SanctionsEntry, so the
+    document grows linearly with parties (about 5.5 MB per 1000 parties).
+
+    Args:
+        file (file): The binary file object to write to.
+        parties (int): The number of DistinctParty records.
+        seed (int): The random seed; the same parties and seed give the same document.
+        namespace (str): The default namespace of the document.
+        issue_date (tuple): The (year, month, day) of the DateOfIssue header.
+    """
+    rng = random.Random(seed)
+
+    def write(text):
+        file.write(text.encode("utf-8"))
+
+    write(
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        f'<Sanctions xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns="{namespace}">\n'
+        f"{_date('DateOfIssue', *issue_date)}\n<ReferenceValueSets>\n"
+    )
+    for table, values in REFERENCE_VALUES.items():
+        entries = "".join(
+            f'<{table} ID="{value_id}"{extra}>{text}</{table}>'
+            for value_id, text, extra in values
+        )
+        write(f"<{table}Values>{entries}</{table}Values>\n")
+    write("</ReferenceValueSets>\n")
+
+    location_ids = [str(20000 + party) for party in range(parties)]
+    sections = [
+        ("Locations", lambda party: _location(rng, party, location_ids)),
+        ("IDRegDocuments", lambda party: _id_documents(rng, party)),
+        ("DistinctParties", lambda party: _distinct_party(rng, party, location_ids)),
+        ("ProfileRelationships", None),
+        ("SanctionsEntries", lambda party: _sanctions_entry(rng, party)),
+    ]
+    for section, record in sections:
+        if record is None:
+            write(f"<{section}/>\n")
+            continue
+        write(f"<{section}>\n")
+        for party in range(parties):
+            write(record(party))
+        write(f"</{section}>\n")
+    write("</Sanctions>\n")
+
+
+def generate_publication(file_path, compression=None, **options):
+    """
+    Writes a synthetic publication to a file, plain or compressed ("gzip" / "zstd").
+
+    Args:
+        file_path (str): The file to write.
+        compression (str): "gzip", "zstd" or None for plain XML.
+        **options: parties, seed, namespace and issue_date, see write_publication().
+    """
+    with open_compressed_writer(file_path, compression) as file:
+        write_publication(file, **options)
+
+
+def publication_bytes(**options):
+    """Returns a synthetic publication as bytes; options as for write_publication()."""
+    buffer = io.BytesIO()
+    write_publication(buffer, **options)
+    return buffer.getvalue()
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(
+        description="Writes a synthetic ADVANCED_XML publication."
+    )
+    arguments.add_argument("file_path", help="the XML file to write")
+    arguments.add_argument("--parties", type=int, default=1000)
+    arguments.add_argument("--seed", type=int, default=1)
+    arguments.add_argument("--namespace", default=ADVANCED_XML_NAMESPACE)
+    arguments.add_argument("--compression", choices=["gzip", "zstd"])
+    options = arguments.parse_args()
+    generate_publication(
+        options.file_path,
+        compression=options.compression,
+        parties=options.parties,
+        seed=options.seed,
+        namespace=options.namespace,
+    )
@@ -0,0 +1,39 @@
+# Description: Shared pytest setup. The modules live at the repository root, so it goes on sys.path; the
+# synthetic publication is generated once per session, plain and compressed, for the extraction tests.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_publication import generate_publication  # noqa: E402
+
+# Small enough to parse in well under a second per mode, large enough for every record shape
+FIXTURE_PARTIES = 120
+FIXTURE_SEED = 7
+
+
+@pytest.fixture(scope="session")
+def publication_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("publication")
+
+
+@pytest.fixture(scope="session")
+def publication(publication_dir):
+    """The path of a plain synthetic publication."""
+    path = str(publication_dir / "sdn_advanced.xml")
+    generate_publication(path, parties=FIXTURE_PARTIES, seed=FIXTURE_SEED)
+    return path
+
+
+@pytest.fixture(scope="session", params=["gzip", "zstd"])
+def compressed_publication(request, publication_dir):
+    """The same publication gzip- or zstd-compressed."""
+    compression = request.param
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    path = str(publication_dir / f"sdn_advanced.xml.{compression}")
+    generate_publication(path, compression, parties=FIXTURE_PARTIES, seed=FIXTURE_SEED)
+    return path
@@ -0,0 +1,47 @@
+# Description: DatePeriods whose Start or End has no From fall back to its To, as the original ".//Year" lookups
+# did, and element and SAX decoding share the memoized DateRange.
+
+import xml.etree.ElementTree as ET
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+from date_period import decode_date_bounds, decode_date_period
+
+
+def date_period(xml):
+    return ET.fromstring(
+        f'<DatePeriod xmlns="urn:test" CalendarTypeID="1">{xml}</DatePeriod>'
+    )
+
+
+def point(tag, year, month, day):
+    return f"<{tag}><Year>{year}</Year><Month>{month}</Month><Day>{day}</Day></{tag}>"
+
+
+def test_bound_without_from_uses_to():
+    date_range = decode_date_period(
+        date_period(
+            f"<Start>{point('To', 2001, 2, 3)}</Start>"
+            f"<End>{point('From', 2010, 1, 1)}{point('To', 2011, 1, 1)}</End>"
+        )
+    )
+    assert date_range.span == "2001-2-3 to 2010-1-1"
+    assert date_range.text == "2011-1-1"
+
+    row = pipeline.build_id_row("1", "", "", "", "", "", [date_range], "")
+    assert row["Issue_Date"] == "2001-2-3"
+    assert row["Expiration_Date"] == "2010-1-1"
+
+
+def test_missing_bounds():
+    assert decode_date_period(None).span == ""
+    until = decode_date_period(date_period(f"<End>{point('To', 2011, 5, 6)}</End>"))
+    assert until.span == "Until 2011-5-6"
+    empty = decode_date_period(date_period("<Start/>"))
+    assert empty.span == "From --"
+
+
+def test_element_and_sax_decoding_share_results():
+    element = decode_date_period(
+        date_period(f"<Start>{point('From', 1999, 1, 2)}</Start>")
+    )
+    assert decode_date_bounds((("1999", "1", "2"), None), None) is element
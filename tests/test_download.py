@@ -0,0 +1,236 @@
+# Description: Downloads against the local FixtureServer misbehaving on purpose (503s and truncated bodies, as with
+# fixture_server.py --fail / --truncate): the retried and resumed file must match the source byte for byte, leave no
+# ".part" / ".stream" files behind, and the next run must get a 304 and skip the work. A body that cannot be parsed
+# while it downloads fails the run at once, even on a stalled connection, and archives nothing.
+
+import hashlib
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+import requests
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+from fixture_server import PIPELINE_SCRIPT, FixtureServer
+from xml_compression import open_xml
+from xml_download import (
+    DOWNLOADED,
+    NOT_MODIFIED,
+    DownloadError,
+    IntegrityError,
+    download_file,
+    load_download_state,
+    save_download_state,
+)
+
+FIXTURE_SERVER_SCRIPT = os.path.join(
+    os.path.dirname(PIPELINE_SCRIPT), "fixture_server.py"
+)
+
+
+@pytest.fixture(scope="module")
+def body(publication):
+    with open(publication, "rb") as file:
+        return file.read()
+
+
+@pytest.fixture
+def server():
+    with FixtureServer() as server:
+        yield server
+
+
+def download(server, tmp_path, name="sdn_advanced.xml", **options):
+    options.setdefault("backoff_seconds", 0)
+    options.setdefault("chunk_size", 16384)
+    with requests.Session() as session:
+        return download_file(
+            session,
+            server.url("/sdn_advanced.xml"),
+            str(tmp_path / name),
+            str(tmp_path / f"{name}.http.json"),
+            **options,
+        )
+
+
+def statuses(server):
+    return [
+        (status, range_header is not None) for path, status, range_header in server.log
+    ]
+
+
+@pytest.mark.parametrize("gzip", [False, True])
+def test_retried_download_resumes_and_matches(server, tmp_path, body, gzip):
+    published = server.publish(
+        "/sdn_advanced.xml", body, fail_requests=1, truncate_requests=2, gzip=gzip
+    )
+    accept_encoding = "gzip" if gzip else "identity"
+    assert download(server, tmp_path, accept_encoding=accept_encoding) == DOWNLOADED
+
+    data = (tmp_path / "sdn_advanced.xml").read_bytes()
+    assert data == body
+    state = load_download_state(str(tmp_path / "sdn_advanced.xml.http.json"))
+    sent, etag, encoding = published.representation(accept_encoding)
+    assert state["sha256"] == hashlib.sha256(sent).hexdigest()
+    assert state["etag"] == etag
+    # 503, truncated 200, truncated 206 resume, complete 206 resume
+    assert statuses(server) == [(503, False), (200, False), (206, True), (206, True)]
+    assert sorted(os.listdir(tmp_path)) == [
+        "sdn_advanced.xml",
+        "sdn_advanced.xml.http.json",
+    ]
+
+    assert download(server, tmp_path, accept_encoding=accept_encoding) == NOT_MODIFIED
+    assert server.log[-1][1] == 304
+    assert (tmp_path / "sdn_advanced.xml").read_bytes() == body
+
+
+def test_download_stored_compressed(server, tmp_path, body):
+    server.publish("/sdn_advanced.xml", body, truncate_requests=1)
+    assert (
+        download(
+            server,
+            tmp_path,
+            name="sdn_advanced.xml.gz",
+            accept_encoding="gzip",
+            compression="gzip",
+        )
+        == DOWNLOADED
+    )
+    with open_xml(str(tmp_path / "sdn_advanced.xml.gz")) as file:
+        assert file.read() == body
+    assert not any(
+        name.endswith((".part", ".part.json")) for name in os.listdir(tmp_path)
+    )
+
+
+def test_partial_download_resumes_on_the_next_run(server, tmp_path, body):
+    server.publish("/sdn_advanced.xml", body, truncate_requests=1, gzip=False)
+    with pytest.raises(DownloadError):
+        download(server, tmp_path, retries=0)
+    assert (tmp_path / "sdn_advanced.xml.part").exists()
+    assert (tmp_path / "sdn_advanced.xml.part.json").exists()
+
+    assert download(server, tmp_path) == DOWNLOADED
+    assert server.log[-1][1:] == (206, f"bytes={len(body) // 3}-")
+    assert (tmp_path / "sdn_advanced.xml").read_bytes() == body
+    assert not (tmp_path / "sdn_advanced.xml.part").exists()
+    assert not (tmp_path / "sdn_advanced.xml.part.json").exists()
+
+
+def test_without_digest_the_stored_sha256_is_checked(server, tmp_path, body, capsys):
+    server.publish("/sdn_advanced.xml", body, gzip=False, digest=False)
+    assert download(server, tmp_path) == DOWNLOADED
+    assert "length checked only" in capsys.readouterr().out
+
+    # Same ETag as the last complete download: its saved SHA-256 has to match
+    state_path = str(tmp_path / "sdn_advanced.xml.http.json")
+    os.remove(tmp_path / "sdn_advanced.xml")
+    assert download(server, tmp_path) == DOWNLOADED
+    assert "SHA-256 verified" in capsys.readouterr().out
+
+    state = load_download_state(state_path)
+    save_download_state(state_path, dict(state, sha256="0" * 64))
+    os.remove(tmp_path / "sdn_advanced.xml")
+    with pytest.raises(IntegrityError):
+        download(server, tmp_path)
+    assert sorted(os.listdir(tmp_path)) == ["sdn_advanced.xml.http.json"]
+
+
+@pytest.fixture
+def stream_settings(monkeypatch):
+    monkeypatch.setattr(pipeline, "SNAPSHOT_DIR", None)
+    monkeypatch.setattr(pipeline, "DOWNLOAD_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(pipeline, "DOWNLOAD_CHUNK_SIZE", 16384)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_parse_while_downloading(
+    server, tmp_path, body, publication, stream_settings, compression
+):
+    server.publish("/sdn_advanced.xml", body, fail_requests=1, truncate_requests=1)
+    url = server.url("/sdn_advanced.xml")
+    file_path = str(tmp_path / "sdn_advanced.xml")
+    state_path = str(tmp_path / "sdn_advanced.xml.http.json")
+
+    status, tables = pipeline.download_extract_tables(
+        url, file_path, state_path=state_path, compression=compression
+    )
+    assert status == DOWNLOADED
+    assert tables == pipeline.expat_extract_tables(publication)
+    with open_xml(file_path) as file:
+        assert file.read() == body
+    assert [status for path, status, range_header in server.log] == [503, 200, 206]
+    assert sorted(os.listdir(tmp_path)) == [
+        "sdn_advanced.xml",
+        "sdn_advanced.xml.http.json",
+    ]
+
+    status, tables = pipeline.download_extract_tables(
+        url, file_path, state_path=state_path, compression=compression
+    )
+    assert (status, tables) == (NOT_MODIFIED, None)
+    assert server.log[-1][1] == 304
+
+
+def test_fixture_server_pipeline(tmp_path, publication):
+    # Two pipeline runs against a misbehaving server: download and parse, then 304
+    workdir = tmp_path / "run"
+    result = subprocess.run(
+        [
+            sys.executable,
+            FIXTURE_SERVER_SCRIPT,
+            "--file",
+            publication,
+            "--port",
+            "0",
+            "--fail",
+            "1",
+            "--truncate",
+            "1",
+            "--run-pipeline",
+            "--workdir",
+            str(workdir),
+        ],
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "XML file not modified since the last download" in result.stdout
+    assert "  304 /sdn_advanced.xml" in result.stdout
+    with open(publication, "rb") as file:
+        assert (workdir / "sdn_advanced.xml").read_bytes() == file.read()
+    assert (workdir / pipeline.XLSX_FILE_PATH).exists()
+    assert not any(
+        name.endswith((".part", ".part.json", ".stream"))
+        for name in os.listdir(workdir)
+    )
+
+
+@pytest.mark.parametrize("damage", ["truncated", "malformed"])
+def test_parse_error_while_downloading(
+    server, tmp_path, body, stream_settings, capsys, damage
+):
+    # A stalled connection must not hold the failed parse until the read timeout
+    if damage == "truncated":
+        server.publish("/sdn_advanced.xml", body[: len(body) // 2])
+    else:
+        server.publish(
+            "/sdn_advanced.xml", b"<Sanctions><<" + body, stall=30, gzip=False
+        )
+    file_path = str(tmp_path / "sdn_advanced.xml")
+
+    started = time.monotonic()
+    result = pipeline.download_extract_tables(
+        server.url("/sdn_advanced.xml"),
+        file_path,
+        archive=True,
+        state_path=str(tmp_path / "sdn_advanced.xml.http.json"),
+    )
+    assert result == (False, None)
+    assert time.monotonic() - started < 10
+    assert "Error parsing XML" in capsys.readouterr().out
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,58 @@
+# Description: --fetch-lists carries on past a list that fails to download or parse, and shares its download
+# state files with the single-list pipeline.
+
+import os
+
+import pytest
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+from fixture_server import FixtureServer
+from list_fetcher import ListSource, state_path_for
+from xml_download import DOWNLOADED, NOT_MODIFIED
+
+
+def test_state_path_is_shared_by_plain_and_compressed_files():
+    assert state_path_for("sdn_advanced.xml") == "sdn_advanced.xml.http.json"
+    assert state_path_for("sdn_advanced.xml.gz") == "sdn_advanced.xml.http.json"
+    assert state_path_for("sdn_advanced.xml.zst") == "sdn_advanced.xml.http.json"
+    assert pipeline.DOWNLOAD_STATE_PATH == state_path_for(pipeline.XML_FILE_PATH)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_failed_lists_do_not_stop_the_others(
+    tmp_path, publication, monkeypatch, compression
+):
+    # Parse workers are spawned with the default settings, so keep their snapshots in tmp_path
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "LIST_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline, "ARCHIVE_COMPRESSION", compression)
+    monkeypatch.setattr(pipeline, "DOWNLOAD_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(pipeline, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    with open(publication, "rb") as file:
+        body = file.read()
+
+    with FixtureServer() as server:
+        server.publish("/good.xml", body)
+        server.publish("/broken.xml", body[: len(body) // 2])
+        sources = [
+            ListSource(name, server.url(path), str(tmp_path / file_name), (5, 30))
+            for name, path, file_name in (
+                ("GOOD", "/good.xml", "good.xml"),
+                ("BROKEN", "/broken.xml", "broken.xml"),
+                ("MISSING", "/missing.xml", "missing.xml"),
+            )
+        ]
+        assert pipeline.fetch_and_extract_lists(sources) == {
+            "GOOD": DOWNLOADED,
+            "BROKEN": False,
+            "MISSING": False,
+        }
+        assert (tmp_path / "good_advanced.xlsx").exists()
+        assert not (tmp_path / "broken_advanced.xlsx").exists()
+        assert (tmp_path / "good.xml.http.json").exists()
+        # Each list is archived under its own name
+        assert sorted(os.listdir(tmp_path / "archive")) == ["broken", "good"]
+
+        statuses = pipeline.fetch_and_extract_lists(sources[:1])
+        assert statuses == {"GOOD": NOT_MODIFIED}
+    assert not any(name.endswith(".part") for name in os.listdir(tmp_path))
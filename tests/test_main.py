@@ -0,0 +1,70 @@
+# Description: main() against the local FixtureServer: a 304 skips the run only while every configured output
+# exists; an output enabled since the last run is built from the local XML without downloading it again.
+
+import os
+import sqlite3
+
+import pytest
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+from fixture_server import FixtureServer
+
+
+@pytest.fixture
+def server(publication):
+    with open(publication, "rb") as file:
+        body = file.read()
+    with FixtureServer() as server:
+        server.publish("/sdn_advanced.xml", body)
+        yield server
+
+
+@pytest.fixture
+def settings(server, tmp_path, monkeypatch):
+    # DOWNLOAD_STATE_PATH and the other defaults are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("output")
+    monkeypatch.setattr(pipeline, "XML_URL", server.url("/sdn_advanced.xml"))
+    monkeypatch.setattr(pipeline, "DOWNLOAD_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(pipeline, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+
+@pytest.mark.parametrize("parse_while_downloading", [False, True])
+def test_not_modified_builds_only_the_missing_outputs(
+    server, settings, monkeypatch, capsys, parse_while_downloading
+):
+    monkeypatch.setattr(pipeline, "PARSE_WHILE_DOWNLOADING", parse_while_downloading)
+    pipeline.main()
+    workbook_mtime = os.path.getmtime(pipeline.XLSX_FILE_PATH)
+
+    pipeline.main()
+    assert server.log[-1][1] == 304
+    assert "keeping the existing outputs" in capsys.readouterr().out
+
+    monkeypatch.setattr(pipeline, "SQLITE_PATH", "output/sdn_output.sqlite")
+    monkeypatch.setattr(pipeline, "DELIMITED_OUTPUT_DIR", "output/csv")
+    monkeypatch.setattr(pipeline, "JSONL_PATH", "output/parties.jsonl")
+    pipeline.main()
+    assert server.log[-1][1] == 304
+    out = capsys.readouterr().out
+    assert "building the missing outputs: delimited, sqlite, jsonl" in out
+    assert "loaded parse snapshot" in out
+    # The party links come back with the snapshot
+    connection = sqlite3.connect("output/sdn_output.sqlite")
+    try:
+        unlinked = connection.execute(
+            "SELECT COUNT(*) FROM SANCTIONS_ENTRIES AS entries "
+            "LEFT JOIN SANCTIONS_ENTRY_PARTIES AS links "
+            "ON links.SanctionsEntryID = entries.FixedRef WHERE links.FixedRef IS NULL"
+        ).fetchone()[0]
+    finally:
+        connection.close()
+    assert unlinked == 0
+    assert sorted(os.listdir("output/csv")) == sorted(
+        f"{sheet.lower()}.csv" for sheet in pipeline.SHEET_NAMES
+    )
+    assert "parties written to output/parties.jsonl" in out
+    assert os.path.getmtime(pipeline.XLSX_FILE_PATH) == workbook_mtime
+
+    pipeline.main()
+    assert "keeping the existing outputs" in capsys.readouterr().out
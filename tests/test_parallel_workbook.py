@@ -0,0 +1,76 @@
+# Description: The workbook written by parallel_workbook must read back, with openpyxl and pandas, cell for cell
+# the same as the openpyxl one, and the zip writer must refuse what would need ZIP64 records.
+
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+import parallel_workbook
+from parallel_workbook import write_workbook_parallel
+
+
+@pytest.fixture(scope="module")
+def tables(publication):
+    return pipeline.expat_extract_tables(publication)
+
+
+@pytest.fixture(scope="module")
+def workbooks(tables, tmp_path_factory):
+    directory = tmp_path_factory.mktemp("workbooks")
+    expected_path = str(directory / "openpyxl.xlsx")
+    parallel_path = str(directory / "parallel.xlsx")
+    pipeline.write_workbook(tables, expected_path)
+    write_workbook_parallel(pipeline.sheet_rows(tables), parallel_path, workers=2)
+    return expected_path, parallel_path
+
+
+def read_cells(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return {
+            sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)]
+            for sheet in workbook.worksheets
+        }
+    finally:
+        workbook.close()
+
+
+def test_openpyxl_reads_the_same_cells(workbooks):
+    expected_path, parallel_path = workbooks
+    expected = read_cells(expected_path)
+    assert list(expected) == pipeline.SHEET_NAMES
+    assert read_cells(parallel_path) == expected
+
+
+def test_pandas_reads_the_same_frames(workbooks):
+    expected_path, parallel_path = workbooks
+    expected = pd.read_excel(expected_path, sheet_name=None, dtype=str)
+    frames = pd.read_excel(parallel_path, sheet_name=None, dtype=str)
+    assert list(frames) == list(expected)
+    for sheet, frame in expected.items():
+        pd.testing.assert_frame_equal(frames[sheet], frame)
+
+
+def test_oversized_parts_are_refused(tables, tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_workbook, "_ZIP_LIMIT", 4096)
+    xlsx_path = tmp_path / "sdn_advanced.xlsx"
+    with pytest.raises(ValueError, match="ZIP64"):
+        write_workbook_parallel(pipeline.sheet_rows(tables), str(xlsx_path), workers=2)
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("limit", ["_ZIP_LIMIT", "_ZIP_ENTRY_LIMIT"])
+def test_central_directory_limits_are_checked(monkeypatch, limit):
+    file = io.BytesIO()
+    package = parallel_workbook._ZipWriter(file)
+    for number in range(3):
+        package.add_text(f"part{number}.xml", "<part/>")
+    # Every part fits, but the central directory offset or the entry count does not
+    monkeypatch.setattr(
+        parallel_workbook, limit, file.tell() if limit == "_ZIP_LIMIT" else 2
+    )
+    with pytest.raises(ValueError, match="ZIP64"):
+        package.close()
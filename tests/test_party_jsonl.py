@@ -0,0 +1,157 @@
+# Description: The per-party JSON Lines are written in a streaming pass of their own, each party as it closes:
+# every row of the extracted sheets lands in its party, in sheet order, or is reported as unclaimed. Every
+# extraction path yields the same party links (used by the SQLite export), and snapshots keep them.
+
+import json
+import os
+
+import pytest
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+
+
+@pytest.fixture(scope="module")
+def ns(publication):
+    return pipeline.detect_namespace(publication)
+
+
+@pytest.fixture(scope="module")
+def extracted(publication, ns):
+    party_links = {}
+    tables = pipeline.expat_extract_tables(publication, ns, party_links=party_links)
+    return tables, party_links
+
+
+def test_every_path_collects_the_same_links(publication, ns, extracted):
+    tables, party_links = extracted
+    assert party_links["profiles"] and party_links["sanctions_entries"]
+
+    tree, root = pipeline.parse_xml(publication, "etree")
+    for extract in (
+        lambda links: pipeline.extract_tables(root, ns, party_links=links),
+        lambda links: pipeline.extract_tables_single_pass(root, ns, party_links=links),
+        lambda links: pipeline.stream_extract_tables(
+            publication, ns, party_links=links
+        ),
+    ):
+        links = {}
+        assert extract(links) == tables
+        assert links == party_links
+
+
+def test_snapshot_keeps_the_links(publication, extracted, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline, "PARSE_MODE", "stream")
+    tables, party_links = extracted
+    for run in ("parse", "snapshot"):
+        links = {}
+        assert pipeline.load_or_extract_tables(publication, party_links=links) == tables
+        assert links == party_links, run
+
+
+def expected_documents(tables, party_links):
+    """The party documents grouped from the sheets of the table extraction."""
+    profiles = party_links["profiles"]
+    entry_profiles = party_links["sanctions_entries"]
+    documents = {
+        fixed_ref: {
+            "FixedRef": fixed_ref,
+            **{key: [] for key in pipeline.PARTY_DOCUMENT_KEYS.values()},
+        }
+        for fixed_ref in profiles.values()
+    }
+    for sheet, fieldnames, rows in pipeline.sheet_rows(tables):
+        key = pipeline.PARTY_DOCUMENT_KEYS[sheet]
+        for row in rows:
+            if sheet == "SANCTIONS_ENTRIES":
+                fixed_ref = profiles.get(entry_profiles[row[0]])
+                values = dict(zip(pipeline.PARTY_MEASURE_FIELDNAMES, row))
+            else:
+                fixed_ref = row[fieldnames.index("FixedRef")]
+                values = {
+                    field: value
+                    for field, value in zip(fieldnames, row)
+                    if field != "FixedRef"
+                }
+            if fixed_ref in documents:
+                documents[fixed_ref][key].append(values)
+    return list(documents.values())
+
+
+def sheet_values(tables, sheet):
+    for name, fieldnames, rows in pipeline.sheet_rows({sheet: tables[sheet]}):
+        return list(rows)
+
+
+def read_documents(jsonl_path):
+    with open(jsonl_path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_every_row_is_written_to_its_party(publication, ns, extracted, tmp_path):
+    tables, party_links = extracted
+    jsonl_path = str(tmp_path / "out" / "parties.jsonl")
+    parties, unclaimed = pipeline.write_party_jsonl(publication, jsonl_path, ns)
+    documents = read_documents(jsonl_path)
+
+    assert parties == len(documents) == len(set(party_links["profiles"].values()))
+    assert documents == expected_documents(tables, party_links)
+    # Left over: the addresses of Locations no party references, and the IDRegDocuments
+    # of unknown Identities, which the ID sheet leaves out
+    assert list(unclaimed) == ["ADDRESS", "ID"]
+    assert unclaimed["ADDRESS"] == [
+        row for row in sheet_values(tables, "ADDRESS") if row[1] == ""
+    ]
+    with open(publication, encoding="utf-8") as file:
+        id_reg_documents = file.read().count("<IDRegDocument ")
+    assert len(unclaimed["ID"]) == id_reg_documents - len(tables["ID"][1])
+    assert {row[0] for row in unclaimed["ID"]} == {""}
+    assert sorted(os.listdir(tmp_path / "out")) == ["parties.jsonl"]
+
+
+def test_parties_are_written_as_they_close(publication, ns, tmp_path, monkeypatch):
+    events = []
+    for name, event in (
+        ("party_document", "party"),
+        ("parse_sanctions_entry", "entry"),
+    ):
+        function = getattr(pipeline, name)
+        monkeypatch.setattr(
+            pipeline,
+            name,
+            lambda *args, function=function, event=event: events.append(event)
+            or function(*args),
+        )
+    parties, unclaimed = pipeline.write_party_jsonl(
+        publication, str(tmp_path / "parties.jsonl"), ns
+    )
+    # Every party is out before the first SanctionsEntry is read
+    assert events[:parties] == ["party"] * parties
+    assert set(events[parties:]) == {"entry"}
+
+
+def test_rows_without_a_party_are_reported(publication, ns, tmp_path, capsys):
+    with open(publication, encoding="utf-8") as file:
+        xml = file.read()
+    # The first SanctionsEntry names a Profile no party has
+    xml = xml.replace(
+        '<SanctionsEntry ID="30000" ProfileID="1"',
+        '<SanctionsEntry ID="30000" ProfileID="0"',
+        1,
+    )
+    path = tmp_path / "sdn_advanced.xml"
+    path.write_text(xml, encoding="utf-8")
+    jsonl_path = str(tmp_path / "parties.jsonl")
+
+    parties, unclaimed = pipeline.write_party_jsonl(str(path), jsonl_path, ns)
+    assert list(unclaimed) == ["SANCTIONS_ENTRIES", "ADDRESS", "ID"]
+    assert {row[0] for row in unclaimed["SANCTIONS_ENTRIES"]} == {"30000"}
+    assert "SANCTIONS_ENTRIES rows belong to no party" in capsys.readouterr().out
+    measures = [
+        measure
+        for document in read_documents(jsonl_path)
+        for measure in document["sanctions_measures"]
+    ]
+    assert measures and "30000" not in {
+        measure["SanctionsEntryID"] for measure in measures
+    }
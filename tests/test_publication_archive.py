@@ -0,0 +1,47 @@
+# Description: Every list is archived in its own subdirectory of ARCHIVE_DIR, so the retention of one list never
+# deletes another list's publications and an archive ID only ever matches a publication of its own list.
+
+import os
+
+import pytest
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+from publication_archive import ArchiveError, find_publication, list_publications
+from synthetic_publication import generate_publication
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    monkeypatch.setattr(pipeline, "ARCHIVE_KEEP", 2)
+    monkeypatch.setattr(pipeline, "ARCHIVE_KEEP_DAYS", None)
+    return tmp_path
+
+
+def archive_issue(tmp_path, list_name, day):
+    """Archives a publication of list_name issued on 2024-07-<day>; returns its ID."""
+    path = str(tmp_path / f"{list_name.lower()}_advanced.xml")
+    seed = day if list_name == "SDN" else 100 + day
+    generate_publication(path, parties=3, seed=seed, issue_date=(2024, 7, day))
+    state_path = path + ".http.json"
+    return pipeline.archive_xml(path, state_path, list_name)["id"]
+
+
+def test_retention_is_applied_to_each_list(archive):
+    ids = {"SDN": [], "CONSOLIDATED": []}
+    for day in range(1, 5):
+        # The lists alternate, so a retention shared by both would keep two issues in all
+        for list_name in ids:
+            ids[list_name].append(archive_issue(archive, list_name, day))
+
+    for list_name, list_ids in ids.items():
+        archive_dir = pipeline.archive_dir_for(list_name)
+        assert archive_dir == os.path.join(pipeline.ARCHIVE_DIR, list_name.lower())
+        kept = [metadata["id"] for metadata in list_publications(archive_dir)]
+        assert kept == list_ids[:-3:-1], list_name
+
+    sdn_dir = pipeline.archive_dir_for("SDN")
+    assert find_publication(sdn_dir, "latest")[0]["id"] == ids["SDN"][-1]
+    assert find_publication(sdn_dir, "2024-07-03")[0]["id"] == ids["SDN"][2]
+    with pytest.raises(ArchiveError):
+        find_publication(sdn_dir, ids["CONSOLIDATED"][-1][:12])
@@ -0,0 +1,70 @@
+# Description: Schema-derived direct child paths. Where the direct child is missing they find nothing, where the
+# old ".//" search fell through to a nested element (a DatePeriod's Comment); every extraction mode agrees on that.
+
+import pytest
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+from sdn_schema import schema_path
+from test_extraction import BASELINE_XML, baseline_extractions
+
+FEATURE_VERSION = (
+    '<Comment>comment 0</Comment><DatePeriod CalendarTypeID="1">'
+    '<Start Approximate="false"><From><Year>1950</Year><Month>1</Month><Day>2</Day></From>'
+)
+SANCTIONS_MEASURE = (
+    '<SanctionsMeasure ID="0" SanctionsTypeID="1"><Comment>PROGRAM-0</Comment>'
+    '<DatePeriod CalendarTypeID="1">'
+)
+
+
+def test_schema_paths_are_direct():
+    assert schema_path("DistinctParty", "Feature") == "ns:Profile/ns:Feature"
+    assert schema_path("FeatureVersion", "Comment") == "ns:Comment"
+    assert schema_path("Start", "Year") == "ns:From/ns:Year"
+    with pytest.raises(KeyError):
+        schema_path("Location", "Year")
+
+
+@pytest.fixture
+def missing_children(tmp_path):
+    """The baseline fixture with a FeatureVersion and a SanctionsMeasure Comment moved into their DatePeriod."""
+    with open(BASELINE_XML, encoding="utf-8") as file:
+        xml = file.read()
+    for original, changed in (
+        (
+            FEATURE_VERSION,
+            '<DatePeriod CalendarTypeID="1"><Comment>nested</Comment>'
+            # A Start without From: the date falls back to its To, as ".//ns:Year" did
+            '<Start Approximate="false">',
+        ),
+        (
+            SANCTIONS_MEASURE,
+            '<SanctionsMeasure ID="0" SanctionsTypeID="1">'
+            '<DatePeriod CalendarTypeID="1"><Comment>nested</Comment>',
+        ),
+    ):
+        assert original in xml
+        xml = xml.replace(original, changed, 1)
+    path = tmp_path / "sdn_advanced.xml"
+    path.write_text(xml, encoding="utf-8")
+    return str(path)
+
+
+def test_missing_direct_children_are_not_taken_from_nested_elements(
+    missing_children,
+):
+    ns = pipeline.detect_namespace(missing_children)
+    extractions = list(baseline_extractions(ns, missing_children))
+    mode, expected = extractions[0]
+    for mode, tables in extractions[1:]:
+        assert tables == expected, mode
+
+    features = [row for row in expected["FEATURE"][1] if row["FixedRef"] == "1"]
+    aircraft = [
+        row for row in features if row["FeatureType"] == "Aircraft Manufacture Date"
+    ]
+    assert [(row["Value"], row["Comment"]) for row in aircraft] == [("1955-3-4", "")]
+
+    programs = [row[3] for row in expected["SANCTIONS_ENTRIES"][1]]
+    assert "nested" not in programs
+    assert "PROGRAM-0" not in programs
@@ -0,0 +1,190 @@
+# Description: The sheet exports besides the workbook. The tab-separated files read back as the rows of sheet_rows(),
+# with or without a header line, and so do the Parquet files, plain or partitioned, and the memory-mapped Arrow IPC
+# files (both skipped without pyarrow). The SQLite export loads every sheet, and looking a party up by FixedRef
+# returns only that party's rows, its sanctions included (SANCTIONS_ENTRIES keys its rows on the SanctionsEntry ID
+# and is joined through the party links).
+
+import os
+import sqlite3
+
+import pytest
+
+import consolidate_parsers_new_namechange_testnewformats as pipeline
+from sheet_export import (
+    CATEGORICAL_COLUMNS,
+    delimited_path,
+    lookup_fixed_ref,
+    read_arrow_ipc,
+    write_arrow_ipc,
+    write_delimited,
+    write_parquet,
+    write_sqlite,
+)
+
+
+@pytest.fixture(scope="module")
+def extracted(publication):
+    party_links = {}
+    tables = pipeline.expat_extract_tables(publication, party_links=party_links)
+    return tables, party_links
+
+
+@pytest.fixture(scope="module")
+def tables(extracted):
+    return extracted[0]
+
+
+def expected_rows(tables):
+    return {
+        sheet: (
+            fieldnames,
+            [["" if value is None else value for value in row] for row in rows],
+        )
+        for sheet, fieldnames, rows in pipeline.sheet_rows(tables)
+    }
+
+
+def read_delimited(path):
+    with open(path, encoding="utf-8", newline="") as file:
+        return [line.split("\t") for line in file.read().splitlines()]
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_delimited_files_read_back_as_the_sheet_rows(tables, tmp_path, parallel):
+    output_dir = str(tmp_path / "csv")
+    counts = write_delimited(
+        pipeline.sheet_rows(tables), output_dir, parallel=parallel, batch_rows=100
+    )
+    assert sorted(os.listdir(output_dir)) == sorted(
+        f"{sheet.lower()}.csv" for sheet in pipeline.SHEET_NAMES
+    )
+    for sheet, (fieldnames, rows) in expected_rows(tables).items():
+        lines = read_delimited(delimited_path(output_dir, sheet))
+        assert lines[0] == list(fieldnames), sheet
+        assert lines[1:] == rows, sheet
+        assert counts[sheet] == len(rows)
+
+
+def test_delimited_files_without_header(tables, tmp_path):
+    output_dir = str(tmp_path / "csv")
+    write_delimited(pipeline.sheet_rows(tables), output_dir, header=False)
+    for sheet, (fieldnames, rows) in expected_rows(tables).items():
+        assert read_delimited(delimited_path(output_dir, sheet)) == rows, sheet
+
+
+def test_delimited_values_are_kept_on_one_line(tmp_path):
+    output_dir = str(tmp_path / "csv")
+    sheets = [
+        ("NAME", ["FixedRef", "Name"], [["1", "two\twords\non two lines"], ["2", None]])
+    ]
+    write_delimited(sheets, output_dir)
+    assert read_delimited(delimited_path(output_dir, "NAME")) == [
+        ["FixedRef", "Name"],
+        ["1", "two words on two lines"],
+        ["2", ""],
+    ]
+
+
+def table_rows(table):
+    """The rows of an Arrow table as lists of strings, with null as ""."""
+    columns = [column.to_pylist() for column in table.columns]
+    return [["" if value is None else value for value in row] for row in zip(*columns)]
+
+
+def test_parquet_files_read_back_as_the_sheet_rows(tables, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    paths = write_parquet(
+        pipeline.sheet_rows(tables), str(tmp_path / "parquet"), row_group_rows=50
+    )
+    assert list(paths) == pipeline.SHEET_NAMES
+    for sheet, (fieldnames, rows) in expected_rows(tables).items():
+        table = pq.read_table(paths[sheet])
+        assert table.column_names == list(fieldnames), sheet
+        assert table_rows(table) == rows, sheet
+        for field in table.schema:
+            assert pa.types.is_dictionary(field.type) == (
+                field.name in CATEGORICAL_COLUMNS
+            ), (sheet, field.name)
+
+
+def test_partitioned_parquet_reads_back_as_the_sheet_rows(tables, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    paths = write_parquet(
+        pipeline.sheet_rows(tables),
+        str(tmp_path / "parquet"),
+        partition_column="Designation",
+    )
+    fieldnames, rows = expected_rows(tables)["NAME"]
+    designations = {row[fieldnames.index("Designation")] for row in rows}
+    assert sorted(os.listdir(paths["NAME"])) == sorted(
+        f"Designation={designation}" for designation in designations
+    )
+    # The partition column comes back last, and the rows grouped by partition
+    table = pq.read_table(paths["NAME"]).select(fieldnames)
+    assert sorted(table_rows(table)) == sorted(rows)
+    assert paths["ADDRESS"].endswith("address.parquet")
+
+
+def test_arrow_files_read_back_as_the_sheet_rows(tables, tmp_path):
+    pytest.importorskip("pyarrow")
+    output_dir = tmp_path / "arrow"
+    for run in ("write", "replace"):
+        paths = write_arrow_ipc(pipeline.sheet_rows(tables), str(output_dir))
+        assert sorted(os.listdir(output_dir)) == sorted(
+            f"{sheet.lower()}.arrow" for sheet in pipeline.SHEET_NAMES
+        ), run
+    for sheet, (fieldnames, rows) in expected_rows(tables).items():
+        table = read_arrow_ipc(paths[sheet])
+        assert table.column_names == list(fieldnames), sheet
+        assert table_rows(table) == rows, sheet
+
+
+@pytest.fixture
+def connection(extracted, tmp_path):
+    tables, party_links = extracted
+    db_path = str(tmp_path / "sdn_output.sqlite")
+    counts = write_sqlite(pipeline.sheet_rows(tables), db_path, party_links=party_links)
+    assert set(counts) == set(pipeline.SHEET_NAMES)
+    connection = sqlite3.connect(db_path)
+    yield connection
+    connection.close()
+
+
+def test_lookup_fixed_ref_returns_only_the_party_rows(extracted, connection):
+    tables, party_links = extracted
+    fixed_ref = tables["NAME"][1][0][0]
+    rows = lookup_fixed_ref(connection, fixed_ref)
+    assert rows["NAME"]
+    for name, table_rows in rows.items():
+        if name == "SANCTIONS_ENTRIES":
+            continue
+        columns = [
+            column[1] for column in connection.execute(f'PRAGMA table_info("{name}")')
+        ]
+        for row in table_rows:
+            assert row[columns.index("FixedRef")] == fixed_ref, name
+
+    # The fixture's SanctionsEntry IDs differ from every FixedRef, so the party's
+    # sanctions come back through its links only
+    entry_ids = {row[0] for row in tables["SANCTIONS_ENTRIES"][1]}
+    assert entry_ids and not entry_ids & {row[0] for row in tables["NAME"][1]}
+    profiles = party_links["profiles"]
+    expected = [
+        tuple(row)
+        for row in tables["SANCTIONS_ENTRIES"][1]
+        if profiles.get(party_links["sanctions_entries"][row[0]]) == fixed_ref
+    ]
+    assert expected
+    assert sorted(rows["SANCTIONS_ENTRIES"]) == sorted(expected)
+
+
+def test_lookup_fixed_ref_without_party_links(tables, tmp_path):
+    db_path = str(tmp_path / "sdn_output.sqlite")
+    write_sqlite(pipeline.sheet_rows(tables), db_path)
+    connection = sqlite3.connect(db_path)
+    try:
+        rows = lookup_fixed_ref(connection, tables["NAME"][1][0][0])
+    finally:
+        connection.close()
+    assert rows["NAME"] and "SANCTIONS_ENTRIES" not in rows
@@ -0,0 +1,197 @@
+# Description: XML backends for the SDN parsers. The stdlib ElementTree backend is the default,
+# the lxml backend parses with libxml2, runs lookups through precompiled XPath objects and streams with a
+# tag-filtered iterparse. The parsers call find()/findall() below, which pick the backend that built the element.
+
+import xml.etree.ElementTree as ET
+
+from xml_compression import xml_source
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml is optional
+    lxml_etree = None
+
+
+def local_name(tag):
+    """Returns the tag name without its namespace, e.g. "Location" for "{...}Location"."""
+    return tag.rpartition("}")[2]
+
+
+def read_root(file_path):
+    """
+    Reads the root element's start tag of a plain, gzip or zstd XML file, and nothing after it.
+
+    Returns:
+        tuple: The root's namespace URI ("" if it has none) and its local name.
+    """
+    with xml_source(file_path) as source:
+        for _, element in ET.iterparse(source, events=("start",)):
+            namespace, _, name = element.tag.rpartition("}")
+            return namespace.lstrip("{"), name
+    return "", ""
+
+
+# backend 1 : stdlib ElementTree
+class ElementTreeBackend:
+    name = "etree"
+
+    def parse(self, file_path):
+        """Parses a whole (plain, gzip or zstd) XML file and returns the tree and root elements."""
+        with xml_source(file_path) as source:
+            tree = ET.parse(source)
+        return tree, tree.getroot()
+
+    def find(self, element, path, ns):
+        return element.find(path, ns)
+
+    def findall(self, element, path, ns):
+        return element.findall(path, ns)
+
+    def iterparse_records(self, file_path, handlers):
+        """
+        Streams an XML file and hands each completed record element to its handlers.
+
+        Records are the elements directly below the top-level sections (DistinctParty,
+        Location, IDRegDocument, SanctionsEntry, ...), plus the top-level sections
+        themselves such as ReferenceValueSets. Once handled, an element is detached
+        from its parent so the partial tree never holds more than the record being read.
+
+        Args:
+            file_path (str): The path to the XML file to be parsed.
+            handlers (dict): Local tag names mapped to lists of callables taking the element.
+        """
+        parents = []
+        with xml_source(file_path) as source:
+            for event, element in ET.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    parents.append(element)
+                    continue
+                parents.pop()
+                depth = len(parents)
+                # Keep the reference value tables until ReferenceValueSets itself closes
+                if depth == 2 and parents[1].tag.endswith("}ReferenceValueSets"):
+                    continue
+                if depth in (1, 2):
+                    for handler in handlers.get(local_name(element.tag), ()):
+                        handler(element)
+                    parents[-1].remove(element)
+
+
+# backend 2 : lxml
+class LxmlBackend:
+    name = "lxml"
+
+    def __init__(self):
+        if lxml_etree is None:
+            raise ImportError("The lxml backend needs the lxml package installed")
+        self._find_xpaths = {}
+        self._findall_xpaths = {}
+
+    def parse(self, file_path):
+        """Parses a whole XML file with libxml2 and returns the tree and root elements."""
+        parser = lxml_etree.XMLParser(remove_comments=True, huge_tree=True)
+        with xml_source(file_path) as source:
+            tree = lxml_etree.parse(source, parser)
+        return tree, tree.getroot()
+
+    def _compile(self, xpaths, path, ns):
+        # ElementPath strings such as ".//ns:X/ns:Y[@ID='1']" are valid XPath as well
+        key = (path, ns["ns"])
+        xpath = xpaths.get(key)
+        if xpath is None:
+            expression = f"({path})[1]" if xpaths is self._find_xpaths else path
+            xpath = lxml_etree.XPath(expression, namespaces=ns)
+            xpaths[key] = xpath
+        return xpath
+
+    def find(self, element, path, ns):
+        result = self._compile(self._find_xpaths, path, ns)(element)
+        return result[0] if result else None
+
+    def findall(self, element, path, ns):
+        return self._compile(self._findall_xpaths, path, ns)(element)
+
+    def iterparse_records(self, file_path, handlers):
+        """
+        Streams an XML file with a tag-filtered iterparse and hands each record to its handlers.
+
+        Only the tags that have handlers are reported by libxml2. After a record is
+        handled it is cleared, and the records and sections before it are deleted, so
+        the partial tree stays bounded by the current section. Sections without
+        handlers (e.g. ProfileRelationships) are dropped once the next handled record closes.
+
+        Args:
+            file_path (str): The path to the XML file to be parsed.
+            handlers (dict): Local tag names mapped to lists of callables taking the element.
+        """
+        tags = [f"{{*}}{tag}" for tag in handlers]
+        with xml_source(file_path) as source:
+            self._dispatch_records(
+                lxml_etree.iterparse(
+                    source,
+                    events=("end",),
+                    tag=tags,
+                    remove_comments=True,
+                    huge_tree=True,
+                ),
+                handlers,
+            )
+
+    def _dispatch_records(self, events, handlers):
+        for _, element in events:
+            parent = element.getparent()
+            # Only dispatch sections and records, never a nested element of the same name
+            if parent is None or (
+                parent.getparent() is not None
+                and parent.getparent().getparent() is not None
+            ):
+                continue
+            for handler in handlers[local_name(element.tag)]:
+                handler(element)
+            if parent.getparent() is not None:
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del parent[0]
+                section = parent
+            else:
+                # Sections such as ReferenceValueSets are kept for lazy lookups
+                section = element
+            while section.getprevious() is not None:
+                del section.getparent()[0]
+
+
+XML_BACKENDS = {"etree": ElementTreeBackend, "lxml": LxmlBackend}
+_backend_instances = {}
+
+
+def get_xml_backend(name):
+    """
+    Returns the shared instance of a backend by name ("etree" or "lxml").
+
+    Raises:
+        ImportError: If the backend's package is not installed.
+    """
+    backend = _backend_instances.get(name)
+    if backend is None:
+        backend = XML_BACKENDS[name]()
+        _backend_instances[name] = backend
+    return backend
+
+
+def available_xml_backends():
+    """Returns the names of the backends whose packages are installed."""
+    return [name for name in XML_BACKENDS if name != "lxml" or lxml_etree is not None]
+
+
+def find(element, path, ns):
+    """element.find(path, ns) through the backend that built the element."""
+    if lxml_etree is not None and isinstance(element, lxml_etree._Element):
+        return get_xml_backend("lxml").find(element, path, ns)
+    return element.find(path, ns)
+
+
+def findall(element, path, ns):
+    """element.findall(path, ns) through the backend that built the element."""
+    if lxml_etree is not None and isinstance(element, lxml_etree._Element):
+        return get_xml_backend("lxml").findall(element, path, ns)
+    return element.findall(path, ns)
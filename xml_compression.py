@@ -0,0 +1,157 @@
+# Description: Compressed publication files. Archived XML can be kept gzip- or zstd-compressed on disk;
+# open_xml() recognises the format from the file's magic bytes and returns a streaming decompressor, so every
+# parser reads plain and compressed files alike. transfer_decoder() undoes an HTTP gzip/deflate Content-Encoding.
+
+import gzip
+import hashlib
+import os
+import zlib
+from contextlib import contextmanager
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, only needed for "zstd" archives
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+COMPRESSION_LEVELS = {"gzip": 6, "zstd": 10}
+_MAGIC_BYTES = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError("zstd archives need the zstandard package installed")
+
+
+def compressed_path(file_path, compression):
+    """Returns the archive path of a file, e.g. "sdn_advanced.xml.gz" for "gzip"."""
+    if compression is None:
+        return file_path
+    return file_path + COMPRESSION_SUFFIXES[compression]
+
+
+def detect_compression(file_path):
+    """Returns "gzip" or "zstd" from the file's magic bytes, or None for a plain file."""
+    with open(file_path, "rb") as file:
+        head = file.read(4)
+    for magic, compression in _MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_xml(file_path):
+    """
+    Opens a plain, gzip or zstd XML file for reading.
+
+    Returns:
+        file: A binary file object that yields the decompressed XML.
+    """
+    compression = detect_compression(file_path)
+    if compression == "gzip":
+        return gzip.open(file_path, "rb")
+    if compression == "zstd":
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"))
+    return open(file_path, "rb")
+
+
+@contextmanager
+def xml_source(file_path):
+    """
+    Yields what a parser should read: the path of a plain XML file, so parsers keep
+    their own fast file handling, or a decompressing reader for a gzip / zstd file.
+    """
+    if detect_compression(file_path) is None:
+        yield file_path
+        return
+    with open_xml(file_path) as file:
+        yield file
+
+
+def xml_sha256(file_path, chunk_size=1024 * 1024):
+    """
+    Returns the hex SHA-256 of the XML a plain, gzip or zstd file holds, so the same
+    publication has the same digest however it is stored.
+    """
+    digest = hashlib.sha256()
+    with open_xml(file_path) as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def open_compressed_writer(file_path, compression, level=None):
+    """
+    Opens a binary file for writing, compressing what is written with gzip, zstd or nothing.
+
+    The gzip header carries no timestamp, so the same XML always compresses to the same bytes.
+    """
+    if level is None:
+        level = COMPRESSION_LEVELS.get(compression)
+    if compression == "gzip":
+        return gzip.GzipFile(file_path, "wb", compresslevel=level, mtime=0)
+    if compression == "zstd":
+        _require_zstandard()
+        return zstandard.ZstdCompressor(level=level).stream_writer(
+            open(file_path, "wb")
+        )
+    return open(file_path, "wb")
+
+
+class _IdentityDecoder:
+    def decompress(self, data):
+        return data
+
+    def flush(self):
+        return b""
+
+
+def transfer_decoder(content_encoding):
+    """
+    Returns a decoder for an HTTP Content-Encoding, with decompress(chunk) and flush().
+
+    Raises:
+        ValueError: If the encoding is not gzip, deflate or identity.
+    """
+    content_encoding = (content_encoding or "identity").strip().lower()
+    if content_encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if content_encoding == "deflate":
+        # zlib-wrapped deflate; a gzip header is accepted as well
+        return zlib.decompressobj(32 + zlib.MAX_WBITS)
+    if content_encoding == "identity":
+        return _IdentityDecoder()
+    raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+
+def store_encoded_file(
+    encoded_path, file_path, content_encoding, compression, chunk_size=1024 * 1024
+):
+    """
+    Turns a downloaded body, still in its transfer encoding, into the archive file.
+
+    A gzip body archived as gzip is moved as it is; anything else is decoded and
+    written with the archive's compression to a temp file that replaces file_path
+    once it is complete.
+
+    Args:
+        encoded_path (str): The file holding the body as it was transferred.
+        file_path (str): The archive file to write.
+        content_encoding (str): The response's Content-Encoding, or None.
+        compression (str): "gzip", "zstd" or None for plain XML.
+    """
+    content_encoding = (content_encoding or "identity").strip().lower()
+    if (content_encoding, compression) in (("identity", None), ("gzip", "gzip")):
+        os.replace(encoded_path, file_path)
+        return
+    decoder = transfer_decoder(content_encoding)
+    temp_path = file_path + ".tmp"
+    with open(encoded_path, "rb") as source, open_compressed_writer(
+        temp_path, compression
+    ) as target:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            target.write(decoder.decompress(chunk))
+        target.write(decoder.flush())
+    os.replace(temp_path, file_path)
+    os.remove(encoded_path)
@@ -0,0 +1,470 @@
+# Description: Resumable, integrity-checked HTTP downloads of the publication files. ResumableDownload streams a
+# body and resumes it with Range / If-Range requests after an interruption, then checks the announced length and,
+# when one is known, the SHA-256: announced in a Repr-Digest / Digest header, passed by the caller, or stored for
+# the previous complete download of the same ETag. The OFAC server announces no digest, so a new publication from
+# it is only length-checked, and the download report says so. download_file() writes the body to "<file>.part"
+# and atomically renames it over the target. The ETag / Last-Modified of the last complete download are kept in a
+# JSON state file, so an unchanged publication answers 304.
+
+import base64
+import hashlib
+import json
+import os
+import re
+import time
+
+import requests
+import urllib3
+
+from parse_snapshot import file_sha256
+from xml_compression import store_encoded_file
+
+# download_file results
+DOWNLOADED = "downloaded"
+NOT_MODIFIED = "not_modified"
+# Responses worth retrying; any other HTTP error fails the download at once
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class DownloadError(requests.exceptions.RequestException):
+    """A download that ran out of retries or failed its length or checksum check."""
+
+
+class IntegrityError(DownloadError):
+    """A body that failed its length or checksum check, or changed while it was downloaded."""
+
+
+def load_download_state(state_path):
+    """Returns the JSON state saved for a download, or {} if there is none."""
+    try:
+        with open(state_path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_download_state(state_path, state):
+    with open(state_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2)
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def announced_sha256(response):
+    """Returns the hex SHA-256 from a Repr-Digest or Digest response header, or None."""
+    for header in ("Repr-Digest", "Digest"):
+        match = re.search(
+            r"sha-256=:?([A-Za-z0-9+/=]+)", response.headers.get(header, ""), re.I
+        )
+        if match:
+            return base64.b64decode(match.group(1)).hex()
+    return None
+
+
+def announced_length(response):
+    """Returns the full length of the file from Content-Range or Content-Length, or None."""
+    if response.status_code == 206:
+        match = re.match(
+            r"bytes \d+-\d+/(\d+)", response.headers.get("Content-Range", "")
+        )
+        return int(match.group(1)) if match else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length is not None else None
+
+
+def stored_sha256(state, url, etag):
+    """
+    Returns the SHA-256 saved for the last complete download of a URL if it had the
+    same strong ETag, so the same representation has to hash the same; else None.
+    """
+    if (
+        etag
+        and not etag.startswith("W/")
+        and state.get("url") == url
+        and state.get("etag") == etag
+    ):
+        return state.get("sha256")
+    return None
+
+
+def strong_validator(etag, last_modified):
+    """Returns the validator If-Range can use: a strong ETag, else Last-Modified."""
+    if etag and not etag.startswith("W/"):
+        return etag
+    return last_modified
+
+
+def conditional_headers(state, url):
+    """Returns the If-None-Match / If-Modified-Since headers for the saved state of a URL."""
+    headers = {}
+    if state.get("url") == url:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+    return headers
+
+
+class ResumableDownload:
+    """
+    Streams the body of a URL and survives dropped connections.
+
+    open() sends the first request, which may carry conditional headers and resume
+    a body the caller already holds the first `offset` bytes of. Iterating yields
+    the rest of the body in chunks. After a connection error, a timeout, a short
+    body or a retryable status, the request is retried with exponential backoff and
+    continues at the current offset with Range / If-Range, so the consumer sees one
+    uninterrupted byte stream. Once the body is complete, its length is checked
+    against Content-Length / Content-Range and, when the whole body went through
+    the iterator, its SHA-256 against expected_sha256 or the Repr-Digest / Digest header.
+    Without either, only the length is checked; sha256_verified tells which it was.
+
+    The body is yielded as transferred: with a gzip or deflate Content-Encoding
+    negotiated through accept_encoding, offsets, lengths and checksums all refer to
+    the compressed bytes, and content_encoding tells the caller how to decode them.
+
+    Args:
+        session (requests.Session): The session to send the requests with.
+        url (str): The URL to download.
+        chunk_size (int): The number of bytes read at a time.
+        retries (int): The number of retries after the first attempt.
+        backoff_seconds (float): The delay before the first retry, doubled for each retry.
+        timeout (tuple): The (connect, read) timeouts of each request in seconds.
+        verify (bool): Verify the server's TLS certificate.
+        headers (dict): Extra headers for a request without Range, e.g. conditional headers.
+        accept_encoding (str): The Accept-Encoding to send, e.g. "gzip, deflate".
+        offset (int): The number of leading bytes the caller already has.
+        validator (str): The ETag or Last-Modified those bytes were downloaded with.
+        expected_sha256 (str): The hex SHA-256 the body must have, if known.
+    """
+
+    def __init__(
+        self,
+        session,
+        url,
+        chunk_size=1024 * 1024,
+        retries=5,
+        backoff_seconds=1.0,
+        timeout=(10, 60),
+        verify=True,
+        headers=None,
+        accept_encoding="identity",
+        offset=0,
+        validator=None,
+        expected_sha256=None,
+    ):
+        self.session = session
+        self.url = url
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+        self.verify = verify
+        self.headers = headers or {}
+        self.accept_encoding = accept_encoding
+        self.offset = offset if validator else 0
+        self.validator = validator
+        self.expected_sha256 = expected_sha256
+        self.status_code = None
+        self.etag = None
+        self.last_modified = None
+        self.content_encoding = None
+        self.total_length = None
+        self.attempt = 0
+        self.resumed_bytes = 0
+        self.received_bytes = 0
+        self.sha256_verified = False
+        self._sha256 = hashlib.sha256() if self.offset == 0 else None
+        self._response = None
+        self._closed = False
+        self._start = time.perf_counter()
+
+    @property
+    def sha256(self):
+        """The hex SHA-256 of the body, if the whole body went through the iterator."""
+        return self._sha256.hexdigest() if self._sha256 is not None else None
+
+    def open(self):
+        """
+        Sends the first request.
+
+        Returns:
+            int: 304 if the conditional request found the file unchanged, 206 if the
+                caller's bytes are resumed, 200 if the body starts from the first byte.
+        """
+        self._response = self._request(first=True)
+        return self.status_code
+
+    def _request(self, first):
+        while True:
+            headers = {"Accept-Encoding": self.accept_encoding}
+            if self.offset:
+                headers["Range"] = f"bytes={self.offset}-"
+                headers["If-Range"] = self.validator
+            else:
+                headers.update(self.headers)
+            try:
+                response = self.session.get(
+                    self.url,
+                    stream=True,
+                    verify=self.verify,
+                    timeout=self.timeout,
+                    headers=headers,
+                )
+                if response.status_code == 416 and first:
+                    # The caller's bytes are not a prefix of the current file
+                    response.close()
+                    self.offset = 0
+                    continue
+                if response.status_code != 304:
+                    response.raise_for_status()  # Raise an exception for HTTP errors
+            except requests.exceptions.RequestException as e:
+                self._backoff(e)
+                continue
+
+            if response.status_code == 200:
+                if self.offset and not first:
+                    response.close()
+                    raise IntegrityError("The file changed during the download")
+                # The server ignored the range or the file changed: start over
+                self.offset = 0
+                self._sha256 = hashlib.sha256()
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+                self.validator = strong_validator(self.etag, self.last_modified)
+            elif response.status_code == 206:
+                self.resumed_bytes += self.offset
+            if first:
+                self.status_code = response.status_code
+                self.content_encoding = response.headers.get("Content-Encoding")
+            total_length = announced_length(response)
+            if total_length is not None:
+                self.total_length = total_length
+            self.expected_sha256 = self.expected_sha256 or announced_sha256(response)
+            return response
+
+    def _backoff(self, error):
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+        if status_code is not None and status_code not in RETRY_STATUS_CODES:
+            raise error
+        self.attempt += 1
+        if self.attempt > self.retries:
+            raise DownloadError(
+                f"Giving up after {self.retries} retries: {error}"
+            ) from error
+        if self.offset and not self.validator:
+            # Without an ETag or Last-Modified the body cannot be resumed safely
+            raise DownloadError(f"Download interrupted and not resumable: {error}")
+        delay = self.backoff_seconds * 2 ** (self.attempt - 1)
+        print(
+            f"Download interrupted ({error}), retry {self.attempt}/{self.retries} "
+            f"in {delay:.1f}s"
+        )
+        time.sleep(delay)
+
+    def __iter__(self):
+        if self._response is None:
+            self.open()
+        response = self._response
+        while True:
+            self._response = response
+            try:
+                with response:
+                    # Read the raw stream: the body is yielded in its transfer encoding
+                    for chunk in response.raw.stream(
+                        self.chunk_size, decode_content=False
+                    ):
+                        if chunk:  # Filter out keep-alive new chunks
+                            self.offset += len(chunk)
+                            self.received_bytes += len(chunk)
+                            if self._sha256 is not None:
+                                self._sha256.update(chunk)
+                            yield chunk
+                if self._closed:
+                    return
+                if self.total_length is not None and self.offset < self.total_length:
+                    raise DownloadError(
+                        f"Received {self.offset} of {self.total_length} bytes"
+                    )
+                break
+            except (
+                requests.exceptions.RequestException,
+                urllib3.exceptions.HTTPError,
+            ) as e:
+                if self._closed:
+                    return
+                self._backoff(e)
+                response = self._request(first=False)
+
+        if self.total_length is not None and self.offset != self.total_length:
+            raise IntegrityError(f"Received {self.offset} of {self.total_length} bytes")
+        if self._sha256 is not None and self.expected_sha256 is not None:
+            self.verify_sha256(self.sha256)
+
+    def close(self):
+        """
+        Abandons the download, from any thread: the response is shut down and closed,
+        so an iterator blocked reading it stops at once instead of at the read timeout,
+        and without retrying.
+        """
+        self._closed = True
+        response = self._response
+        if response is None:
+            return
+        try:
+            # Only a socket shutdown wakes a read blocked in another thread
+            response.raw.shutdown()
+        except (AttributeError, ValueError, RuntimeError, OSError):
+            pass
+        response.close()
+
+    def verify_sha256(self, sha256):
+        """
+        Checks the hex SHA-256 of the whole body against expected_sha256, for a caller
+        that hashed the body itself, e.g. because part of it came from an earlier run.
+
+        Raises:
+            IntegrityError: If the digests differ.
+        """
+        if sha256 != self.expected_sha256.lower():
+            raise IntegrityError(
+                f"SHA-256 mismatch: got {sha256}, expected {self.expected_sha256}"
+            )
+        self.sha256_verified = True
+
+    def report(self, message):
+        """
+        Prints the message with the size, time, throughput, retries, bytes resumed and
+        how the body was verified.
+        """
+        seconds = time.perf_counter() - self._start
+        if self.sha256_verified:
+            verified = "SHA-256 verified"
+        elif self.total_length is not None:
+            verified = "length checked only, no SHA-256 announced"
+        else:
+            verified = "not verified, no length or SHA-256 announced"
+        print(
+            f"{message} {self.offset / 1e6:.1f} MB in {seconds:.1f}s "
+            f"({self.received_bytes / 1e6 / seconds:.1f} MB/s), {self.attempt} retries, "
+            f"{self.resumed_bytes} bytes resumed, {verified}"
+        )
+
+
+def download_file(
+    session,
+    url,
+    file_path,
+    state_path,
+    chunk_size=1024 * 1024,
+    retries=5,
+    backoff_seconds=1.0,
+    timeout=(10, 60),
+    verify=True,
+    expected_sha256=None,
+    accept_encoding="identity",
+    compression=None,
+):
+    """
+    Downloads a URL to file_path, resuming and retrying interrupted transfers.
+
+    The body goes to file_path + ".part" through a ResumableDownload, in its transfer
+    encoding. The validators of a partial transfer are kept in "<file>.part.json",
+    so a later run resumes it too, also after the retries ran out. Once its length and
+    SHA-256 are verified, the body is stored at file_path with the requested
+    compression (a gzip transfer kept as gzip is renamed as it is); a body that fails
+    the check is discarded. The SHA-256 is the announced one, expected_sha256, or the
+    one saved in state_path for the same ETag; without any, only the length is checked.
+
+    Args:
+        session (requests.Session): The session to send the requests with.
+        url (str): The URL to download.
+        file_path (str): The local path of the downloaded file.
+        state_path (str): The JSON file holding the validators of the last complete download.
+        chunk_size (int): The number of bytes read and written at a time.
+        retries (int): The number of retries after the first attempt.
+        backoff_seconds (float): The delay before the first retry, doubled for each retry.
+        timeout (tuple): The (connect, read) timeouts of each request in seconds.
+        verify (bool): Verify the server's TLS certificate.
+        expected_sha256 (str): The hex SHA-256 the file must have, if known.
+        accept_encoding (str): The Accept-Encoding to send, e.g. "gzip, deflate".
+        compression (str): Store file_path as "gzip", "zstd" or plain (None).
+
+    Returns:
+        str: DOWNLOADED if a new file was saved, NOT_MODIFIED if the local file is current.
+
+    Raises:
+        DownloadError: If the download still fails after all retries.
+        IntegrityError: If the body fails its length or checksum check.
+        requests.exceptions.RequestException: On an HTTP error that is not retryable.
+    """
+    temp_path = file_path + ".part"
+    partial_state_path = temp_path + ".json"
+    partial = load_download_state(partial_state_path)
+    if partial.get("url") != url or not os.path.exists(temp_path):
+        partial = {}
+    previous = load_download_state(state_path)
+    state = previous if os.path.exists(file_path) else {}
+
+    download = ResumableDownload(
+        session,
+        url,
+        chunk_size=chunk_size,
+        retries=retries,
+        backoff_seconds=backoff_seconds,
+        timeout=timeout,
+        verify=verify,
+        headers=conditional_headers(state, url),
+        accept_encoding=accept_encoding,
+        offset=os.path.getsize(temp_path) if partial else 0,
+        validator=strong_validator(partial.get("etag"), partial.get("last_modified")),
+        expected_sha256=expected_sha256,
+    )
+    if download.open() == 304:
+        print("XML file not modified since the last download ⏭️")
+        return NOT_MODIFIED
+    if download.offset == 0:
+        partial = {
+            "url": url,
+            "etag": download.etag,
+            "last_modified": download.last_modified,
+            "content_encoding": download.content_encoding,
+        }
+        save_download_state(partial_state_path, partial)
+    download.expected_sha256 = download.expected_sha256 or stored_sha256(
+        previous, url, partial.get("etag")
+    )
+
+    try:
+        with open(temp_path, "ab" if download.offset else "wb") as file:
+            for chunk in download:
+                file.write(chunk)
+        # A transfer resumed from an earlier run was only partly hashed on the way
+        sha256 = download.sha256 or file_sha256(temp_path)
+        if download.expected_sha256 and not download.sha256_verified:
+            download.verify_sha256(sha256)
+    except IntegrityError:
+        # Resuming a body that failed its checks would only fail again
+        remove_file(temp_path)
+        remove_file(partial_state_path)
+        raise
+
+    store_encoded_file(
+        temp_path, file_path, partial.get("content_encoding"), compression
+    )
+    remove_file(partial_state_path)
+    save_download_state(
+        state_path,
+        {
+            "url": url,
+            "etag": partial.get("etag"),
+            "last_modified": partial.get("last_modified"),
+            "size": download.offset,
+            "sha256": sha256,
+        },
+    )
+    download.report("XML file downloaded successfully 🔖")
+    return DOWNLOADED